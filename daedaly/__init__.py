@@ -1,3 +1,3 @@
+from . import controllers  # noqa: F401
 from . import models  # noqa: F401
 from . import wizard  # noqa: F401
-
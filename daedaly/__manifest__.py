@@ -1,6 +1,6 @@
 {
     "name": "Daedaly",
-    "version": "1.0",
+    "version": "1.2",
     "author": "Koodos",
     "category": "Project",
     "summary": "Project and task AI helpers with unified configuration",
@@ -12,8 +12,15 @@
         "security/ir.model.access.csv",
         "security/project_security.xml",
         "data/project_defaults.xml",
+        "data/ir_config_parameter_data.xml",
+        "data/ir_cron_data.xml",
         "views/ir_config.xml",
         "views/test_api_connection.xml",
+        "views/ai_call_views.xml",
+        "views/pipeline_stage_views.xml",
+        "views/document_blob_views.xml",
+        "views/routing_rule_views.xml",
+        "views/token_ledger_views.xml",
         "views/res_config_settings_view.xml",
         "views/project_views.xml",
         "views/company_user_views.xml",
@@ -0,0 +1,6 @@
+"""Offline benchmark and load-test tooling for Daedaly.
+
+Not imported by the Odoo module: run the scripts directly (see their
+docstrings). ``stub_gateway`` emulates LLM providers locally and
+``synthetic`` generates projects, documents and teams of a given size.
+"""
@@ -0,0 +1,332 @@
+"""Concurrent load test of the Daedaly actions through Odoo JSON-RPC.
+
+Simulates ``--users`` people clicking the Daedaly buttons at the same time
+against a running Odoo server, preferably wired to ``stub_gateway`` so the
+provider latency is known and free. Reports throughput, latency
+percentiles, errors/timeouts, worker saturation and server-side SQL query
+counts, and stores everything as JSON for later comparison.
+
+Run it against a disposable database: "Generate Tasks" really creates tasks.
+
+Usage::
+
+    python3 load_test.py --url http://localhost:8069 --db loadtest \\
+        --login admin --password admin --users 20 --iterations 5 \\
+        --action generate_tasks --action smart_description \\
+        --start-stub --stub-latency 2 --workers 8 --output run_20u.json
+
+    python3 load_test.py --compare run_8u.json run_20u.json
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import stub_gateway  # noqa: E402
+
+ACTIONS = {
+    'smart_description': ('project.project', 'action_smart_description'),
+    'generate_tasks': ('project.project', 'action_generate_tasks'),
+    'task_smart_description': ('project.task', 'action_task_smart_description'),
+    'task_smart_todo': ('project.task', 'action_task_smart_todo'),
+    'task_smart_enrich': ('project.task', 'action_task_smart_enrich'),
+}
+
+STUB_PARAMS = {
+    'daedaly.what_gpt_use': 'local',
+    'daedaly.local_model_name': 'stub',
+    # Telemetria scritta subito, così i conteggi SQL per esecuzione sono completi
+    'daedaly.telemetry_enabled': 'True',
+    'daedaly.telemetry_batch_size': '1',
+}
+
+
+class RpcError(Exception):
+    pass
+
+
+class OdooClient:
+
+    _ids = itertools.count(1)
+
+    def __init__(self, url, db, login, password, timeout):
+        self.url = url.rstrip('/')
+        self.db = db
+        self.login = login
+        self.password = password
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def rpc(self, path, params, timeout=None):
+        payload = {'jsonrpc': '2.0', 'method': 'call', 'params': params, 'id': next(self._ids)}
+        response = self.session.post(f"{self.url}{path}", json=payload, timeout=timeout or self.timeout)
+        response.raise_for_status()
+        data = response.json()
+        if data.get('error'):
+            error = data['error']
+            message = (error.get('data') or {}).get('message') or error.get('message')
+            raise RpcError(message)
+        return data.get('result')
+
+    def authenticate(self):
+        result = self.rpc('/web/session/authenticate', {'db': self.db, 'login': self.login, 'password': self.password})
+        if not result or not result.get('uid'):
+            raise RpcError(f"Autenticazione fallita per {self.login}")
+        return result['uid']
+
+    def call(self, model, method, args=None, kwargs=None, timeout=None):
+        return self.rpc(f"/web/dataset/call_kw/{model}/{method}", {
+            'model': model, 'method': method, 'args': args or [], 'kwargs': kwargs or {},
+        }, timeout=timeout)
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class LoadTest:
+
+    def __init__(self, args):
+        self.args = args
+        self.lock = threading.Lock()
+        self.samples = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.timeline = []
+        self.stop = threading.Event()
+
+    def _admin(self):
+        client = OdooClient(self.args.url, self.args.db, self.args.login, self.args.password, self.args.timeout)
+        client.authenticate()
+        return client
+
+    def _targets(self, admin):
+        projects = self.args.project_id or admin.call(
+            'project.project', 'search', [[('documentation_ids', '!=', False)]], {'limit': self.args.users})
+        tasks = self.args.task_id or admin.call(
+            'project.task', 'search', [[('project_id', 'in', projects)]], {'limit': self.args.users * 5})
+        if not projects:
+            raise SystemExit("Nessun progetto con documentazione trovato: usa --project-id.")
+        return projects, tasks
+
+    def _user_loop(self, index, projects, tasks):
+        rng = random.Random(index)
+        client = OdooClient(self.args.url, self.args.db, self.args.login, self.args.password, self.args.timeout)
+        client.authenticate()
+        iteration = 0
+        while not self.stop.is_set():
+            if self.args.iterations and iteration >= self.args.iterations:
+                break
+            iteration += 1
+            name = rng.choice(self.args.action)
+            model, method = ACTIONS[name]
+            pool = projects if model == 'project.project' else tasks
+            if not pool:
+                continue
+            record_id = pool[(index + iteration) % len(pool)]
+            with self.lock:
+                self.in_flight += 1
+                self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            started = time.perf_counter()
+            error = None
+            try:
+                client.call(model, method, [[record_id]])
+            except requests.Timeout:
+                error = 'timeout'
+            except Exception as e:
+                error = type(e).__name__ if not isinstance(e, RpcError) else f"rpc: {str(e)[:120]}"
+            elapsed = (time.perf_counter() - started) * 1000.0
+            with self.lock:
+                self.in_flight -= 1
+                self.samples.append({'action': name, 'ms': elapsed, 'error': error, 'end': time.time()})
+            if self.args.think_time:
+                time.sleep(rng.uniform(0, self.args.think_time))
+
+    def _sampler(self, started):
+        while not self.stop.wait(1.0):
+            with self.lock:
+                self.timeline.append({
+                    't': round(time.time() - started, 1),
+                    'in_flight': self.in_flight,
+                    'completed': len(self.samples),
+                })
+
+    def _server_query_counts(self, admin, since):
+        try:
+            rows = admin.call('daedaly.pipeline.stage', 'search_read',
+                              [[('run_date', '>=', since)]], {'fields': ['run_uid', 'action', 'query_count']})
+        except Exception as e:
+            return {'error': str(e)}
+        per_run = {}
+        for row in rows:
+            key = (row['run_uid'], row['action'])
+            per_run[key] = per_run.get(key, 0) + (row['query_count'] or 0)
+        by_action = {}
+        for (_run, action), count in per_run.items():
+            by_action.setdefault(action, []).append(count)
+        return {
+            action: {'runs': len(counts), 'mean': statistics.fmean(counts), 'max': max(counts)}
+            for action, counts in by_action.items()
+        }
+
+    def run(self):
+        args = self.args
+        admin = self._admin()
+        stub = None
+        previous = {}
+        if args.start_stub:
+            stub, base_url = stub_gateway.start_server(
+                host=args.stub_host, port=args.stub_port, latency=args.stub_latency, token_rate=args.stub_token_rate)
+            params = dict(STUB_PARAMS, **{'daedaly.local_gateway_url': f"{base_url}/api/generate"})
+            for key, value in params.items():
+                previous[key] = admin.call('ir.config_parameter', 'get_param', [key])
+                admin.call('ir.config_parameter', 'set_param', [key, value])
+        projects, tasks = self._targets(admin)
+        since = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        started = time.time()
+        threading.Thread(target=self._sampler, args=(started,), daemon=True).start()
+        threads = []
+        for index in range(args.users):
+            thread = threading.Thread(target=self._user_loop, args=(index, projects, tasks), daemon=True)
+            threads.append(thread)
+            thread.start()
+            if args.ramp_up:
+                time.sleep(args.ramp_up / args.users)
+        deadline = started + args.duration if args.duration else None
+        for thread in threads:
+            thread.join(max(0.0, deadline - time.time()) if deadline else None)
+        self.stop.set()
+        for thread in threads:
+            thread.join(args.timeout)
+        elapsed = time.time() - started
+        try:
+            queries = self._server_query_counts(admin, since)
+        finally:
+            for key, value in previous.items():
+                admin.call('ir.config_parameter', 'set_param', [key, value or False])
+            if stub:
+                stub.shutdown()
+        return self._results(elapsed, queries)
+
+    def _results(self, elapsed, queries):
+        ok = [s['ms'] for s in self.samples if not s['error']]
+        errors = [s for s in self.samples if s['error']]
+        throughput = len(ok) / elapsed if elapsed else 0.0
+        mean_ms = statistics.fmean(ok) if ok else 0.0
+        # Legge di Little: richieste mediamente servite in parallelo dal server
+        effective = throughput * mean_ms / 1000.0
+        per_action = {}
+        for name in sorted({s['action'] for s in self.samples}):
+            values = [s['ms'] for s in self.samples if s['action'] == name and not s['error']]
+            per_action[name] = {
+                'ok': len(values),
+                'errors': sum(1 for s in errors if s['action'] == name),
+                'p50_ms': percentile(values, 50),
+                'p95_ms': percentile(values, 95),
+                'p99_ms': percentile(values, 99),
+            }
+        return {
+            'parameters': {k: v for k, v in vars(self.args).items() if k != 'password'},
+            'elapsed_s': elapsed,
+            'requests': len(self.samples),
+            'ok': len(ok),
+            'errors': len(errors),
+            'timeouts': sum(1 for s in errors if s['error'] == 'timeout'),
+            'error_kinds': sorted({s['error'] for s in errors}),
+            'throughput_rps': throughput,
+            'p50_ms': percentile(ok, 50),
+            'p95_ms': percentile(ok, 95),
+            'p99_ms': percentile(ok, 99),
+            'mean_ms': mean_ms,
+            'max_in_flight': self.max_in_flight,
+            'effective_concurrency': effective,
+            'worker_saturation': effective / self.args.workers if self.args.workers else None,
+            'actions': per_action,
+            'server_queries_per_run': queries,
+            'timeline': self.timeline,
+        }
+
+
+def report(results):
+    print(f"requests {results['requests']}  ok {results['ok']}  errors {results['errors']}  timeouts {results['timeouts']}")
+    print(f"throughput {results['throughput_rps']:.2f} req/s  p50 {results['p50_ms']:.0f} ms  "
+          f"p95 {results['p95_ms']:.0f} ms  p99 {results['p99_ms']:.0f} ms")
+    saturation = results.get('worker_saturation')
+    print(f"effective concurrency {results['effective_concurrency']:.1f}"
+          + (f"  worker saturation {saturation:.0%}" if saturation is not None else ''))
+    for name, data in results['actions'].items():
+        print(f"  {name:24s} ok {data['ok']:4d}  err {data['errors']:3d}  p50 {data['p50_ms']:8.0f}  p95 {data['p95_ms']:8.0f}")
+    queries = results.get('server_queries_per_run') or {}
+    for action, data in queries.items():
+        if isinstance(data, dict):
+            print(f"  SQL {action:20s} mean {data['mean']:.0f}  max {data['max']}  ({data['runs']} runs)")
+    for kind in results.get('error_kinds', []):
+        print(f"  error: {kind}")
+
+
+def compare(path_a, path_b):
+    with open(path_a, encoding='utf-8') as fh:
+        a = json.load(fh)
+    with open(path_b, encoding='utf-8') as fh:
+        b = json.load(fh)
+    keys = ('throughput_rps', 'p50_ms', 'p95_ms', 'p99_ms', 'errors', 'timeouts', 'effective_concurrency')
+    print(f"{'metric':24s} {os.path.basename(path_a):>16s} {os.path.basename(path_b):>16s} {'delta':>10s}")
+    for key in keys:
+        va, vb = a.get(key) or 0, b.get(key) or 0
+        delta = f"{(vb - va) / va:+.1%}" if va else 'n/a'
+        print(f"{key:24s} {va:16.2f} {vb:16.2f} {delta:>10s}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'NEW'), help='Compare two JSON result files and exit.')
+    parser.add_argument('--url', default='http://localhost:8069')
+    parser.add_argument('--db')
+    parser.add_argument('--login', default='admin')
+    parser.add_argument('--password', default='admin')
+    parser.add_argument('--users', type=int, default=10, help='Concurrent simulated users.')
+    parser.add_argument('--iterations', type=int, default=3, help='Actions per user (0 = until --duration).')
+    parser.add_argument('--duration', type=float, default=0, help='Stop after this many seconds.')
+    parser.add_argument('--ramp-up', type=float, default=0, help='Seconds over which users are started.')
+    parser.add_argument('--think-time', type=float, default=0, help='Max random pause between clicks (s).')
+    parser.add_argument('--action', action='append', choices=sorted(ACTIONS), help='Repeatable; default: all.')
+    parser.add_argument('--project-id', type=int, action='append')
+    parser.add_argument('--task-id', type=int, action='append')
+    parser.add_argument('--timeout', type=float, default=600, help='Client timeout per request (s).')
+    parser.add_argument('--workers', type=int, default=0, help='Odoo HTTP workers, for the saturation ratio.')
+    parser.add_argument('--start-stub', action='store_true', help='Start stub_gateway and point Daedaly at it.')
+    parser.add_argument('--stub-host', default='127.0.0.1')
+    parser.add_argument('--stub-port', type=int, default=11435)
+    parser.add_argument('--stub-latency', type=float, default=1.0)
+    parser.add_argument('--stub-token-rate', type=float, default=50.0)
+    parser.add_argument('--output')
+    args = parser.parse_args()
+    if args.compare:
+        compare(*args.compare)
+        return
+    if not args.db:
+        parser.error('--db is required')
+    args.action = args.action or sorted(ACTIONS)
+    results = LoadTest(args).run()
+    report(results)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,192 @@
+"""Offline end-to-end benchmark of the Daedaly actions.
+
+Starts the stub gateway, points Daedaly at it (local provider), creates a
+synthetic project and measures ``action_smart_description``,
+``action_generate_tasks``, ``action_task_smart_description``,
+``action_task_smart_todo`` and ``action_task_smart_enrich`` end to end and
+per stage. The task actions run on a selection of ``--task-selection``
+tasks, so batched prompts are measured as users trigger them from the list.
+
+Every repetition runs in a savepoint that is rolled back, and the whole
+transaction is rolled back at the end unless ``--keep`` is given. Daedaly
+writes telemetry, counters and the token ledger through separate cursors:
+the registry is put in test mode so those cursors join the benchmark
+transaction and are rolled back with it, and the telemetry buffer is
+never flushed during the run (its rows and counters are dropped at the
+end). Their cost is therefore not part of the measures. With ``--keep``
+the benchmark parameters (local provider, telemetry batching) are
+committed along with the dataset.
+
+Usage (from a shell where Odoo is importable)::
+
+    python3 run_benchmark.py -c /etc/odoo.conf -d bench_db \\
+        --pdfs 5 --pages 30 --employees 12 --tasks 40 --repeat 5 --output run.json
+
+Use ``--mode record --upstream http://real-gateway:11434`` once to capture
+real provider responses and ``--mode replay`` to rerun them deterministically.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import stub_gateway  # noqa: E402
+import synthetic  # noqa: E402
+
+ACTIONS = (
+    ('project.project', 'action_smart_description'),
+    ('project.project', 'action_generate_tasks'),
+    ('project.task', 'action_task_smart_description'),
+    ('project.task', 'action_task_smart_todo'),
+    ('project.task', 'action_task_smart_enrich'),
+)
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(samples):
+    return {
+        'runs': len(samples),
+        'min_ms': min(samples) if samples else 0.0,
+        'p50_ms': percentile(samples, 50),
+        'p95_ms': percentile(samples, 95),
+        'mean_ms': statistics.fmean(samples) if samples else 0.0,
+    }
+
+
+def _measure(args, cr, base_url, stage_runs):
+    import odoo
+
+    results = {'actions': {}}
+    env = odoo.api.Environment(cr, odoo.SUPERUSER_ID, {})
+    icp = env['ir.config_parameter']
+    # Il buffer della telemetria non viene mai svuotato durante la misura
+    icp.set_param('daedaly.telemetry_batch_size', 10 ** 9)
+    icp.set_param('daedaly.telemetry_flush_seconds', 10 ** 9)
+    icp.set_param('daedaly.what_gpt_use', 'local')
+    icp.set_param('daedaly.local_gateway_url', f"{base_url}/api/generate")
+    icp.set_param('daedaly.local_model_name', 'stub')
+
+    started = time.perf_counter()
+    project = synthetic.create_dataset(
+        env, pdfs=args.pdfs, pages=args.pages, employees=args.employees,
+        tasks=args.tasks, task_docs=args.task_docs, framework=args.framework,
+    )
+    env.flush_all()
+    results['setup_ms'] = (time.perf_counter() - started) * 1000.0
+    tasks = project.task_ids[:args.task_selection]
+    results['task_selection'] = len(tasks)
+
+    for model, method in ACTIONS:
+        record = project if model == 'project.project' else tasks
+        samples = []
+        stages = {}
+        for _ in range(args.repeat):
+            del stage_runs[:]
+            with cr.savepoint() as savepoint:
+                started = time.perf_counter()
+                getattr(record, method)()
+                env.flush_all()
+                samples.append((time.perf_counter() - started) * 1000.0)
+                savepoint.rollback()
+            env.invalidate_all()
+            for stage_run in stage_runs:
+                for name, data in stage_run.stages.items():
+                    stages.setdefault(name, []).append(data['duration_ms'])
+        results['actions'][method] = dict(
+            summarize(samples),
+            stages={name: summarize(values) for name, values in stages.items()},
+        )
+    return results
+
+
+def run(args):
+    import odoo
+    from odoo.tools import config
+
+    config.parse_config(['-c', args.config, '-d', args.database] if args.config else ['-d', args.database])
+    from odoo.modules.registry import Registry
+    from odoo.addons.daedaly.models import ai_call
+    from odoo.addons.daedaly.tools import profiling
+
+    server, base_url = stub_gateway.start_server(
+        latency=args.latency, token_rate=args.token_rate,
+        tasks_per_group=args.tasks_per_group, groups=args.groups,
+        team=[f"Bench Employee {i + 1}" for i in range(args.employees)],
+        mode=args.mode, upstream=args.upstream, cassette=args.cassette,
+    )
+    stage_runs = []
+    profiling.add_listener(stage_runs.append)
+    results = {'parameters': vars(args)}
+    registry = Registry(args.database)
+    try:
+        with registry.cursor() as cr:
+            # Le scritture in cursori separati restano nella transazione del benchmark
+            registry.enter_test_mode(cr)
+            try:
+                results.update(_measure(args, cr, base_url, stage_runs))
+            finally:
+                # Prima della fine della transazione, che svuoterebbe il buffer in un thread
+                with ai_call._BUFFER_LOCK:
+                    ai_call._BUFFERS.clear()
+                registry.leave_test_mode()
+            if not args.keep:
+                cr.rollback()
+    finally:
+        profiling.remove_listener(stage_runs.append)
+        server.shutdown()
+    results['stub_requests'] = server.RequestHandlerClass.state.requests
+    return results
+
+
+def report(results):
+    print(f"setup: {results.get('setup_ms', 0.0):.0f} ms, stub requests: {results.get('stub_requests')}, "
+          f"task selection: {results.get('task_selection')}")
+    for method, data in results['actions'].items():
+        print(f"{method:32s} p50 {data['p50_ms']:8.0f} ms  p95 {data['p95_ms']:8.0f} ms  mean {data['mean_ms']:8.0f} ms")
+        for name, stage in data['stages'].items():
+            print(f"    {name:28s} p50 {stage['p50_ms']:8.0f} ms  p95 {stage['p95_ms']:8.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-c', '--config', help='Odoo configuration file.')
+    parser.add_argument('-d', '--database', required=True)
+    parser.add_argument('--pdfs', type=int, default=3, help='PDF documents on the project.')
+    parser.add_argument('--pages', type=int, default=10, help='Pages per PDF.')
+    parser.add_argument('--employees', type=int, default=5, help='Team size.')
+    parser.add_argument('--tasks', type=int, default=10, help='Existing tasks in the project.')
+    parser.add_argument('--task-docs', type=int, default=1, help='PDF documents per existing task.')
+    parser.add_argument('--task-selection', type=int, default=10,
+                        help='Tasks selected for the task actions (batched from 2).')
+    parser.add_argument('--framework', choices=('prince2', 'agile', 'scrum', 'lean'), default='scrum')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--latency', type=float, default=0.5)
+    parser.add_argument('--token-rate', type=float, default=50.0)
+    parser.add_argument('--tasks-per-group', type=int, default=5)
+    parser.add_argument('--groups', type=int, default=3)
+    parser.add_argument('--mode', choices=('canned', 'record', 'replay'), default='canned')
+    parser.add_argument('--upstream')
+    parser.add_argument('--cassette')
+    parser.add_argument('--keep', action='store_true', help='Commit the synthetic dataset.')
+    parser.add_argument('--output', help='Write the results as JSON to this file.')
+    args = parser.parse_args()
+    results = run(args)
+    report(results)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,267 @@
+"""Local stub LLM gateway for offline Daedaly benchmarks.
+
+Speaks the Ollama (``/api/generate``, ``/api/chat``), OpenAI-compatible
+(``/v1/chat/completions``, ``/v1/completions``) and external agent (``/ask``)
+protocols. Responses are canned JSON matching the schema requested by the
+prompt (framework-specific task plans, project analysis, task description,
+to-do list) and are delayed by ``latency + output_tokens / token_rate`` to
+emulate a real model.
+
+Record/replay: in ``record`` mode every request is forwarded to
+``--upstream`` with the caller's authentication headers (and query
+string, for keys passed as ``?key=``) and the answer is stored in
+``--cassette``; the cassette never holds the credentials. In ``replay``
+mode stored answers are served (falling back to canned ones), which makes
+reruns deterministic without paying for provider calls.
+
+Usage::
+
+    python3 stub_gateway.py --port 11435 --latency 0.8 --token-rate 40
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+try:
+    import requests
+except Exception:
+    requests = None
+
+CHARS_PER_TOKEN = 4
+# Header inoltrati all'upstream in modalità record (autenticazione dei provider reali)
+FORWARDED_HEADERS = ('Authorization', 'X-Api-Key', 'Api-Key', 'X-Goog-Api-Key', 'OpenAI-Organization', 'OpenAI-Project')
+
+
+def _task(title, index, team):
+    return {
+        'title': f"{title} {index}",
+        'description': f"Attività sintetica {index}: analisi, implementazione e verifica di {title.lower()}.",
+        'keywords': ['benchmark', title.split()[0].lower()],
+        'assignee': team[index % len(team)] if team else '',
+    }
+
+
+def canned_payload(prompt, tasks_per_group=5, groups=3, team=None):
+    """Return a dict matching the JSON schema the Daedaly prompt asks for."""
+    team = team or []
+    task_ids = re.findall(r'^### Task ID (\d+)', prompt, re.MULTILINE)
+    if task_ids:
+        # Prompt a lotti: una risposta per task, indicizzata per ID
+        single = canned_payload(prompt.split('### Task ID', 1)[0], tasks_per_group, groups, team)
+        return {task_id: single for task_id in task_ids}
+    if '"sprints"' in prompt:
+        return {'sprints': [
+            {'sprint': g + 1, 'tasks': [_task('Sprint task', g * tasks_per_group + i, team) for i in range(tasks_per_group)]}
+            for g in range(groups)
+        ]}
+    if '"value_streams"' in prompt:
+        return {'value_streams': [
+            {'stream': f"Flusso {g + 1}", 'tasks': [_task('Lean task', g * tasks_per_group + i, team) for i in range(tasks_per_group)]}
+            for g in range(groups)
+        ]}
+    if '"iterations"' in prompt:
+        return {'iterations': [
+            {'iteration': g + 1, 'tasks': [_task('Iteration task', g * tasks_per_group + i, team) for i in range(tasks_per_group)]}
+            for g in range(groups)
+        ]}
+    if '"tasks"' in prompt:
+        return {'tasks': [_task('Prince2 task', i, team) for i in range(tasks_per_group * groups)]}
+    if '"economic_notes"' in prompt:
+        return {
+            'description': "Analisi sintetica del progetto generata dal gateway di benchmark. " * 8,
+            'economic_notes': "Budget stimato coerente con i documenti di gara.",
+            'criticita': ["Dipendenze esterne", "Tempi di approvazione", "Disponibilità del team"],
+            'tags': ['benchmark', 'synthetic'],
+        }
+    if '"items"' in prompt and '"description"' in prompt:
+        return {
+            'description': "Descrizione sintetica della task generata dal gateway di benchmark. " * 4,
+            'items': [f"Passo operativo {i + 1}" for i in range(8)],
+        }
+    if '"items"' in prompt:
+        return {'items': [f"Passo operativo {i + 1}" for i in range(8)]}
+    return {'description': "Descrizione sintetica della task generata dal gateway di benchmark. " * 4}
+
+
+class StubState:
+
+    def __init__(self, latency=0.5, token_rate=50.0, tasks_per_group=5, groups=3, team=None,
+                 mode='canned', upstream=None, cassette=None, canned_dir=None):
+        self.latency = latency
+        self.token_rate = token_rate
+        self.tasks_per_group = tasks_per_group
+        self.groups = groups
+        self.team = team or []
+        self.mode = mode
+        self.upstream = (upstream or '').rstrip('/')
+        self.cassette = cassette
+        self.canned_dir = canned_dir
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.tapes = {}
+        if cassette and os.path.exists(cassette):
+            with open(cassette, encoding='utf-8') as fh:
+                self.tapes = json.load(fh)
+
+    @staticmethod
+    def key(path, payload):
+        prompt = payload.get('prompt')
+        if prompt is None:
+            prompt = json.dumps(payload.get('messages') or payload.get('question') or '', sort_keys=True)
+        raw = json.dumps([path, payload.get('model'), prompt], sort_keys=True)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def save(self):
+        if not self.cassette:
+            return
+        with self.lock:
+            tmp = f"{self.cassette}.tmp"
+            with open(tmp, 'w', encoding='utf-8') as fh:
+                json.dump(self.tapes, fh, ensure_ascii=False, indent=1)
+            os.replace(tmp, self.cassette)
+
+    def canned_text(self, prompt):
+        if self.canned_dir:
+            for kind in ('sprints', 'value_streams', 'iterations', 'tasks', 'economic_notes', 'items', 'description'):
+                path = os.path.join(self.canned_dir, f"{kind}.json")
+                if f'"{kind}"' in prompt and os.path.exists(path):
+                    with open(path, encoding='utf-8') as fh:
+                        return fh.read()
+        payload = canned_payload(prompt, self.tasks_per_group, self.groups, self.team)
+        return json.dumps(payload, ensure_ascii=False)
+
+
+def _prompt_of(payload):
+    if 'prompt' in payload:
+        prompt = payload['prompt']
+        return '\n'.join(prompt) if isinstance(prompt, list) else prompt
+    if 'messages' in payload:
+        return '\n'.join(str(m.get('content', '')) for m in payload['messages'])
+    return str(payload.get('question', ''))
+
+
+def _wrap(path, payload, text, prompt):
+    prompt_tokens = max(1, len(prompt) // CHARS_PER_TOKEN)
+    output_tokens = max(1, len(text) // CHARS_PER_TOKEN)
+    model = payload.get('model', 'stub')
+    if path == '/api/generate':
+        return {'model': model, 'response': text, 'done': True,
+                'prompt_eval_count': prompt_tokens, 'eval_count': output_tokens}
+    if path == '/api/chat':
+        return {'model': model, 'message': {'role': 'assistant', 'content': text}, 'done': True,
+                'prompt_eval_count': prompt_tokens, 'eval_count': output_tokens}
+    usage = {'prompt_tokens': prompt_tokens, 'completion_tokens': output_tokens,
+             'total_tokens': prompt_tokens + output_tokens}
+    if path == '/v1/completions':
+        prompts = payload.get('prompt')
+        prompts = prompts if isinstance(prompts, list) else [prompts]
+        return {'object': 'text_completion', 'model': model, 'usage': usage,
+                'choices': [{'index': i, 'text': text, 'finish_reason': 'stop'} for i in range(len(prompts))]}
+    if path == '/ask':
+        return json.loads(text)
+    return {'object': 'chat.completion', 'model': model, 'usage': usage,
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': text}, 'finish_reason': 'stop'}]}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    state = None
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _send(self, status, body):
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path in ('/api/tags', '/v1/models'):
+            return self._send(200, {'models': [{'name': 'stub'}], 'data': [{'id': 'stub'}]})
+        return self._send(404, {'error': 'not found'})
+
+    def do_POST(self):
+        state = self.state
+        length = int(self.headers.get('Content-Length') or 0)
+        payload = json.loads(self.rfile.read(length) or b'{}')
+        path = self.path.split('?', 1)[0]
+        with state.lock:
+            state.requests += 1
+        key = state.key(path, payload)
+
+        if state.mode == 'record':
+            if requests is None or not state.upstream:
+                return self._send(500, {'error': 'record mode needs requests and --upstream'})
+            started = time.perf_counter()
+            headers = {name: self.headers[name] for name in FORWARDED_HEADERS if self.headers.get(name)}
+            query = self.path[len(path):]
+            response = requests.post(f"{state.upstream}{path}{query}", json=payload, headers=headers, timeout=600)
+            body = response.json()
+            with state.lock:
+                state.tapes[key] = {'status': response.status_code, 'body': body,
+                                    'elapsed': time.perf_counter() - started}
+            state.save()
+            return self._send(response.status_code, body)
+
+        if state.mode == 'replay' and key in state.tapes:
+            tape = state.tapes[key]
+            time.sleep(state.latency)
+            return self._send(tape['status'], tape['body'])
+
+        prompt = _prompt_of(payload)
+        text = state.canned_text(prompt)
+        output_tokens = max(1, len(text) // CHARS_PER_TOKEN)
+        delay = state.latency + (output_tokens / state.token_rate if state.token_rate else 0.0)
+        time.sleep(delay)
+        return self._send(200, _wrap(path, payload, text, prompt))
+
+
+def start_server(host='127.0.0.1', port=0, **options):
+    """Start the stub in a background thread; return ``(server, base_url)``."""
+    handler = type('BoundStubHandler', (StubHandler,), {'state': StubState(**options)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name='daedaly-stub-gateway', daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=11435)
+    parser.add_argument('--latency', type=float, default=0.5, help='Fixed delay per request (s).')
+    parser.add_argument('--token-rate', type=float, default=50.0, help='Output tokens per second (0 = instant).')
+    parser.add_argument('--tasks-per-group', type=int, default=5)
+    parser.add_argument('--groups', type=int, default=3)
+    parser.add_argument('--team', default='', help='Comma-separated assignee names used in canned tasks.')
+    parser.add_argument('--mode', choices=('canned', 'record', 'replay'), default='canned')
+    parser.add_argument('--upstream', help='Real gateway base URL for record mode.')
+    parser.add_argument('--cassette', help='JSON file storing recorded responses.')
+    parser.add_argument('--canned-dir', help='Directory with <kind>.json overrides (sprints, items, ...).')
+    args = parser.parse_args()
+    server, url = start_server(
+        args.host, args.port,
+        latency=args.latency, token_rate=args.token_rate,
+        tasks_per_group=args.tasks_per_group, groups=args.groups,
+        team=[name.strip() for name in args.team.split(',') if name.strip()],
+        mode=args.mode, upstream=args.upstream, cassette=args.cassette, canned_dir=args.canned_dir,
+    )
+    print(f"Daedaly stub gateway listening on {url} ({args.mode})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
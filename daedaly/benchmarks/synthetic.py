@@ -0,0 +1,113 @@
+"""Synthetic data for Daedaly benchmarks: PDFs, teams, projects and tasks."""
+import base64
+import random
+
+_WORDS = (
+    "progetto riunione verbale requisito fornitore budget rischio milestone consegna collaudo "
+    "integrazione odoo modulo contabilità magazzino vendite acquisti utente processo flusso "
+    "approvazione documento gara capitolato allegato tecnico sicurezza dati migrazione formazione "
+    "supporto manutenzione sprint backlog priorità stakeholder obiettivo valore costo tempo qualità"
+).split()
+
+_SKILLS = (
+    "Python", "Odoo ORM", "PostgreSQL", "contabilità", "logistica", "UX design", "DevOps",
+    "analisi funzionale", "project management", "testing", "integrazioni REST", "formazione utenti",
+)
+
+
+def _pdf_escape(text):
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def make_pdf(pages):
+    """Build a minimal valid PDF; ``pages`` is a list of lists of text lines."""
+    objects = []
+
+    def add(body):
+        objects.append(body)
+        return len(objects)
+
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+    pages_id = len(objects) + 1 + 2 * len(pages)
+    page_ids = []
+    for lines in pages:
+        stream = ["BT /F1 10 Tf 40 800 Td 12 TL"]
+        for line in lines:
+            stream.append(f"({_pdf_escape(line)}) '")
+        stream.append("ET")
+        # Helvetica con WinAnsiEncoding: cp1252 copre le lettere accentate dei testi sintetici
+        content = "\n".join(stream).encode('cp1252', 'replace')
+        content_id = add(b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream")
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>" % (pages_id, font, content_id)
+        ))
+    kids = b" ".join(b"%d 0 R" % pid for pid in page_ids)
+    add(b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids)))
+    catalog = add(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for index, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % index + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog, xref)
+    return bytes(out)
+
+
+def synthetic_pages(rng, pages, lines_per_page=50, words_per_line=12):
+    result = []
+    for page in range(pages):
+        lines = [f"Verbale sintetico - pagina {page + 1}"]
+        for _ in range(lines_per_page):
+            lines.append(" ".join(rng.choice(_WORDS) for _ in range(words_per_line)))
+        result.append(lines)
+    return result
+
+
+def create_dataset(env, pdfs=3, pages=10, employees=5, tasks=10, task_docs=1,
+                   framework='scrum', seed=42):
+    """Create a project with documents, a team and existing tasks; return it."""
+    rng = random.Random(seed)
+    team = env['hr.employee']
+    for index in range(employees):
+        skills = ", ".join(rng.sample(_SKILLS, 3))
+        team |= env['hr.employee'].create({
+            'name': f"Bench Employee {index + 1}",
+            'work_email': f"bench{index + 1}@example.com",
+            'progett_ai_description': f"Esperienza pluriennale in {skills}. " * rng.randint(2, 10),
+        })
+    project = env['project.project'].create({
+        'name': f"Bench Project {seed}",
+        'pm_framework': framework,
+        'team_employee_ids': [(6, 0, team.ids)],
+    })
+    for index in range(pdfs):
+        data = make_pdf(synthetic_pages(rng, pages))
+        env['project.documentation'].create({
+            'name': f"Documento {index + 1}",
+            'filename': f"bench_{index + 1}.pdf",
+            'file': base64.b64encode(data),
+            'doc_date': '2026-01-01',
+            'project_id': project.id,
+        })
+    for index in range(tasks):
+        task = env['project.task'].create({
+            'name': f"Existing task {index + 1}",
+            'project_id': project.id,
+            'description': " ".join(rng.choice(_WORDS) for _ in range(40)),
+        })
+        for doc_index in range(task_docs):
+            data = make_pdf(synthetic_pages(rng, max(1, pages // 4)))
+            env['task.documentation'].create({
+                'name': f"Task doc {doc_index + 1}",
+                'filename': f"task_{index + 1}_{doc_index + 1}.pdf",
+                'file': base64.b64encode(data),
+                'doc_date': '2026-01-01',
+                'task_id': task.id,
+            })
+    return project
@@ -0,0 +1,28 @@
+import hmac
+
+from odoo import http
+from odoo.http import request
+
+
+class DaedalyMetricsController(http.Controller):
+
+    @http.route('/daedaly/metrics', type='http', auth='none', methods=['GET'], csrf=False, save_session=False)
+    def metrics(self, token=None, **kwargs):
+        """Expose the Daedaly counters in Prometheus text format.
+
+        The endpoint is disabled until ``daedaly.metrics_token`` is set; the
+        scraper sends it as ``Authorization: Bearer <token>`` or ``?token=``.
+        """
+        env = request.env(su=True)
+        expected = env['ir.config_parameter'].get_param('daedaly.metrics_token') or ''
+        if not expected:
+            return request.not_found()
+        auth = request.httprequest.headers.get('Authorization', '')
+        provided = auth[7:].strip() if auth.lower().startswith('bearer ') else (token or '')
+        if not hmac.compare_digest(provided.encode(), expected.encode()):
+            return request.make_response('Forbidden\n', status=403, headers=[('Content-Type', 'text/plain')])
+        body = env['daedaly.metric']._render_prometheus()
+        return request.make_response(body, headers=[
+            ('Content-Type', 'text/plain; version=0.0.4; charset=utf-8'),
+            ('Cache-Control', 'no-store'),
+        ])
@@ -0,0 +1,34 @@
+import logging
+
+from odoo import SUPERUSER_ID, api
+
+_logger = logging.getLogger(__name__)
+
+
+def migrate(cr, version):
+    """Move documentation files to content-addressed blobs.
+
+    Until 1.0 every ``project.documentation``/``task.documentation`` line
+    stored its own ``file`` attachment; identical files now share one
+    ``daedaly.document.blob``.
+    """
+    if not version:
+        return
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    blobs = env['daedaly.document.blob']
+    attachments = env['ir.attachment']
+    for model_name in blobs._document_models:
+        docs = env[model_name].search([('blob_id', '=', False)])
+        old_files = attachments.search([
+            ('res_model', '=', model_name),
+            ('res_field', '=', 'file'),
+            ('res_id', 'in', docs.ids),
+        ])
+        by_doc = {attachment.res_id: attachment for attachment in old_files}
+        for doc in docs:
+            attachment = by_doc.get(doc.id)
+            if attachment and attachment.datas:
+                doc.blob_id = blobs._get_or_create(attachment.datas)
+        _logger.info("Daedaly: %s file di %s spostati su blob deduplicati", len(by_doc), model_name)
+        old_files.unlink()
+    blobs.search([])._update_ref_counts()
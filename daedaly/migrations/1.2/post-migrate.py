@@ -0,0 +1,30 @@
+import logging
+
+from odoo import SUPERUSER_ID, api
+
+_logger = logging.getLogger(__name__)
+
+
+def migrate(cr, version):
+    """Extract again the files that only the PDF reader refused.
+
+    Until 1.1 every file was read as a PDF: text, HTML, e-mail and office
+    documents ended in error and are now handled by the extractor registry.
+    The file name of the documentation lines is copied to their blob, so the
+    extension can be used to recognize the format.
+    """
+    if not version:
+        return
+    for table in ('project_documentation', 'task_documentation'):
+        cr.execute(f"""
+            UPDATE daedaly_document_blob b
+               SET filename = d.filename
+              FROM {table} d
+             WHERE d.blob_id = b.id AND b.filename IS NULL AND d.filename IS NOT NULL
+        """)
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    blobs = env['daedaly.document.blob'].search([('processing_state', '=', 'error')])
+    blobs.write({'processing_state': 'pending', 'extract_error': False, 'text_date': False, 'text': False})
+    _logger.info("Daedaly: %s file in errore rimessi in coda per l'estrazione", len(blobs))
+    if blobs:
+        blobs._schedule_processing()
@@ -1,6 +1,15 @@
 from . import ir_config
 from . import gpt_api_helper
+from . import ai_call
+from . import token_ledger
+from . import pipeline_stage
+from . import metric
+from . import provider_status
+from . import routing_rule
+from . import document_blob
 from . import project_documentation
+from . import speculative_result
+from . import assignee_recommender
 from . import task_documentation
 from . import res_config_settings
 
@@ -0,0 +1,213 @@
+import functools
+import logging
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from odoo import api, fields, models, tools, SUPERUSER_ID
+
+_logger = logging.getLogger(__name__)
+
+# Buffer per processo: (dbname, model) -> {'rows': [...], 'metrics': {(name, labels): delta}, 'since': monotonic}
+_BUFFERS = {}
+_BUFFER_LOCK = threading.Lock()
+
+
+def _insert_rows(registry, model_name, rows, increments=None):
+    """Insert buffered telemetry rows and counter increments in a dedicated cursor (own transaction)."""
+    try:
+        with registry.cursor() as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            if rows:
+                env[model_name].create(rows)
+            if increments:
+                env['daedaly.metric']._increment(increments)
+    except Exception:
+        _logger.warning("Scrittura telemetria Daedaly fallita: %s righe %s scartate", len(rows), model_name, exc_info=True)
+
+
+def _start_insert(registry, model_name, buf):
+    threading.Thread(
+        target=_insert_rows,
+        args=(registry, model_name, buf['rows'], buf['metrics']),
+        name='daedaly-telemetry',
+        daemon=True,
+    ).start()
+
+
+def _flush_buffer(registry, dbname, model_name):
+    """Write in background whatever the process holds for ``model_name``."""
+    with _BUFFER_LOCK:
+        buf = _BUFFERS.pop((dbname, model_name), None)
+    if buf and (buf['rows'] or buf['metrics']):
+        _start_insert(registry, model_name, buf)
+
+
+class DaedalyTelemetryMixin(models.AbstractModel):
+    _name = 'daedaly.telemetry.mixin'
+    _description = 'Daedaly Buffered Telemetry'
+    _log_access = False
+    _telemetry_date_field = 'call_date'
+
+    @api.model
+    def _telemetry_enabled(self):
+        return bool(self.env['ir.config_parameter'].sudo().get_param('daedaly.telemetry_enabled'))
+
+    @api.model
+    def _telemetry_int_param(self, key, default):
+        try:
+            return int(self.env['ir.config_parameter'].sudo().get_param(key, default) or default)
+        except (TypeError, ValueError):
+            return default
+
+    @api.model
+    def _telemetry_metrics(self, rows):
+        """Return ``{(metric, labels): delta}`` to add to the monitoring counters."""
+        return {}
+
+    @api.model
+    def _buffer_push(self, vals):
+        """Queue a row; rows are inserted in batches outside the caller's transaction.
+
+        Writing through a separate cursor keeps the record even when the calling
+        action fails and rolls back, which is exactly when it matters most. The
+        buffer is also flushed when the caller's transaction ends (commit or
+        rollback), so rows never wait in a quiet worker for the batch to fill.
+        The monitoring counter increments of every row are summed in the same
+        buffer, even with telemetry off, and written with a single upsert per
+        flush.
+        """
+        increments = self._telemetry_metrics([vals])
+        enabled = self._telemetry_enabled()
+        if not enabled and not increments:
+            return
+        self._schedule_buffer_flush()
+        batch_size = self._telemetry_int_param('daedaly.telemetry_batch_size', 20)
+        flush_seconds = self._telemetry_int_param('daedaly.telemetry_flush_seconds', 60)
+        key = (self.env.cr.dbname, self._name)
+        now = time.monotonic()
+        full = None
+        with _BUFFER_LOCK:
+            buf = _BUFFERS.setdefault(key, {'rows': [], 'metrics': defaultdict(float), 'since': now})
+            if enabled:
+                buf['rows'].append(vals)
+            for series, delta in increments.items():
+                buf['metrics'][series] += delta
+            if len(buf['rows']) >= batch_size or now - buf['since'] >= flush_seconds:
+                full = _BUFFERS.pop(key)
+        if full:
+            _start_insert(self.pool, self._name, full)
+
+    @api.model
+    def _schedule_buffer_flush(self):
+        cr = self.env.cr
+        key = f'daedaly.telemetry.{self._name}'
+        for callbacks in (cr.postcommit, cr.postrollback):
+            if not callbacks.data.get(key):
+                callbacks.data[key] = True
+                callbacks.add(functools.partial(_flush_buffer, self.pool, cr.dbname, self._name))
+
+    @api.model
+    def _telemetry_flush(self):
+        """Synchronously write whatever this process still holds in its buffer."""
+        with _BUFFER_LOCK:
+            buf = _BUFFERS.pop((self.env.cr.dbname, self._name), None)
+        if buf and (buf['rows'] or buf['metrics']):
+            _insert_rows(self.pool, self._name, buf['rows'], buf['metrics'])
+            return len(buf['rows'])
+        return 0
+
+    @api.model
+    def _cron_gc_telemetry(self):
+        self._telemetry_flush()
+        days = self._telemetry_int_param('daedaly.telemetry_retention_days', 30)
+        cutoff = fields.Datetime.now() - timedelta(days=days)
+        self.env.cr.execute(
+            f'DELETE FROM "{self._table}" WHERE "{self._telemetry_date_field}" < %s',
+            [cutoff],
+        )
+        _logger.info("Telemetria Daedaly %s: eliminate %s righe più vecchie di %s giorni", self._name, self.env.cr.rowcount, days)
+
+
+class DaedalyAICall(models.Model):
+    _name = 'daedaly.ai.call'
+    _inherit = 'daedaly.telemetry.mixin'
+    _description = 'Daedaly AI Call'
+    _order = 'call_date desc, id desc'
+    _rec_name = 'action'
+
+    call_date = fields.Datetime(string='Date', default=fields.Datetime.now, index=True, readonly=True)
+    provider = fields.Char(string='Provider', index=True, readonly=True)
+    model_name = fields.Char(string='Model', readonly=True)
+    action = fields.Char(string='Action', index=True, readonly=True)
+    res_model = fields.Char(string='Record Model', readonly=True)
+    res_id = fields.Many2oneReference(string='Record ID', model_field='res_model', readonly=True)
+    company_id = fields.Many2one('res.company', string='Company', readonly=True)
+    user_id = fields.Many2one('res.users', string='User', readonly=True)
+    prompt_chars = fields.Integer(string='Prompt Chars', readonly=True)
+    prompt_tokens = fields.Integer(string='Prompt Tokens', readonly=True)
+    output_chars = fields.Integer(string='Output Chars', readonly=True)
+    output_tokens = fields.Integer(string='Output Tokens', readonly=True)
+    tokens_estimated = fields.Boolean(
+        string='Estimated Tokens', readonly=True,
+        help='Conteggio token stimato dai caratteri perché il provider non ha restituito i dati di utilizzo.'
+    )
+    latency_ms = fields.Float(string='Latency (ms)', readonly=True, aggregator='avg')
+    ttfb_ms = fields.Float(string='Time to First Byte (ms)', readonly=True, aggregator='avg')
+    cache_hit = fields.Boolean(string='Cache Hit', readonly=True)
+    success = fields.Boolean(string='Success', default=True, readonly=True)
+    error_class = fields.Char(string='Error Class', index=True, readonly=True)
+    error_message = fields.Char(string='Error', readonly=True)
+
+    @api.model
+    def _telemetry_metrics(self, rows):
+        return self.env['daedaly.metric']._ai_call_increments(rows)
+
+
+class DaedalyAICallReport(models.Model):
+    _name = 'daedaly.ai.call.report'
+    _description = 'Daedaly AI Call Statistics'
+    _auto = False
+    _order = 'date desc'
+
+    date = fields.Date(string='Date', readonly=True)
+    provider = fields.Char(string='Provider', readonly=True)
+    model_name = fields.Char(string='Model', readonly=True)
+    action = fields.Char(string='Action', readonly=True)
+    company_id = fields.Many2one('res.company', string='Company', readonly=True)
+    call_count = fields.Integer(string='Calls', readonly=True)
+    error_count = fields.Integer(string='Errors', readonly=True)
+    cache_hit_count = fields.Integer(string='Cache Hits', readonly=True)
+    latency_avg = fields.Float(string='Avg Latency (ms)', readonly=True, aggregator='avg')
+    # I percentili non sono additivi: nei raggruppamenti si mostra il valore peggiore
+    latency_p50 = fields.Float(string='p50 Latency (ms)', readonly=True, aggregator='max')
+    latency_p95 = fields.Float(string='p95 Latency (ms)', readonly=True, aggregator='max')
+    ttfb_p50 = fields.Float(string='p50 TTFB (ms)', readonly=True, aggregator='max')
+    prompt_tokens = fields.Integer(string='Prompt Tokens', readonly=True)
+    output_tokens = fields.Integer(string='Output Tokens', readonly=True)
+
+    def init(self):
+        tools.drop_view_if_exists(self.env.cr, self._table)
+        self.env.cr.execute(f"""
+            CREATE OR REPLACE VIEW {self._table} AS (
+                SELECT
+                    MIN(c.id) AS id,
+                    c.call_date::date AS date,
+                    c.provider,
+                    c.model_name,
+                    c.action,
+                    c.company_id,
+                    COUNT(*) AS call_count,
+                    COUNT(*) FILTER (WHERE c.success IS NOT TRUE) AS error_count,
+                    COUNT(*) FILTER (WHERE c.cache_hit) AS cache_hit_count,
+                    AVG(c.latency_ms) AS latency_avg,
+                    percentile_cont(0.5) WITHIN GROUP (ORDER BY c.latency_ms) AS latency_p50,
+                    percentile_cont(0.95) WITHIN GROUP (ORDER BY c.latency_ms) AS latency_p95,
+                    percentile_cont(0.5) WITHIN GROUP (ORDER BY c.ttfb_ms) AS ttfb_p50,
+                    SUM(c.prompt_tokens) AS prompt_tokens,
+                    SUM(c.output_tokens) AS output_tokens
+                FROM daedaly_ai_call c
+                GROUP BY c.call_date::date, c.provider, c.model_name, c.action, c.company_id
+            )
+        """)
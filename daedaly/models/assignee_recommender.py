@@ -0,0 +1,128 @@
+import base64
+import hashlib
+import logging
+from collections import defaultdict
+
+from odoo import api, models
+
+from .. import providers
+from ..tools import profiling, vectors
+
+_logger = logging.getLogger(__name__)
+
+
+class AssigneeRecommender(models.AbstractModel):
+    """Suggest task assignees by comparing embedding vectors in process.
+
+    Employee profiles and tasks are embedded once and the vector is stored
+    with a key made of the embedder and of the hash of the embedded text, so
+    only changed records are embedded again. Ranking is a single similarity
+    matrix, without any chat call. Vectors come from the embedding model of
+    the local gateway when configured, otherwise from the built-in hashed
+    TF-IDF embedding.
+    """
+    _name = 'daedaly.assignee.recommender'
+    _description = 'Daedaly Assignee Recommender'
+
+    @api.model
+    def _embedder(self, builtin=False):
+        """Return ``(key, config)``; ``config`` is None for the built-in embedding."""
+        config = self.env['daedaly.gpt_api_helper'].get_config()
+        model_name = (config.get('local_embedding_model') or '').strip()
+        plugin = providers.get('local')
+        if not builtin and model_name and plugin is not None and plugin.is_configured(config):
+            return f"local:{model_name}", config
+        return f"tfidf:{vectors.DEFAULT_DIM}", None
+
+    @api.model
+    def _embed(self, texts, config):
+        if config is None:
+            return [vectors.hashed_tf(text) for text in texts]
+        with profiling.stage('embed'):
+            return [vectors.normalize(vector) for vector in providers.get('local').embed(texts, config)]
+
+    @api.model
+    def _ensure_vectors(self, records, vector_field, key_field, texts, embedder):
+        """Return ``{id: vector}``, embedding in one request the records whose text or embedder changed."""
+        key, config = embedder
+        result = {}
+        stale = []
+        for record in records:
+            record_key = f"{key}:{hashlib.sha256(texts[record.id].encode('utf-8')).hexdigest()[:16]}"
+            if record[key_field] == record_key and record[vector_field]:
+                result[record.id] = vectors.unpack(base64.b64decode(record[vector_field]))
+            else:
+                stale.append((record, record_key))
+        if stale:
+            embedded = self._embed([texts[record.id] for record, _key in stale], config)
+            for (record, record_key), vector in zip(stale, embedded):
+                record.write({vector_field: base64.b64encode(vectors.pack(vector)), key_field: record_key})
+                result[record.id] = vector
+        return result
+
+    @api.model
+    def _recommend(self, tasks, top_n=3):
+        """Return ``{task_id: [(employee, score), ...]}``, best first, among each project's candidates."""
+        candidates = {task.id: task.project_id._assignee_candidates() for task in tasks}
+        employees = self.env['hr.employee']
+        for project_candidates in candidates.values():
+            employees |= project_candidates
+        employees = employees.sudo()
+        employee_texts = {employee.id: employee._get_vector_text() for employee in employees}
+        employees = employees.filtered(lambda employee: employee_texts[employee.id])
+        if not employees or not tasks:
+            return {}
+        tasks = tasks.sudo()
+        task_texts = {task.id: task._get_vector_text() for task in tasks}
+        embedder = self._embedder()
+        try:
+            employee_vectors = self._ensure_vectors(
+                employees, 'daedaly_skill_vector', 'daedaly_vector_key', employee_texts, embedder)
+            task_vectors = self._ensure_vectors(tasks, 'daedaly_vector', 'daedaly_vector_key', task_texts, embedder)
+        except Exception:
+            if embedder[1] is None:
+                raise
+            _logger.warning("Daedaly: embedding dal gateway locale non riuscito, uso TF-IDF", exc_info=True)
+            embedder = self._embedder(builtin=True)
+            employee_vectors = self._ensure_vectors(
+                employees, 'daedaly_skill_vector', 'daedaly_vector_key', employee_texts, embedder)
+            task_vectors = self._ensure_vectors(tasks, 'daedaly_vector', 'daedaly_vector_key', task_texts, embedder)
+        employee_ids = list(employee_vectors)
+        column = {employee_id: index for index, employee_id in enumerate(employee_ids)}
+        with profiling.stage('rank'):
+            matrix = vectors.similarity_matrix(
+                [task_vectors[task.id] for task in tasks],
+                [employee_vectors[employee_id] for employee_id in employee_ids],
+                idf=embedder[1] is None,
+            )
+        recommendations = {}
+        for task, row in zip(tasks, matrix):
+            ranked = [
+                (employee, row[column[employee.id]])
+                for employee in candidates[task.id] if employee.id in column
+            ]
+            ranked.sort(key=lambda item: item[1], reverse=True)
+            recommendations[task.id] = ranked[:top_n]
+        return recommendations
+
+    @api.model
+    def _assign(self, tasks, replace=False):
+        """Assign each task its best candidate scoring at least ``daedaly.assignee_min_score``.
+
+        Without ``replace`` only the unassigned tasks change. Tasks going to
+        the same user are written together. Returns the recommendations.
+        """
+        icp = self.env['ir.config_parameter'].sudo()
+        min_score = float(icp.get_param('daedaly.assignee_min_score', 0.05) or 0.0)
+        recommendations = self._recommend(tasks)
+        by_user = defaultdict(lambda: self.env['project.task'])
+        for task in tasks:
+            if task.user_ids and not replace:
+                continue
+            ranked = recommendations.get(task.id)
+            if ranked and ranked[0][1] >= min_score:
+                by_user[ranked[0][0].user_id] |= task
+        for user, user_tasks in by_user.items():
+            user_tasks.write({'user_ids': [(6, 0, [user.id])]})
+        profiling.add_count('assign', sum(len(user_tasks) for user_tasks in by_user.values()))
+        return recommendations
@@ -0,0 +1,359 @@
+import base64
+import hashlib
+import json
+import logging
+import time
+
+import psycopg2
+
+from odoo import api, fields, models
+from odoo.tools.mimetypes import guess_mimetype
+
+from ..tools import deadline, dedup, estimate_tokens, profiling, text_index
+from ..tools.extractors import extract_pages
+from .gpt_api_helper import DeadlineError
+
+_logger = logging.getLogger(__name__)
+
+
+class DocumentBlob(models.Model):
+    """Documentation file stored once per content (SHA-256).
+
+    Project and task documentation lines point to a blob instead of holding
+    their own copy, so a PDF attached to a project and to many of its tasks
+    is stored, extracted and summarized once. ``ref_count`` is recomputed
+    from the referencing lines and unreferenced blobs are deleted.
+    """
+    _name = 'daedaly.document.blob'
+    _description = 'Daedaly Documentation File'
+    _rec_name = 'checksum'
+
+    # Modelli che referenziano i blob (ereditano daedaly.documentation.mixin)
+    _document_models = ('project.documentation', 'task.documentation')
+
+    checksum = fields.Char(required=True, index=True, readonly=True)
+    datas = fields.Binary(string='File', attachment=True, readonly=True)
+    mimetype = fields.Char(readonly=True)
+    filename = fields.Char(
+        string='File Name', readonly=True,
+        help="Nome del primo file caricato con questo contenuto: l'estensione aiuta a riconoscere il formato.",
+    )
+    file_size = fields.Integer(readonly=True)
+    ref_count = fields.Integer(string='References', readonly=True)
+    text = fields.Text(string='Extracted Text', readonly=True)
+    text_date = fields.Datetime(string='Extracted On', readonly=True)
+    extract_error = fields.Char(readonly=True)
+    processing_state = fields.Selection([
+        ('pending', 'Processing'),
+        ('done', 'Ready'),
+        ('error', 'Unreadable'),
+    ], string='Processing', default='pending', required=True, index=True, readonly=True)
+    page_count = fields.Integer(string='Pages', readonly=True)
+    extractor = fields.Char(readonly=True, help="Formato riconosciuto e lettore usato per estrarre il testo.")
+    char_count = fields.Integer(string='Characters', readonly=True)
+    word_count = fields.Integer(string='Words', readonly=True)
+    language = fields.Char(readonly=True, help="Lingua prevalente rilevata nel testo (codice ISO 639-1).")
+    digest = fields.Text(string='Summary', readonly=True)
+    digest_date = fields.Datetime(string='Summarized On', readonly=True)
+    term_index = fields.Text(string='Keyword Index', readonly=True, help="JSON {termine: occorrenze} dei termini più frequenti.")
+    index_date = fields.Datetime(string='Indexed On', readonly=True)
+
+    _sql_constraints = [
+        ('checksum_uniq', 'unique(checksum)', 'Esiste già un file con lo stesso contenuto.'),
+    ]
+
+    @api.model
+    def _get_or_create(self, datas, filename=None):
+        """Return the blob holding base64 ``datas``, creating it if needed."""
+        raw = base64.b64decode(datas)
+        checksum = hashlib.sha256(raw).hexdigest()
+        blob = self.search([('checksum', '=', checksum)], limit=1)
+        if blob:
+            if filename and not blob.filename:
+                blob.filename = filename
+            return blob
+        try:
+            with self.env.cr.savepoint():
+                return self.create({
+                    'checksum': checksum,
+                    'datas': datas,
+                    'mimetype': guess_mimetype(raw),
+                    'filename': filename,
+                    'file_size': len(raw),
+                })
+        except psycopg2.IntegrityError:
+            # Caricato in parallelo da un'altra transazione
+            return self.search([('checksum', '=', checksum)], limit=1)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        blobs = super().create(vals_list)
+        # L'estrazione parte dopo il commit del caricamento, fuori dalla richiesta utente
+        self._schedule_processing()
+        return blobs
+
+    @api.model
+    def _schedule_processing(self):
+        cron = self.env.ref('daedaly.ir_cron_daedaly_document_extract', raise_if_not_found=False)
+        if cron:
+            cron.sudo()._trigger()
+
+    def _update_ref_counts(self):
+        """Recount the documentation lines using each blob; drop unused blobs."""
+        blobs = self.exists()
+        if not blobs:
+            return
+        counts = dict.fromkeys(blobs.ids, 0)
+        for model_name in self._document_models:
+            groups = self.env[model_name].sudo()._read_group(
+                [('blob_id', 'in', blobs.ids)], ['blob_id'], ['__count'],
+            )
+            for blob, count in groups:
+                counts[blob.id] += count
+        for blob in blobs:
+            if blob.ref_count != counts[blob.id]:
+                blob.ref_count = counts[blob.id]
+        orphans = blobs.filtered(lambda b: not counts[b.id])
+        if orphans:
+            _logger.info("Daedaly: eliminati %s file di documentazione non più referenziati", len(orphans))
+            orphans.unlink()
+
+    def _process(self):
+        """Extract text, page count, language and size stats of each blob."""
+        for blob in self:
+            with profiling.stage('extract'):
+                pages, error, extractor = extract_pages(blob.datas, blob.mimetype, blob.filename)
+            if pages is None:
+                blob.write({'processing_state': 'error', 'extract_error': error, 'extractor': extractor})
+                continue
+            # Le pagine restano separate da un form feed per riconoscere intestazioni e piè di pagina
+            text = dedup.PAGE_BREAK.join(pages)
+            blob.write({
+                'text': text,
+                'text_date': fields.Datetime.now(),
+                'extract_error': False,
+                'processing_state': 'done',
+                'extractor': extractor,
+                'page_count': len(pages),
+                'char_count': len(text),
+                'word_count': len(text.split()),
+                'language': text_index.detect_language(text),
+            })
+
+    def _get_text(self):
+        """Return the extracted text, extracting (once per content) if needed.
+
+        Raises :class:`DeadlineError` when the file is still pending and the
+        action has no time left to extract it.
+        """
+        self.ensure_one()
+        if not self.text_date:
+            if self.processing_state == 'pending' and deadline.expired(self._extract_reserve_seconds()):
+                # Poco tempo rimasto all'azione: il file resta al job in background e il
+                # record viene rimandato, invece di generare con un documento mancante
+                self._schedule_processing()
+                raise DeadlineError(
+                    "Documento ancora in elaborazione e tempo disponibile per l'azione esaurito: "
+                    "rilancia l'azione quando l'estrazione è completata."
+                )
+            # Il job in background non è ancora passato: si estrae subito
+            self._process()
+            if not self.text_date:
+                return self.extract_error
+        return self.text or ''
+
+    @api.model
+    def _extract_reserve_seconds(self):
+        """Time an action must have left to extract a file on demand.
+
+        Twice the minimum provider call time, so extraction never eats the
+        time the call itself needs.
+        """
+        return 2 * self.env['daedaly.gpt_api_helper']._min_call_seconds()
+
+    @api.model
+    def _cron_process_pending(self):
+        """Process the blobs uploaded since the last run, one commit per file.
+
+        Triggered right after each upload; stops at
+        ``daedaly.extraction_max_seconds`` and re-triggers itself when files
+        are left over.
+        """
+        helper = self.env['daedaly.gpt_api_helper']
+        started = time.monotonic()
+        max_seconds = helper._int_param('daedaly.extraction_max_seconds', 300)
+        queue = self.sudo().search([('processing_state', '=', 'pending')], order='id')
+        done = 0
+        for blob in queue:
+            if time.monotonic() - started > max_seconds:
+                break
+            try:
+                with self.env['daedaly.pipeline.stage']._profile_run('document_extract', blob):
+                    blob._process()
+                self.env.cr.commit()
+                done += 1
+            except Exception:
+                self.env.cr.rollback()
+                _logger.warning("Estrazione Daedaly del file %s fallita", blob.checksum, exc_info=True)
+                # Nel frattempo un'azione utente può aver estratto lo stesso file: si segna
+                # l'errore solo se è ancora in attesa
+                self.env.cr.execute(
+                    f"""UPDATE {self._table} SET processing_state = 'error', extract_error = %s
+                         WHERE id = %s AND processing_state = 'pending'""",
+                    ["Estrazione non riuscita", blob.id],
+                )
+                blob.invalidate_recordset(['processing_state', 'extract_error'])
+                self.env.cr.commit()
+        if done < len(queue):
+            self._schedule_processing()
+        return done
+
+    def _get_terms(self):
+        self.ensure_one()
+        if not self.index_date:
+            text = self._get_text()
+            if not self.text_date:
+                return {}
+            self.write({
+                'term_index': json.dumps(text_index.term_frequencies(text)),
+                'index_date': fields.Datetime.now(),
+            })
+        return json.loads(self.term_index or '{}')
+
+    def _build_digest_prompt(self, max_tokens):
+        self.ensure_one()
+        text = self._get_text()
+        # Il riassunto lavora su un estratto limitato per rispettare il budget
+        text = text[:max_tokens * 4]
+        return (
+            "Riassumi il seguente documento di progetto in italiano, in testo semplice senza markdown. "
+            "Mantieni requisiti, vincoli, scadenze, importi, attori, rischi e decisioni; elimina ripetizioni, "
+            "intestazioni e formule di rito. Massimo 300 parole.\n\n"
+            f"Documento:\n{text}"
+        )
+
+    def _generate_digest(self, max_tokens=20000):
+        self.ensure_one()
+        prompt = self._build_digest_prompt(max_tokens)
+        digest = self.env['daedaly.gpt_api_helper'].chat(prompt, action='document_digest', record=self)
+        self.write({'digest': (digest or '').strip(), 'digest_date': fields.Datetime.now()})
+        return self.digest
+
+    @api.model
+    def _prewarm_queue(self, with_digests):
+        """Return the blobs still missing text, index or summary.
+
+        Files of documentation lines changed since the last completed run come
+        first; anything left over from an interrupted run follows.
+        """
+        pending = ['|', ('text_date', '=', False), ('index_date', '=', False)]
+        if with_digests:
+            pending = ['|'] + pending + [('digest_date', '=', False)]
+        # I file illeggibili restano esclusi: l'estrazione si ritenta solo al primo uso interattivo
+        domain = [('ref_count', '>', 0), ('extract_error', '=', False)] + pending
+        queue = self.search(domain, order='id desc')
+        last_run = self.env['ir.config_parameter'].sudo().get_param('daedaly.prewarm_last_run')
+        if not last_run:
+            return queue
+        changed = self.browse()
+        for model_name in self._document_models:
+            changed |= self.env[model_name].sudo().search([('write_date', '>', last_run)]).mapped('blob_id')
+        return (queue & changed) | (queue - changed)
+
+    @api.model
+    def _cron_prewarm(self):
+        """Precompute text, keyword index and summaries off-peak.
+
+        Work stops at ``daedaly.prewarm_max_seconds`` or when the summaries
+        would exceed ``daedaly.prewarm_max_tokens``; every file is committed
+        on its own so the next run resumes where this one stopped.
+        """
+        icp = self.env['ir.config_parameter'].sudo()
+        helper = self.env['daedaly.gpt_api_helper']
+        started = time.monotonic()
+        run_started = fields.Datetime.now()
+        max_seconds = helper._int_param('daedaly.prewarm_max_seconds', 1800)
+        token_budget = helper._int_param('daedaly.prewarm_max_tokens', 200000)
+        doc_max_tokens = helper._int_param('daedaly.prewarm_doc_max_tokens', 20000)
+        with_digests = bool(icp.get_param('daedaly.prewarm_digests'))
+        queue = self.sudo()._prewarm_queue(with_digests)
+        done = 0
+        tokens_used = 0
+        for blob in queue:
+            if time.monotonic() - started > max_seconds:
+                break
+            try:
+                blob._get_text()
+                blob._get_terms()
+                if with_digests and blob.text_date and not blob.digest_date:
+                    cost = min(estimate_tokens(blob.text), doc_max_tokens)
+                    if tokens_used + cost <= token_budget:
+                        blob._generate_digest(doc_max_tokens)
+                        tokens_used += cost
+                self.env.cr.commit()
+                done += 1
+            except Exception:
+                self.env.cr.rollback()
+                _logger.warning("Pre-calcolo Daedaly del file %s fallito", blob.checksum, exc_info=True)
+                # Provider non disponibile: i riassunti riprendono alla prossima esecuzione
+                with_digests = False
+        remaining = len(self.sudo()._prewarm_queue(with_digests))
+        _logger.info(
+            "Pre-calcolo Daedaly: %s file elaborati, %s rimanenti, %s token in %.0f s",
+            done, remaining, tokens_used, time.monotonic() - started,
+        )
+        if not remaining:
+            icp.set_param('daedaly.prewarm_last_run', fields.Datetime.to_string(run_started))
+        return done
+
+
+class DocumentationMixin(models.AbstractModel):
+    _name = 'daedaly.documentation.mixin'
+    _description = 'Daedaly Documentation Line'
+
+    blob_id = fields.Many2one('daedaly.document.blob', string='Stored File', ondelete='restrict', index=True, readonly=True)
+    file = fields.Binary(string='File', required=True, compute='_compute_file', inverse='_inverse_file')
+    checksum = fields.Char(related='blob_id.checksum', string='Checksum')
+    processing_state = fields.Selection(related='blob_id.processing_state', string='Processing')
+    page_count = fields.Integer(related='blob_id.page_count', string='Pages')
+    language = fields.Char(related='blob_id.language', string='Language')
+
+    @api.depends('blob_id')
+    def _compute_file(self):
+        for doc in self:
+            doc.file = doc.blob_id.sudo().datas
+
+    def _inverse_file(self):
+        blobs = self.env['daedaly.document.blob'].sudo()
+        previous = self.mapped('blob_id')
+        for doc in self:
+            doc.blob_id = blobs._get_or_create(doc.file, doc.filename) if doc.file else False
+        (previous | self.mapped('blob_id')).sudo()._update_ref_counts()
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        # Le copie (copy()) riusano il blob senza passare dall'inverse
+        records.mapped('blob_id').sudo()._update_ref_counts()
+        return records
+
+    def unlink(self):
+        blobs = self.sudo().mapped('blob_id')
+        res = super().unlink()
+        blobs._update_ref_counts()
+        return res
+
+    def _get_text(self):
+        self.ensure_one()
+        if not self.blob_id:
+            return ''
+        return self.blob_id.sudo()._get_text()
+
+    def _get_prompt_text(self):
+        """Text to put in a prompt: the summary for long documents when enabled."""
+        self.ensure_one()
+        blob = self.blob_id.sudo()
+        threshold = self.env['daedaly.gpt_api_helper']._int_param('daedaly.digest_threshold_tokens', 0)
+        if threshold and blob.digest and estimate_tokens(blob.text) > threshold:
+            return f"(riassunto del documento)\n{blob.digest}"
+        return self._get_text()
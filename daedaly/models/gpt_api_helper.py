@@ -1,13 +1,29 @@
-from odoo import models
+import hashlib
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from odoo import models, tools
 from odoo.exceptions import UserError
-try:
-    import google.generativeai as genai  # type: ignore
-except Exception:
-    genai = None
-try:
-    import requests  # type: ignore
-except Exception:
-    requests = None
+
+from .. import providers
+from ..tools import deadline, estimate_tokens
+
+_logger = logging.getLogger(__name__)
+
+
+class SingleFlightError(UserError):
+    """An identical AI request is already running in another transaction."""
+
+
+class DeadlineError(UserError):
+    """Not enough time is left in the action's budget to call a provider."""
+
+
+class BudgetExceededError(UserError):
+    """The call would exceed a company or project token budget."""
 
 
 class GPTAPIHelper(models.AbstractModel):
@@ -19,6 +35,7 @@ class GPTAPIHelper(models.AbstractModel):
         return {
             'model': icp.get_param('daedaly.what_gpt_use', 'openai'),
             'openai_key': icp.get_param('daedaly.openai_key', ''),
+            'openai_model': icp.get_param('daedaly.openai_model', 'gpt-4o-mini'),
             'gemini_key': icp.get_param('daedaly.gemini_key', ''),
             'gemini_model': icp.get_param('daedaly.gemini_model', 'models/gemini-flash-latest'),
             'deepseek_key': icp.get_param('daedaly.deepseek_key', ''),
@@ -26,150 +43,426 @@ class GPTAPIHelper(models.AbstractModel):
             'local_gateway_url': icp.get_param('daedaly.local_gateway_url', 'http://localhost:11434/api/generate'),
             'local_model_name': icp.get_param('daedaly.local_model_name', 'llama3'),
             'local_extra_headers': icp.get_param('daedaly.local_extra_headers', ''),
+            'agent_url': icp.get_param('daedaly.agent_url', ''),
+            'local_protocol': icp.get_param('daedaly.local_protocol', 'ollama_generate'),
+            'local_keep_alive': icp.get_param('daedaly.local_keep_alive', '30m'),
+            'local_num_ctx': self._int_param('daedaly.local_num_ctx', 0),
+            'local_max_ctx': self._int_param('daedaly.local_max_ctx', 32768),
+            'local_num_predict': self._int_param('daedaly.local_num_predict', 0),
+            'local_options': icp.get_param('daedaly.local_options', ''),
+            'local_batching': bool(icp.get_param('daedaly.local_batching')),
+            'local_embedding_model': icp.get_param('daedaly.local_embedding_model', ''),
+            'max_parallel_calls': self._int_param('daedaly.max_parallel_calls', 4),
         }
 
-    def chat(self, prompt):
-        config = self.get_config()
-        model = config['model']
-
-        if model == 'openai':
-            return self._chat_openai(prompt, config['openai_key'])
-        elif model == 'gemini':
-            return self._chat_gemini(prompt, config['gemini_key'], config['gemini_model'])
-        elif model == 'deepseek':
-            return self._chat_deepseek(prompt, config['deepseek_key'], config['deepseek_model'])
-        elif model == 'local':
-            return self._chat_local(prompt, config['local_gateway_url'], config['local_model_name'], config['local_extra_headers'])
-        else:
-            raise UserError("Nessun modello GPT configurato nelle impostazioni Daedaly.")
-
-    def _chat_openai(self, prompt, key):
-        default_model = "gpt-4o-mini"
+    def _int_param(self, key, default):
         try:
-            try:
-                from openai import OpenAI  # SDK >= 1.0
-                client = OpenAI(api_key=key)
-                resp = client.chat.completions.create(
-                    model=default_model,
-                    messages=[{"role": "user", "content": prompt}],
-                )
-                return str(resp.choices[0].message.content)
-            except ImportError:
-                import openai  # type: ignore
-                openai.api_key = key
-                resp = openai.ChatCompletion.create(
-                    model=default_model,
-                    messages=[{"role": "user", "content": prompt}],
-                )
-                return resp['choices'][0]['message']['content']
-        except Exception as e:
-            raise UserError(f"OpenAI Error: {str(e)}")
+            return int(self.env['ir.config_parameter'].sudo().get_param(key, default) or default)
+        except (TypeError, ValueError):
+            return default
 
-    def _chat_gemini(self, prompt, key, model_name):
+    def chat(self, prompt, action=None, record=None, provider=None):
+        """Send ``prompt`` to the provider chosen by the routing rules (or ``provider``)."""
+        config = self.get_config()
+        prompt_tokens = estimate_tokens(prompt)
+        reroute = provider is None
+        if reroute:
+            provider, config = self._route(config, action, prompt_tokens)
+        config = self._limit_output(config, action)
+        provider, config, charge, reservation = self._admit(
+            provider, config, record, prompt_tokens, reroute=reroute, action=action,
+        )
+        ledger = self.env['daedaly.token.ledger']
         try:
-            if genai is None:
-                raise ImportError("google-generativeai not installed")
-            if not key:
-                raise UserError("Gemini API key non configurata.")
-            genai.configure(api_key=key)
-            model_name = model_name or 'models/gemini-flash-latest'
-            if not model_name.startswith('models/'):
-                model_name = f"models/{model_name}"
-            model = genai.GenerativeModel(model_name=model_name)
-            response = model.generate_content(prompt)
-            if hasattr(response, 'text') and response.text:
-                return response.text
-            # Some SDK versions return candidates instead of text
-            candidates = getattr(response, 'candidates', []) or []
-            for candidate in candidates:
-                content = getattr(candidate, 'content', None)
-                if not content:
-                    continue
-                parts = getattr(content, 'parts', []) or []
-                texts = [getattr(part, 'text', '') for part in parts if getattr(part, 'text', '')]
-                if texts:
-                    return "\n".join(texts)
-            raise UserError("Gemini non ha restituito contenuti testuali.")
+            config = self._limit_time(config)
+            self._claim_single_flight(action, record, prompt)
+        except Exception:
+            ledger._release(reservation)
+            raise
+        stats = {}
+        started = time.perf_counter()
+        text = None
+        error = None
+        try:
+            text = self._dispatch_chat(prompt, config, stats, provider=provider)
+            return text
         except Exception as e:
-            raise UserError(f"Gemini Error: {str(e)}")
-
-    def _chat_deepseek(self, prompt, key, model_name):
-        if not key:
-            raise UserError("DeepSeek API key non configurata.")
-        if requests is None:
-            raise UserError("La libreria 'requests' non è disponibile per le chiamate DeepSeek.")
-        model_name = (model_name or 'deepseek-chat').strip() or 'deepseek-chat'
-        url = "https://api.deepseek.com/v1/chat/completions"
-        headers = {
-            "Authorization": f"Bearer {key}",
-            "Content-Type": "application/json",
+            error = e
+            raise
+        finally:
+            self._record_ai_call(
+                provider, prompt, text, started, stats,
+                error=error, action=action, record=record,
+            )
+            ledger._record([
+                self._ledger_entry(charge, provider, prompt, text, stats, action, error),
+            ], reservation)
+
+    def _deadline_seconds(self):
+        """Time budget of an interactive action.
+
+        ``daedaly.action_deadline_seconds`` when set, otherwise the worker's
+        ``limit_time_real`` (prefork mode only, where it is enforced) minus
+        ``daedaly.deadline_margin_seconds`` kept for applying the results and
+        committing. 0 means no deadline.
+        """
+        seconds = self._int_param('daedaly.action_deadline_seconds', 0)
+        if seconds:
+            return seconds
+        if not tools.config.get('workers'):
+            return 0
+        limit = tools.config.get('limit_time_real') or 0
+        if limit <= 0:
+            return 0
+        return max(limit - self._int_param('daedaly.deadline_margin_seconds', 15), 1)
+
+    def _action_deadline(self):
+        """Context manager binding the action deadline to the current thread."""
+        return deadline.scope(self._deadline_seconds())
+
+    def _min_call_seconds(self):
+        return self._int_param('daedaly.deadline_min_call_seconds', 20)
+
+    def _limit_time(self, config):
+        """Cap the provider timeout to the time left; refuse the call when too little is left."""
+        left = deadline.remaining()
+        if left is None:
+            return config
+        if left < self._min_call_seconds():
+            raise DeadlineError(
+                "Tempo disponibile per l'azione esaurito: i risultati già completi sono stati salvati, "
+                "rilancia l'azione per completare il resto."
+            )
+        return dict(config, timeout=left)
+
+    def _run_until_deadline(self, records, callback):
+        """Call ``callback(record)`` for each record within the action deadline.
+
+        Results of the records already processed are kept when time or the
+        token budget runs out; the records left undone are returned (empty
+        when all are done).
+        The first record always runs, so its errors reach the user.
+        """
+        with self._action_deadline():
+            for index, record in enumerate(records):
+                if index and deadline.expired(self._min_call_seconds()):
+                    return records[index:]
+                try:
+                    callback(record)
+                except (DeadlineError, BudgetExceededError):
+                    if not index:
+                        raise
+                    return records[index:]
+        return records.browse()
+
+    def _deadline_notification(self, skipped, next_action=None):
+        """Client action telling the user which records were left for a new run."""
+        _logger.info("Daedaly: tempo esaurito, %s record non elaborati: %s", len(skipped), skipped.ids)
+        params = {
+            'title': "Daedaly: elaborazione parziale",
+            'message': "Tempo disponibile o budget di token esaurito. Risultati salvati; da rilanciare per: "
+                       + ", ".join(skipped.mapped('display_name')),
+            'type': 'warning',
+            'sticky': True,
         }
-        payload = {
-            "model": model_name,
-            "messages": [
-                {"role": "user", "content": prompt},
-            ],
-            "stream": False,
+        if next_action:
+            params['next'] = next_action
+        return {'type': 'ir.actions.client', 'tag': 'display_notification', 'params': params}
+
+    def _claim_single_flight(self, action, record, prompt):
+        """Refuse a call identical to one still running in another transaction.
+
+        The key is (action, record, prompt hash), held with a PostgreSQL
+        transaction-level advisory lock: it spans every worker and is
+        released when the caller commits or rolls back, after the result has
+        been applied. A double click or two users on the same record get a
+        message instead of a second provider call and duplicated records.
+        """
+        if not record:
+            return
+        action = action or self.env.context.get('daedaly_action') or ''
+        digest = hashlib.sha256(
+            f"{action}\x00{record._name}\x00{record.id}\x00{prompt}".encode('utf-8')
+        ).digest()
+        self.env.cr.execute("SELECT pg_try_advisory_xact_lock(%s)", [int.from_bytes(digest[:8], 'big', signed=True)])
+        if not self.env.cr.fetchone()[0]:
+            raise SingleFlightError(
+                f"Daedaly sta già elaborando la stessa richiesta per \"{record.display_name}\". "
+                "Attendi il completamento e ricarica la pagina."
+            )
+
+    def _budget_scope(self, record):
+        """Return ``(company, project)`` charged for a call on ``record``."""
+        company = self.env.company
+        project = self.env['project.project']
+        if record:
+            if 'company_id' in record._fields and record.company_id:
+                company = record.company_id
+            if record._name == 'project.project':
+                project = record
+            elif 'project_id' in record._fields and record.project_id:
+                project = record.project_id
+        return company, project
+
+    def _output_estimate(self, config):
+        """Answer tokens assumed when checking a budget."""
+        return config.get('max_output_tokens') or self._int_param('daedaly.budget_output_estimate_tokens', 1000)
+
+    def _admit(self, provider, config, record, prompt_tokens, calls=1, reroute=True, action=None):
+        """Check the token budgets before a call; return ``(provider, config, charge, reservation)``.
+
+        The estimate (prompt plus expected answer, for each of ``calls``) is
+        compared with the daily and monthly budgets of the record's company
+        and project. Past ``daedaly.budget_economy_percent`` of a budget the
+        call runs in economy mode: the answer is capped to
+        ``daedaly.budget_economy_output_tokens`` and, with ``reroute``, a
+        routing rule listing the ``budget_economy`` action picks a cheaper
+        model. A call that does not fit is refused. ``charge`` holds the
+        ledger values of the call; with budgets set, the estimate is reserved
+        in the ledger under a per company and project lock until the call is
+        recorded, and ``reservation`` is the id of that row (None otherwise).
+        """
+        company, project = self._budget_scope(record)
+        ledger = self.env['daedaly.token.ledger']
+        estimate = prompt_tokens + calls * self._output_estimate(config)
+        charge = {
+            'company_id': company.id,
+            'project_id': project.id or False,
+            'estimated_tokens': estimate // calls,
+            'economy': False,
         }
+        if not ledger._has_budgets(company, project):
+            return provider, config, charge, None
+        with ledger._budget_lock(company, project) as locked:
+            budgets = locked._budgets(company, project)
+            economy = False
+            percent = self._int_param('daedaly.budget_economy_percent', 80)
+            if any(used + estimate > limit * percent / 100.0 for _label, limit, used in budgets):
+                economy = True
+                cap = self._int_param('daedaly.budget_economy_output_tokens', 800)
+                config = dict(config, max_output_tokens=min(config.get('max_output_tokens') or cap, cap))
+                routed = self.env['daedaly.routing.rule']._route_economy(config, prompt_tokens // calls) if reroute else None
+                if routed:
+                    provider, config = routed
+                estimate = prompt_tokens + calls * config['max_output_tokens']
+                _logger.info("Daedaly: budget token quasi esaurito, chiamata in modalità ridotta (%s)", provider)
+            for label, limit, used in budgets:
+                if used + estimate > limit:
+                    raise BudgetExceededError(
+                        f"Chiamata AI non eseguita: supererebbe il {label} "
+                        f"({used} token già usati su {limit}, richiesta stimata {estimate})."
+                    )
+            charge.update(estimated_tokens=estimate // calls, economy=economy)
+            reservation = locked._reserve(dict(
+                charge, action=action or self.env.context.get('daedaly_action'), provider=provider, total_tokens=estimate,
+            ))
+        return provider, config, charge, reservation
+
+    def _call_tokens(self, prompt, text, stats):
+        """Return ``(prompt_tokens, output_tokens, estimated)`` of a call."""
+        prompt_tokens = stats.get('prompt_tokens')
+        output_tokens = stats.get('output_tokens')
+        return (
+            prompt_tokens if prompt_tokens is not None else estimate_tokens(prompt or ''),
+            output_tokens if output_tokens is not None else estimate_tokens(text or ''),
+            prompt_tokens is None or output_tokens is None,
+        )
+
+    def _ledger_entry(self, charge, provider, prompt, text, stats, action, error):
+        prompt_tokens, output_tokens, estimated = self._call_tokens(prompt, text, stats)
+        if error is not None and stats.get('prompt_tokens') is None:
+            # Senza dati di utilizzo una chiamata fallita non viene addebitata
+            prompt_tokens = 0
+        return dict(
+            charge,
+            user_id=self.env.uid,
+            action=action or self.env.context.get('daedaly_action'),
+            provider=provider,
+            model_name=stats.get('model'),
+            prompt_tokens=prompt_tokens,
+            output_tokens=output_tokens,
+            total_tokens=prompt_tokens + output_tokens,
+            tokens_estimated=estimated,
+            success=error is None,
+        )
+
+    def _route(self, config, action, prompt_tokens):
+        """Return ``(provider, config)`` for a call; see ``daedaly.routing.rule``."""
+        action = action or self.env.context.get('daedaly_action')
+        return self.env['daedaly.routing.rule']._route(config, action, prompt_tokens)
+
+    def _output_token_limits(self):
+        """Return ``{action: max output tokens}`` from ``daedaly.output_token_limits``."""
+        raw = self.env['ir.config_parameter'].sudo().get_param('daedaly.output_token_limits')
+        if not raw:
+            return {}
+        try:
+            limits = json.loads(raw)
+        except ValueError:
+            _logger.warning("daedaly.output_token_limits non è un JSON valido: limiti ignorati")
+            return {}
+        return {action: int(limit) for action, limit in limits.items() if limit} if isinstance(limits, dict) else {}
+
+    def _limit_output(self, config, action):
+        action = action or self.env.context.get('daedaly_action')
+        limit = self._output_token_limits().get(action)
+        return dict(config, max_output_tokens=limit) if limit else config
+
+    def _get_provider(self, config, provider=None):
+        plugin = providers.get(provider or config['model'])
+        if plugin is None:
+            raise UserError("Nessun modello GPT configurato nelle impostazioni Daedaly.")
+        return plugin
+
+    def _provider_capabilities(self, config=None, provider=None):
+        config = config or self.get_config()
+        return self._get_provider(config, provider).capabilities(config)
+
+    def _dispatch_chat(self, prompt, config, stats, provider=None):
+        plugin = self._get_provider(config, provider)
         try:
-            response = requests.post(url, json=payload, headers=headers, timeout=60)
-            response.raise_for_status()
-            data = response.json()
-            choices = data.get('choices') or []
-            if not choices:
-                raise UserError(f"DeepSeek Error: risposta senza scelte valide ({data})")
-            message = choices[0].get('message', {})
-            content = message.get('content')
-            if not content:
-                raise UserError(f"DeepSeek Error: nessun contenuto nella risposta ({message})")
-            return content
+            return plugin.chat(prompt, config, stats)
+        except UserError:
+            raise
         except Exception as e:
-            raise UserError(f"DeepSeek Error: {str(e)}")
-
-    def _chat_local(self, prompt, url, model_name, extra_headers_json):
-        if requests is None:
-            raise UserError("La libreria 'requests' non è disponibile per le chiamate al gateway locale.")
-        url = (url or '').strip()
-        if not url:
-            raise UserError("URL del gateway locale non configurato.")
-        model_name = (model_name or '').strip()
-        if not model_name:
-            raise UserError("Nome del modello locale non configurato.")
-        headers = {"Content-Type": "application/json"}
-        if extra_headers_json:
-            import json
+            raise UserError(f"{plugin.label} Error: {str(e)}")
+
+    def _record_ai_call(self, provider, prompt, text, started, stats, error=None, action=None, record=None, cache_hit=False):
+        """Queue a ``daedaly.ai.call`` row describing one provider round trip."""
+        try:
+            prompt = prompt or ''
+            text = text or ''
+            prompt_tokens, output_tokens, estimated = self._call_tokens(prompt, text, stats)
+            vals = {
+                'provider': provider,
+                'model_name': stats.get('model'),
+                'action': action or self.env.context.get('daedaly_action'),
+                'company_id': self.env.company.id,
+                'user_id': self.env.uid,
+                'prompt_chars': len(prompt),
+                'prompt_tokens': prompt_tokens,
+                'output_chars': len(text),
+                'output_tokens': output_tokens,
+                'tokens_estimated': estimated,
+                'latency_ms': stats.get('latency_ms', (time.perf_counter() - started) * 1000.0),
+                'ttfb_ms': stats.get('ttfb_ms'),
+                'cache_hit': cache_hit,
+                'success': error is None,
+            }
+            if record:
+                vals['res_model'] = record._name
+                vals['res_id'] = record.id
+                if 'company_id' in record._fields and record.company_id:
+                    vals['company_id'] = record.company_id.id
+            if error is not None:
+                vals['error_class'] = type(error).__name__
+                vals['error_message'] = str(error)[:500]
+            self.env['daedaly.ai.call'].sudo()._buffer_push(vals)
+        except Exception:
+            # La telemetria non deve mai interrompere una chiamata AI
+            _logger.warning("Registrazione telemetria Daedaly fallita", exc_info=True)
+
+    def chat_many(self, prompts, action=None, records=None, raise_on_error=True):
+        """Run several independent prompts and return their texts in order.
+
+        When the provider declares batching (a local OpenAI-compatible server
+        with batching enabled) the prompts travel in a single request, letting
+        the server batch them on the GPU; otherwise they are sent concurrently
+        (``daedaly.max_parallel_calls`` at a time). Provider calls run in
+        worker threads but never touch the ORM; telemetry is recorded here.
+        With ``raise_on_error=False`` failed entries hold the exception.
+        """
+        prompts = list(prompts)
+        if not prompts:
+            return []
+        records = list(records) if records is not None else [None] * len(prompts)
+        for prompt, record in zip(prompts, records):
+            self._claim_single_flight(action, record, prompt)
+        # Un solo instradamento per tutto il gruppo, dimensionato sul prompt più lungo
+        provider, config = self._route(self.get_config(), action, max(estimate_tokens(p) for p in prompts))
+        config = self._limit_output(config, action)
+        # Budget verificato una volta per il gruppo intero
+        provider, config, charge, reservation = self._admit(
+            provider, config, next((r for r in records if r), None),
+            sum(estimate_tokens(p) for p in prompts), calls=len(prompts), action=action,
+        )
+        try:
+            config = self._limit_time(config)
+            plugin = self._get_provider(config, provider)
+        except Exception:
+            self.env['daedaly.token.ledger']._release(reservation)
+            raise
+        results = [None] * len(prompts)
+        call_stats = [{} for _prompt in prompts]
+
+        if plugin.capabilities(config)['batching'] and len(prompts) > 1:
+            started = time.perf_counter()
+            stats = {}
             try:
-                extra = json.loads(extra_headers_json)
-                if not isinstance(extra, dict):
-                    raise ValueError("Il valore non è un oggetto JSON.")
-                headers.update({str(k): str(v) for k, v in extra.items()})
+                results = plugin.chat_batch(prompts, config, stats)
             except Exception as e:
-                raise UserError(f"Local Gateway headers non validi: {str(e)}")
+                error = UserError(f"{plugin.label} Error: {str(e)}")
+                results = [error] * len(prompts)
+            # Un solo round trip: latenza condivisa, token ripartiti sui prompt
+            stats['latency_ms'] = (time.perf_counter() - started) * 1000.0
+            for index, prompt in enumerate(prompts):
+                call_stats[index] = dict(stats, prompt_tokens=None, output_tokens=None)
+        else:
+            def _run(index):
+                stats = call_stats[index]
+                started = time.perf_counter()
+                try:
+                    results[index] = self._dispatch_chat(prompts[index], config, stats, provider=provider)
+                except Exception as e:
+                    results[index] = e
+                stats['latency_ms'] = (time.perf_counter() - started) * 1000.0
 
-        payload = {
-            "model": model_name,
-            "prompt": prompt,
-            "stream": False,
-        }
+            workers = max(1, min(config['max_parallel_calls'], len(prompts)))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='daedaly-chat') as executor:
+                list(executor.map(_run, range(len(prompts))))
+
+        ledger = []
+        for index, prompt in enumerate(prompts):
+            result = results[index]
+            error = result if isinstance(result, Exception) else None
+            self._record_ai_call(
+                provider, prompt, None if error else result, time.perf_counter(), call_stats[index],
+                error=error, action=action, record=records[index],
+            )
+            ledger.append(self._ledger_entry(
+                dict(charge, estimated_tokens=estimate_tokens(prompt) + self._output_estimate(config)),
+                provider, prompt, None if error else result, call_stats[index], action, error,
+            ))
+        self.env['daedaly.token.ledger']._record(ledger, reservation)
+        if raise_on_error:
+            for result in results:
+                if isinstance(result, Exception):
+                    raise result if isinstance(result, UserError) else UserError(str(result))
+        return results
 
+    def _local_warmup(self, config=None):
+        """Load the local model in a background thread (no ORM access there)."""
+        config = config or self.get_config()
+        if config['model'] != 'local':
+            return False
+        plugin = providers.get('local')
         try:
-            response = requests.post(url, json=payload, headers=headers, timeout=60)
-            response.raise_for_status()
-            data = response.json()
-            if isinstance(data, dict):
-                # Ollama format: {"response": "...", "done": true}
-                if data.get('response'):
-                    return data['response']
-                # text-generation-inference format: {"output": {"text": "..."}}
-                output = data.get('output')
-                if isinstance(output, dict) and output.get('text'):
-                    return output['text']
-                if data.get('choices'):
-                    # openai-compatible local endpoints
-                    message = data['choices'][0].get('message', {})
-                    content = message.get('content')
-                    if content:
-                        return content
-            raise UserError(f"Risposta non riconosciuta dal gateway locale: {data}")
-        except Exception as e:
-            raise UserError(f"Local Gateway Error: {str(e)}")
+            plugin.request_parts(config)
+        except providers.ProviderError as e:
+            _logger.warning("Warm-up del gateway locale Daedaly non eseguito: %s", e)
+            return False
+        threading.Thread(
+            target=plugin.warm_up,
+            args=(config,),
+            name='daedaly-local-warmup',
+            daemon=True,
+        ).start()
+        return True
+
+    def _register_hook(self):
+        super()._register_hook()
+        try:
+            if self.env['ir.config_parameter'].sudo().get_param('daedaly.local_warmup'):
+                self._local_warmup()
+        except Exception:
+            _logger.warning("Warm-up del gateway locale Daedaly all'avvio fallito", exc_info=True)
@@ -1,17 +1,23 @@
 from odoo import models, fields
 
+from .. import providers
+
 
 class ResConfigSettings(models.TransientModel):
     _inherit = 'res.config.settings'
 
-    what_gpt_use = fields.Selection([
-        ('openai', 'OpenAI'),
-        ('gemini', 'Gemini'),
-        ('deepseek', 'DeepSeek'),
-        ('local', 'Local Gateway'),
-    ],  default='gemini', string="What GPT to use", config_parameter="daedaly.what_gpt_use")
+    what_gpt_use = fields.Selection(
+        selection='_selection_gpt_use', default='gemini', string="What GPT to use",
+        config_parameter="daedaly.what_gpt_use",
+    )
 
     openai_key = fields.Char(string="OpenAI Key", config_parameter="daedaly.openai_key")
+    openai_model = fields.Char(
+        string="OpenAI Model",
+        config_parameter="daedaly.openai_model",
+        default='gpt-4o-mini',
+        help="Identificativo del modello OpenAI, es. gpt-4o-mini o gpt-4o."
+    )
     gemini_key = fields.Char(string="Gemini Key", config_parameter="daedaly.gemini_key")
     gemini_model = fields.Char(
         string="Gemini Model",
@@ -44,157 +50,257 @@ class ResConfigSettings(models.TransientModel):
         help="Intestazioni extra in formato JSON da includere nella chiamata al gateway locale."
     )
 
+    local_protocol = fields.Selection([
+        ('ollama_generate', 'Ollama /api/generate'),
+        ('ollama_chat', 'Ollama /api/chat'),
+        ('openai', 'OpenAI-compatible (vLLM, llama.cpp, LM Studio)'),
+    ], string="Local Gateway Protocol", default='ollama_generate', config_parameter="daedaly.local_protocol",
+        help="Protocollo parlato dal gateway locale; l'URL configurato viene adattato al percorso del protocollo."
+    )
+    local_keep_alive = fields.Char(
+        string="Local Keep Alive",
+        config_parameter="daedaly.local_keep_alive",
+        default='30m',
+        help="Per quanto Ollama mantiene il modello in memoria dopo una chiamata (es. 30m, 2h, -1 = sempre)."
+    )
+    local_num_ctx = fields.Integer(
+        string="Local Context Size (num_ctx)",
+        config_parameter="daedaly.local_num_ctx",
+        help="Finestra di contesto richiesta a Ollama. 0 = dimensionamento automatico per scaglioni "
+             "(4k, 8k, 16k, ...): ogni cambio di scaglione ricarica il modello."
+    )
+    local_max_ctx = fields.Integer(
+        string="Local Max Context",
+        config_parameter="daedaly.local_max_ctx",
+        default=32768,
+        help="Limite superiore del dimensionamento automatico del contesto."
+    )
+    local_num_predict = fields.Integer(
+        string="Local Max Output Tokens",
+        config_parameter="daedaly.local_num_predict",
+        help="num_predict (Ollama) o max_tokens (OpenAI-compatibile). 0 = default del server."
+    )
+    local_options = fields.Char(
+        string="Local Gateway Options (JSON)",
+        config_parameter="daedaly.local_options",
+        help="Opzioni aggiuntive del modello in JSON, es. {\"temperature\": 0.2, \"top_p\": 0.9}."
+    )
+    local_warmup = fields.Boolean(
+        string="Warm Up Local Model",
+        config_parameter="daedaly.local_warmup",
+        help="Carica il modello locale all'avvio del server e al salvataggio delle impostazioni."
+    )
+    local_batching = fields.Boolean(
+        string="Batch Local Requests",
+        config_parameter="daedaly.local_batching",
+        help="Con protocollo OpenAI-compatibile invia più prompt indipendenti in un'unica richiesta /v1/completions "
+             "(vLLM, llama.cpp) invece di chiamate parallele."
+    )
+    local_embedding_model = fields.Char(
+        string="Local Embedding Model",
+        config_parameter="daedaly.local_embedding_model",
+        help="Modello di embedding del gateway locale (es. nomic-embed-text) usato per suggerire gli assegnatari; "
+             "vuoto = indice TF-IDF interno, senza chiamate."
+    )
+    daedaly_assignee_engine = fields.Selection([
+        ('off', 'AI Only'),
+        ('fill', 'Fill Unassigned Tasks'),
+        ('rerank', 'Re-rank All Generated Tasks'),
+    ], string="Assignee Engine", default='off', config_parameter="daedaly.assignee_engine",
+        help="Dopo \"Generate Tasks\" assegna le task confrontando localmente i vettori di task e profili del team: "
+             "solo quelle rimaste senza assegnatario, oppure tutte sostituendo la scelta del provider.")
+    daedaly_max_parallel_calls = fields.Integer(
+        string="Max Parallel AI Calls",
+        config_parameter="daedaly.max_parallel_calls",
+        default=4,
+        help="Numero massimo di chiamate AI indipendenti eseguite in parallelo da una singola azione."
+    )
+    daedaly_skill_digest_mode = fields.Selection([
+        ('extractive', 'Extractive (local)'),
+        ('ai', 'AI Summary'),
+    ], string="Skill Digest Mode", default='extractive', config_parameter="daedaly.skill_digest_mode",
+        help="Come sintetizzare i profili AI dei dipendenti usati nei prompt: frasi più significative estratte "
+             "localmente, oppure riassunto generato dal provider in background.")
+    daedaly_skill_digest_max_chars = fields.Integer(
+        string="Skill Digest Length",
+        config_parameter="daedaly.skill_digest_max_chars",
+        default=400,
+        help="Lunghezza massima in caratteri della sintesi; i profili fino a 600 caratteri restano completi."
+    )
+    daedaly_token_budget_daily = fields.Integer(
+        related='company_id.daedaly_token_budget_daily', readonly=False,
+    )
+    daedaly_token_budget_monthly = fields.Integer(
+        related='company_id.daedaly_token_budget_monthly', readonly=False,
+    )
+    daedaly_budget_economy_percent = fields.Integer(
+        string="Economy Mode Threshold (%)",
+        config_parameter="daedaly.budget_economy_percent",
+        default=80,
+        help="Oltre questa percentuale di un budget di azienda o progetto le chiamate AI passano in modalità ridotta: "
+             "risposta più corta e modello della regola di instradamento con azione budget_economy, se presente."
+    )
+    daedaly_tokens_used_today = fields.Integer(
+        string="AI Tokens Used Today", compute='_compute_daedaly_token_usage',
+    )
+    daedaly_tokens_used_month = fields.Integer(
+        string="AI Tokens Used This Month", compute='_compute_daedaly_token_usage',
+    )
+    daedaly_routing_context_fallback = fields.Boolean(
+        string="Reroute Oversized Prompts",
+        config_parameter="daedaly.routing_context_fallback",
+        help="Senza regole valide, un prompt che supera la finestra di contesto del provider predefinito passa al "
+             "provider configurato con la finestra più ampia. Attenzione: i documenti destinati al gateway locale "
+             "possono così raggiungere un provider cloud."
+    )
+    daedaly_dedup_documents = fields.Boolean(
+        string="Remove Repeated Document Content",
+        config_parameter="daedaly.dedup_documents",
+        help="Nei prompt di progetto elimina intestazioni e piè di pagina ripetuti e i paragrafi quasi identici già "
+             "presenti in un altro documento, lasciando un riferimento alla copia mantenuta."
+    )
+    daedaly_task_generation_sections = fields.Integer(
+        string="Task Generation Sections",
+        config_parameter="daedaly.task_generation_sections",
+        help="Numero massimo di parti generate in parallelo da \"Generate Tasks\", una per gruppo di documenti; "
+             "0 o 1 = un'unica chiamata."
+    )
+    daedaly_action_deadline_seconds = fields.Integer(
+        string="Action Time Budget (s)",
+        config_parameter="daedaly.action_deadline_seconds",
+        help="Tempo massimo di un'azione Daedaly; 0 = limit_time_real dei worker meno un margine di sicurezza."
+    )
+    daedaly_delta_output = fields.Boolean(
+        string="Patch-style Re-analysis",
+        config_parameter="daedaly.delta_output",
+        help="Quando il progetto ha già descrizione, note economiche o criticità, l'analisi restituisce solo "
+             "aggiunte e correzioni che vengono integrate nei contenuti esistenti, invece di riscriverli."
+    )
+    daedaly_output_token_limits = fields.Char(
+        string="Output Token Limits (JSON)",
+        config_parameter="daedaly.output_token_limits",
+        help="Numero massimo di token della risposta per azione, es. {\"smart_description\": 1500, \"task_smart_todo\": 400}."
+    )
+
+    daedaly_task_batch_size = fields.Integer(
+        string="Tasks per Batched Prompt",
+        config_parameter="daedaly.task_batch_size",
+        default=10,
+        help="Smart Description e Smart ToDo su più task dello stesso progetto le raggruppano in un'unica chiamata "
+             "con profili e documenti condivisi. 0 o 1 = una chiamata per task."
+    )
+    daedaly_task_batch_token_budget = fields.Integer(
+        string="Batched Prompt Token Budget",
+        config_parameter="daedaly.task_batch_token_budget",
+        default=12000,
+        help="Dimensione massima stimata (token) di un prompt a lotti; oltre questa soglia il lotto viene diviso. "
+             "È comunque limitata a metà della finestra di contesto del provider."
+    )
+
+    daedaly_prewarm_digests = fields.Boolean(
+        string="Nightly Document Summaries",
+        config_parameter="daedaly.prewarm_digests",
+        help="Il job notturno di pre-calcolo genera anche un riassunto AI di ogni file di documentazione nuovo o modificato."
+    )
+    daedaly_prewarm_max_seconds = fields.Integer(
+        string="Pre-warm Time Budget (s)",
+        config_parameter="daedaly.prewarm_max_seconds",
+        default=1800,
+        help="Durata massima di un'esecuzione del pre-calcolo notturno; il lavoro rimanente riprende la notte successiva."
+    )
+    daedaly_prewarm_max_tokens = fields.Integer(
+        string="Pre-warm Token Budget",
+        config_parameter="daedaly.prewarm_max_tokens",
+        default=200000,
+        help="Token stimati che il pre-calcolo notturno può spendere per i riassunti in un'esecuzione."
+    )
+    daedaly_digest_threshold_tokens = fields.Integer(
+        string="Use Summaries Above (tokens)",
+        config_parameter="daedaly.digest_threshold_tokens",
+        help="Nei prompt i documenti più lunghi di questa soglia (token stimati) sono sostituiti dal loro riassunto, "
+             "se già calcolato. 0 = usa sempre il testo completo."
+    )
+
+    daedaly_telemetry_enabled = fields.Boolean(
+        string="AI Call Telemetry",
+        config_parameter="daedaly.telemetry_enabled",
+        help="Registra latenza, dimensioni, token ed errori di ogni chiamata ai provider AI."
+    )
+    daedaly_telemetry_retention_days = fields.Integer(
+        string="Telemetry Retention (days)",
+        config_parameter="daedaly.telemetry_retention_days",
+        default=30,
+        help="Le registrazioni più vecchie vengono eliminate dal job pianificato giornaliero."
+    )
+
+    daedaly_profile_log_threshold_ms = fields.Integer(
+        string="Stage Timing Log Threshold (ms)",
+        config_parameter="daedaly.profile_log_threshold_ms",
+        default=10000,
+        help="Le azioni Daedaly più lente di questa soglia scrivono nel log i tempi per stadio (extract, compose, call, parse, apply)."
+    )
+    daedaly_profile_next_run = fields.Boolean(
+        string="Profile Next Run (cProfile)",
+        config_parameter="daedaly.profile_next_run",
+        help="La prossima azione Daedaly viene profilata con cProfile; il report è allegato al record e l'opzione si disattiva."
+    )
+
+    daedaly_metrics_token = fields.Char(
+        string="Metrics Token",
+        config_parameter="daedaly.metrics_token",
+        help="Token richiesto da /daedaly/metrics (header Authorization: Bearer o parametro token). Se vuoto l'endpoint è disattivato."
+    )
+
+    daedaly_health_ttl_seconds = fields.Integer(
+        string="Connection Status Cache (s)",
+        config_parameter="daedaly.health_ttl_seconds",
+        default=900,
+        help="Per quanto resta valido l'esito della verifica di connessione ai provider prima di un nuovo controllo in background."
+    )
+    daedaly_credit_ttl_seconds = fields.Integer(
+        string="Credit Status Cache (s)",
+        config_parameter="daedaly.credit_ttl_seconds",
+        default=21600,
+        help="Per quanto resta valido l'esito della verifica del credito (può consumare un token per provider)."
+    )
+
+    def _selection_gpt_use(self):
+        return providers.selection()
+
+    def set_values(self):
+        super().set_values()
+        # chiavi o gateway possono essere cambiati: lo stato in cache va ricalcolato
+        status = self.env['daedaly.provider.status'].sudo()
+        status.search([]).write({'checked_at': False})
+        status._schedule_refresh()
+        if self.what_gpt_use == 'local' and self.local_warmup:
+            self.env['daedaly.gpt_api_helper']._local_warmup()
+
+    def _compute_daedaly_token_usage(self):
+        ledger = self.env['daedaly.token.ledger']
+        starts = ledger._period_starts()
+        for settings in self:
+            settings.daedaly_tokens_used_today = ledger._usage(starts['daily'], company=settings.company_id)
+            settings.daedaly_tokens_used_month = ledger._usage(starts['monthly'], company=settings.company_id)
+
+    def action_open_token_ledger(self):
+        return self.env['ir.actions.act_window']._for_xml_id('daedaly.action_daedaly_token_ledger')
+
     def action_open_test_api_connection(self):
         return {
             'type': 'ir.actions.act_window',
             'res_model': 'daedaly.test_api_connection',
             'view_mode': 'form',
             'target': 'new',
+            'context': {'default_check_type': 'health'},
         }
 
     def action_check_api_credit(self):
-        config = self.env['ir.config_parameter'].sudo()
-        model_used = config.get_param('daedaly.what_gpt_use')
-        msg = ""
-        if model_used == 'openai':
-            key = config.get_param('daedaly.openai_key')
-            if not key:
-                msg = "❌ Nessuna chiave OpenAI configurata."
-            else:
-                try:
-                    try:
-                        from openai import OpenAI  # type: ignore
-                        client = OpenAI(api_key=key)
-                        resp = client.chat.completions.create(
-                            model="gpt-4o-mini",
-                            messages=[{"role": "user", "content": "ping"}],
-                            max_tokens=1,
-                            temperature=0,
-                        )
-                        _ = resp.id
-                        msg = "✅ Credito API OpenAI attivo (chiamata minima riuscita)."
-                    except ImportError:
-                        import openai  # type: ignore
-                        openai.api_key = key
-                        resp = openai.ChatCompletion.create(
-                            model="gpt-4o-mini",
-                            messages=[{"role": "user", "content": "ping"}],
-                            max_tokens=1,
-                            temperature=0,
-                        )
-                        _ = resp.get('id')
-                        msg = "✅ Credito API OpenAI attivo (SDK legacy)."
-                except Exception as e:
-                    text = str(e)
-                    if 'insufficient_quota' in text or 'quota' in text or 'RateLimitError' in text:
-                        msg = f"❌ Nessun credito API OpenAI: {text}"
-                    else:
-                        msg = f"❌ Errore chiamando OpenAI: {text}"
-        elif model_used == 'gemini':
-            key = config.get_param('daedaly.gemini_key')
-            if not key:
-                msg = "❌ Nessuna chiave Gemini configurata."
-            else:
-                try:
-                    try:
-                        import google.generativeai as genai  # type: ignore
-                    except Exception:
-                        raise ImportError("google-generativeai non installato")
-                    genai.configure(api_key=key)
-                    model_name = config.get_param('daedaly.gemini_model', 'models/gemini-flash-latest') or 'models/gemini-flash-latest'
-                    if not model_name.startswith('models/'):
-                        model_name = f"models/{model_name}"
-                    model = genai.GenerativeModel(model_name)
-                    resp = model.generate_content("ping")
-                    _ = getattr(resp, 'text', None)
-                    msg = "✅ Credito API Gemini attivo (chiamata minima riuscita)."
-                except Exception as e:
-                    text = str(e)
-                    if 'quota' in text.lower() or 'Resource has been exhausted' in text:
-                        msg = f"❌ Nessun credito API Gemini: {text}"
-                    else:
-                        msg = f"❌ Errore chiamando Gemini: {text}"
-        elif model_used == 'deepseek':
-            key = config.get_param('daedaly.deepseek_key')
-            model_name = config.get_param('daedaly.deepseek_model', 'deepseek-chat')
-            if not key:
-                msg = "❌ Nessuna chiave DeepSeek configurata."
-            else:
-                try:
-                    import requests  # type: ignore
-                    response = requests.post(
-                        "https://api.deepseek.com/v1/chat/completions",
-                        headers={
-                            "Authorization": f"Bearer {key}",
-                            "Content-Type": "application/json",
-                        },
-                        json={
-                            "model": model_name or 'deepseek-chat',
-                            "messages": [{"role": "user", "content": "ping"}],
-                            "max_tokens": 4,
-                            "temperature": 0,
-                            "stream": False,
-                        },
-                        timeout=30,
-                    )
-                    response.raise_for_status()
-                    data = response.json()
-                    if not data.get('choices'):
-                        raise ValueError(f"Risposta senza choices: {data}")
-                    msg = "✅ Credito API DeepSeek attivo (chiamata minima riuscita)."
-                except Exception as e:
-                    text = str(e)
-                    if 'quota' in text.lower():
-                        msg = f"❌ Nessun credito API DeepSeek: {text}"
-                    else:
-                        msg = f"❌ Errore chiamando DeepSeek: {text}"
-        elif model_used == 'local':
-            url = (config.get_param('daedaly.local_gateway_url', 'http://localhost:11434/api/generate') or '').strip()
-            model_name = (config.get_param('daedaly.local_model_name', 'llama3') or '').strip()
-            headers_json = config.get_param('daedaly.local_extra_headers', '')
-            if requests is None:
-                msg = "❌ Gateway locale non raggiungibile: libreria requests mancante."
-            elif not url:
-                msg = "❌ Gateway locale non configurato."
-            elif not model_name:
-                msg = "❌ Nome del modello locale non configurato."
-            else:
-                headers = {"Content-Type": "application/json"}
-                if headers_json:
-                    import json
-                    try:
-                        extra = json.loads(headers_json)
-                        if not isinstance(extra, dict):
-                            raise ValueError("Il valore non è un oggetto JSON.")
-                        headers.update({str(k): str(v) for k, v in extra.items()})
-                    except Exception as e:
-                        msg = f"❌ Intestazioni aggiuntive non valide: {str(e)}"
-                    else:
-                        msg = ""
-                if msg == "":
-                    try:
-                        response = requests.post(
-                            url,
-                            headers=headers,
-                            json={
-                                "model": model_name,
-                                "prompt": "ping",
-                                "stream": False,
-                            },
-                            timeout=30,
-                        )
-                        response.raise_for_status()
-                        msg = "✅ Gateway locale raggiungibile."
-                    except Exception as e:
-                        msg = f"❌ Errore chiamando il gateway locale: {str(e)}"
-        else:
-            msg = "⚠ Nessun modello selezionato nelle impostazioni."
-
-        wiz = self.env['daedaly.test_api_connection'].create({'test_result': msg})
         return {
             'type': 'ir.actions.act_window',
+            'name': 'Check API Credit',
             'res_model': 'daedaly.test_api_connection',
             'view_mode': 'form',
-            'res_id': wiz.id,
             'target': 'new',
+            'context': {'default_check_type': 'credit'},
         }
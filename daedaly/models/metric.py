@@ -0,0 +1,165 @@
+import math
+import re
+from collections import defaultdict
+
+from odoo import api, fields, models
+
+LATENCY_BUCKETS = (0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300)
+EXTRACTION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30)
+_LE_RE = re.compile(r',?le="([^"]*)"')
+
+# name -> (type, help); gli istogrammi espongono _bucket/_sum/_count
+METRICS = {
+    'daedaly_ai_calls_total': ('counter', 'AI provider calls.'),
+    'daedaly_ai_call_errors_total': ('counter', 'Failed AI provider calls by error class.'),
+    'daedaly_ai_call_latency_seconds': ('histogram', 'AI provider call latency.'),
+    'daedaly_ai_prompt_tokens_total': ('counter', 'Prompt tokens sent to AI providers.'),
+    'daedaly_ai_output_tokens_total': ('counter', 'Output tokens returned by AI providers.'),
+    'daedaly_ai_cache_hits_total': ('counter', 'AI requests served without a provider round trip.'),
+    'daedaly_stage_seconds_total': ('counter', 'Time spent per pipeline stage.'),
+    'daedaly_extraction_seconds': ('histogram', 'Document text extraction time.'),
+    'daedaly_queued_jobs': ('gauge', 'Pending triggers of Daedaly scheduled jobs.'),
+}
+
+
+def format_labels(labels):
+    """Render ``labels`` as a canonical Prometheus label string."""
+    parts = []
+    for key in sorted(labels):
+        value = '' if labels[key] is None else str(labels[key])
+        value = value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+        parts.append(f'{key}="{value}"')
+    return ','.join(parts)
+
+
+def observe(increments, name, labels, value, buckets):
+    """Add one histogram observation of ``value`` to ``increments``."""
+    for bound in buckets:
+        # Anche i bucket non incrementati vanno creati, altrimenti histogram_quantile è falsato
+        increments[(f'{name}_bucket', format_labels(dict(labels, le=repr(float(bound)))))] += 1 if value <= bound else 0
+    increments[(f'{name}_bucket', format_labels(dict(labels, le='+Inf')))] += 1
+    increments[(f'{name}_sum', format_labels(labels))] += value
+    increments[(f'{name}_count', format_labels(labels))] += 1
+
+
+class DaedalyMetric(models.Model):
+    _name = 'daedaly.metric'
+    _description = 'Daedaly Monitoring Counter'
+    _log_access = False
+
+    name = fields.Char(string='Metric', required=True, index=True)
+    labels = fields.Char(string='Labels', required=True, default='')
+    value = fields.Float(string='Value', required=True, default=0.0)
+
+    _sql_constraints = [
+        ('name_labels_uniq', 'unique(name, labels)', 'Ogni serie di metriche deve essere unica.'),
+    ]
+
+    @api.model
+    def _increment(self, increments):
+        """Atomically add ``{(name, labels): delta}`` to the shared counters.
+
+        Counters live in the database so every worker contributes to, and every
+        scrape reads, the same monotonic series. Keys are written in a fixed
+        order so concurrent upserts lock the rows in the same sequence.
+        """
+        if not increments:
+            return
+        values = []
+        params = []
+        for (name, labels), delta in sorted(increments.items()):
+            values.append('(%s, %s, %s)')
+            params.extend([name, labels, delta])
+        self.env.cr.execute(
+            f"""
+            INSERT INTO {self._table} (name, labels, value)
+            VALUES {', '.join(values)}
+            ON CONFLICT (name, labels)
+            DO UPDATE SET value = {self._table}.value + EXCLUDED.value
+            """,
+            params,
+        )
+
+    @api.model
+    def _ai_call_increments(self, rows):
+        increments = defaultdict(float)
+        for row in rows:
+            provider = row.get('provider') or 'unknown'
+            base = {'provider': provider}
+            increments[('daedaly_ai_calls_total', format_labels({
+                'provider': provider,
+                'model': row.get('model_name') or '',
+                'action': row.get('action') or '',
+            }))] += 1
+            if not row.get('success', True):
+                increments[('daedaly_ai_call_errors_total', format_labels({
+                    'provider': provider,
+                    'error_class': row.get('error_class') or 'Exception',
+                }))] += 1
+            if row.get('cache_hit'):
+                increments[('daedaly_ai_cache_hits_total', format_labels({
+                    'provider': provider,
+                    'action': row.get('action') or '',
+                }))] += 1
+            else:
+                observe(increments, 'daedaly_ai_call_latency_seconds', base,
+                        (row.get('latency_ms') or 0.0) / 1000.0, LATENCY_BUCKETS)
+            increments[('daedaly_ai_prompt_tokens_total', format_labels(base))] += row.get('prompt_tokens') or 0
+            increments[('daedaly_ai_output_tokens_total', format_labels(base))] += row.get('output_tokens') or 0
+        return increments
+
+    @api.model
+    def _stage_increments(self, rows):
+        increments = defaultdict(float)
+        for row in rows:
+            seconds = (row.get('duration_ms') or 0.0) / 1000.0
+            increments[('daedaly_stage_seconds_total', format_labels({
+                'action': row.get('action') or '',
+                'stage': row.get('stage') or '',
+            }))] += seconds
+            if row.get('stage') == 'extract':
+                observe(increments, 'daedaly_extraction_seconds', {'action': row.get('action') or ''},
+                        seconds, EXTRACTION_BUCKETS)
+        return increments
+
+    @api.model
+    def _queued_jobs(self):
+        self.env.cr.execute("""
+            SELECT d.name, COUNT(t.id)
+              FROM ir_model_data d
+              LEFT JOIN ir_cron_trigger t ON t.cron_id = d.res_id
+             WHERE d.module = 'daedaly' AND d.model = 'ir.cron'
+          GROUP BY d.name
+        """)
+        return self.env.cr.fetchall()
+
+    @api.model
+    def _render_prometheus(self):
+        """Return all Daedaly series in the Prometheus text exposition format."""
+        series = defaultdict(list)
+        for metric in self.search_read([], ['name', 'labels', 'value']):
+            family = metric['name']
+            for suffix in ('_bucket', '_sum', '_count'):
+                if family.endswith(suffix) and family[:-len(suffix)] in METRICS:
+                    family = family[:-len(suffix)]
+                    break
+            series[family].append((metric['name'], metric['labels'], metric['value']))
+        for job, count in self._queued_jobs():
+            series['daedaly_queued_jobs'].append(('daedaly_queued_jobs', format_labels({'job': job}), count))
+
+        def _sort_key(sample):
+            name, labels, _value = sample
+            match = _LE_RE.search(labels)
+            if not match:
+                return (name, labels, math.inf)
+            le = math.inf if match.group(1) == '+Inf' else float(match.group(1))
+            return (name, _LE_RE.sub('', labels), le)
+
+        lines = []
+        for family in sorted(series):
+            metric_type, help_text = METRICS.get(family, ('untyped', ''))
+            lines.append(f'# HELP {family} {help_text}')
+            lines.append(f'# TYPE {family} {metric_type}')
+            for name, labels, value in sorted(series[family], key=_sort_key):
+                lines.append(f'{name}{{{labels}}} {value!r}' if labels else f'{name} {value!r}')
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,89 @@
+import base64
+import logging
+from contextlib import contextmanager
+
+from odoo import SUPERUSER_ID, api, fields, models
+
+from ..tools import profiling
+
+_logger = logging.getLogger(__name__)
+
+
+class DaedalyPipelineStage(models.Model):
+    _name = 'daedaly.pipeline.stage'
+    _inherit = 'daedaly.telemetry.mixin'
+    _description = 'Daedaly Pipeline Stage Timing'
+    _order = 'run_date desc, id'
+    _rec_name = 'stage'
+    _telemetry_date_field = 'run_date'
+
+    run_date = fields.Datetime(string='Date', default=fields.Datetime.now, index=True, readonly=True)
+    run_uid = fields.Char(string='Run', index=True, readonly=True)
+    action = fields.Char(string='Action', index=True, readonly=True)
+    res_model = fields.Char(string='Record Model', readonly=True)
+    res_id = fields.Many2oneReference(string='Record ID', model_field='res_model', readonly=True)
+    stage = fields.Char(string='Stage', index=True, readonly=True)
+    duration_ms = fields.Float(string='Duration (ms)', readonly=True)
+    count = fields.Integer(string='Count', readonly=True)
+    query_count = fields.Integer(string='SQL Queries', readonly=True)
+
+    @api.model
+    def _telemetry_metrics(self, rows):
+        return self.env['daedaly.metric']._stage_increments(rows)
+
+    @contextmanager
+    def _profile_run(self, action, record):
+        """Time the stages of one Daedaly action run on ``record``.
+
+        Stages are opened with :func:`daedaly.tools.profiling.stage` anywhere
+        below this context manager. A summary is logged when the run exceeds
+        ``daedaly.profile_log_threshold_ms``; when ``daedaly.profile_next_run``
+        is set, the run is also profiled with cProfile and the flag is cleared.
+        The flag and the cProfile report are written in their own transaction,
+        so they are kept when the profiled action fails.
+        """
+        cprofile = bool(self.env['ir.config_parameter'].sudo().get_param('daedaly.profile_next_run'))
+        if cprofile:
+            with self.pool.cursor() as cr:
+                api.Environment(cr, SUPERUSER_ID, {})['ir.config_parameter'].set_param('daedaly.profile_next_run', False)
+        run = profiling.PipelineRun(action, cr=self.env.cr, cprofile=cprofile)
+        try:
+            with run:
+                yield run
+        finally:
+            try:
+                self._finish_run(run, record)
+            except Exception:
+                # Non mascherare l'errore dell'azione (es. transazione già abortita)
+                _logger.warning("Chiusura del profilo Daedaly %s fallita", action, exc_info=True)
+
+    @api.model
+    def _finish_run(self, run, record):
+        threshold = self._telemetry_int_param('daedaly.profile_log_threshold_ms', 10000)
+        level = logging.INFO if run.total_ms >= threshold else logging.DEBUG
+        _logger.log(level, "Daedaly %s su %s: %s", run.action, record, run.summary())
+        for name, data in run.stages.items():
+            self.sudo()._buffer_push({
+                'run_uid': run.uid,
+                'action': run.action,
+                'res_model': record._name,
+                'res_id': record.id,
+                'stage': name,
+                'duration_ms': data['duration_ms'],
+                'count': data['count'],
+                'query_count': data['query_count'],
+            })
+        if run.profiler is not None:
+            report = run.cprofile_report()
+            _logger.info("Profilo cProfile Daedaly %s su %s:\n%s", run.action, record, report)
+            try:
+                with self.pool.cursor() as cr:
+                    api.Environment(cr, SUPERUSER_ID, {})['ir.attachment'].create({
+                        'name': f"daedaly_profile_{run.action}_{run.uid[:8]}.txt",
+                        'res_model': record._name,
+                        'res_id': record.id,
+                        'mimetype': 'text/plain',
+                        'datas': base64.b64encode(report.encode('utf-8')),
+                    })
+            except Exception:
+                _logger.warning("Salvataggio del profilo cProfile Daedaly fallito", exc_info=True)
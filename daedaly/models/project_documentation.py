@@ -1,30 +1,53 @@
-from odoo import models, fields
+from datetime import timedelta
+
+from odoo import api, models, fields
 from odoo.exceptions import UserError
-import base64
 import logging
 import html as _html
 import unicodedata
-try:
-    import fitz  # PyMuPDF
-except Exception:
-    fitz = None
 import json
-try:
-    import requests
-except Exception:
-    requests = None
+import hashlib
+from collections import Counter
+
+from ..tools import deadline, dedup, estimate_tokens, partial_json, profiling, text_index
+from .gpt_api_helper import BudgetExceededError, DeadlineError, SingleFlightError
+from ..tools.extractors import extract_text
+
+_logger = logging.getLogger(__name__)
+
+# Campi arricchiti dall'analisi in modalità patch e chiavi della relativa risposta
+_DELTA_FIELDS = ('description', 'economic_notes', 'criticita')
+_DELTA_KEYS = ('description_add', 'economic_notes_add', 'criticita_add', 'tags_add', 'edits')
 
 
 class ProjectDocumentation(models.Model):
     _name = 'project.documentation'
     _description = 'Project Documentation'
+    _inherit = ['daedaly.documentation.mixin']
 
     name = fields.Char(string='Document Description', required=True)
     filename = fields.Char(string='File Name')
-    file = fields.Binary(string='File', required=True)
     doc_date = fields.Date(string='Date', required=True)
     project_id = fields.Many2one('project.project', string='Project', ondelete='cascade')
 
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        records.mapped('project_id')._schedule_speculative()
+        return records
+
+    def write(self, vals):
+        projects = self.mapped('project_id')
+        res = super().write(vals)
+        (projects | self.mapped('project_id'))._schedule_speculative()
+        return res
+
+    def unlink(self):
+        projects = self.mapped('project_id')
+        res = super().unlink()
+        projects._schedule_speculative()
+        return res
+
 
 class ResCompany(models.Model):
     _inherit = 'res.company'
@@ -35,6 +58,14 @@ class ResCompany(models.Model):
         help='Upload a PDF that describes the company for AI-generated analyses.'
     )
     progett_ai_description_filename = fields.Char(string='Company Profile Filename')
+    daedaly_token_budget_daily = fields.Integer(
+        string='Daily AI Token Budget', groups='base.group_system',
+        help="Token AI (prompt e risposta) utilizzabili ogni giorno dall'azienda; 0 = nessun limite."
+    )
+    daedaly_token_budget_monthly = fields.Integer(
+        string='Monthly AI Token Budget', groups='base.group_system',
+        help="Token AI (prompt e risposta) utilizzabili ogni mese dall'azienda; 0 = nessun limite."
+    )
 
 
 class HREmployee(models.Model):
@@ -44,6 +75,128 @@ class HREmployee(models.Model):
         string='AI Profile',
         help='Descrizione testuale delle competenze del dipendente usata per suggerire assegnazioni.'
     )
+    daedaly_skill_digest = fields.Text(
+        string='AI Skill Digest', readonly=True, groups='hr.group_hr_user',
+        help="Sintesi delle competenze usata nei prompt al posto del profilo completo, aggiornata automaticamente."
+    )
+    daedaly_digest_source_hash = fields.Char(readonly=True, groups='hr.group_hr_user')
+    daedaly_digest_date = fields.Datetime(string='Skill Digest Date', readonly=True, groups='hr.group_hr_user')
+    daedaly_skill_terms = fields.Text(
+        compute='_compute_daedaly_skill_terms', store=True, groups='hr.group_hr_user',
+        help="Indice JSON {termine: occorrenze} del profilo AI, usato per scegliere i membri pertinenti al progetto."
+    )
+    daedaly_skill_vector = fields.Binary(attachment=False, readonly=True, groups='hr.group_hr_user')
+    daedaly_vector_key = fields.Char(readonly=True, groups='hr.group_hr_user')
+
+    @api.depends('progett_ai_description')
+    def _compute_daedaly_skill_terms(self):
+        for employee in self:
+            terms = text_index.term_frequencies(employee.progett_ai_description or '', limit=150)
+            employee.daedaly_skill_terms = json.dumps(terms) if terms else False
+
+    def _get_skill_terms(self):
+        self.ensure_one()
+        return json.loads(self.sudo().daedaly_skill_terms or '{}')
+
+    def _get_vector_text(self):
+        """Text embedded by the assignee recommender (empty without an AI profile)."""
+        self.ensure_one()
+        profile = (self.progett_ai_description or '').strip()
+        return f"{self.job_title or ''}\n{profile}".strip() if profile else ''
+
+    def write(self, vals):
+        res = super().write(vals)
+        if 'progett_ai_description' in vals:
+            self._schedule_skill_digests()
+        return res
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        employees = super().create(vals_list)
+        if any(vals.get('progett_ai_description') for vals in vals_list):
+            employees._schedule_skill_digests()
+        return employees
+
+    def _skill_digest_settings(self):
+        icp = self.env['ir.config_parameter'].sudo()
+        helper = self.env['daedaly.gpt_api_helper']
+        return {
+            'mode': icp.get_param('daedaly.skill_digest_mode', 'extractive'),
+            'min_chars': helper._int_param('daedaly.skill_digest_min_chars', 600),
+            'max_chars': helper._int_param('daedaly.skill_digest_max_chars', 400),
+        }
+
+    def _profile_hash(self):
+        return hashlib.sha256((self.progett_ai_description or '').strip().encode('utf-8')).hexdigest()
+
+    def _needs_skill_digest(self, settings):
+        self.ensure_one()
+        profile = (self.progett_ai_description or '').strip()
+        return len(profile) > settings['min_chars'] and self.sudo().daedaly_digest_source_hash != self._profile_hash()
+
+    def _schedule_skill_digests(self):
+        """Refresh the digests now (extractive) or in the background (AI)."""
+        settings = self._skill_digest_settings()
+        if settings['mode'] == 'extractive':
+            self.sudo()._refresh_skill_digests(settings)
+            return
+        cron = self.env.ref('daedaly.ir_cron_daedaly_skill_digest', raise_if_not_found=False)
+        if cron:
+            cron.sudo()._trigger()
+
+    def _build_skill_digest_prompt(self, max_chars):
+        self.ensure_one()
+        return (
+            "Riassumi il seguente profilo professionale in italiano, in testo semplice senza markdown, "
+            f"in al massimo {max_chars} caratteri. Mantieni ruolo, seniority, competenze tecniche e di dominio, "
+            "certificazioni e lingue; elimina aneddoti, ripetizioni e dati personali non professionali.\n\n"
+            f"Profilo:\n{self.progett_ai_description}"
+        )
+
+    def _refresh_skill_digests(self, settings=None):
+        """Store a short skill digest for the employees whose profile changed."""
+        settings = settings or self._skill_digest_settings()
+        for employee in self:
+            if not employee._needs_skill_digest(settings):
+                continue
+            profile = employee.progett_ai_description.strip()
+            if settings['mode'] == 'ai':
+                digest = self.env['daedaly.gpt_api_helper'].chat(
+                    employee._build_skill_digest_prompt(settings['max_chars']),
+                    action='skill_digest', record=employee,
+                )
+            else:
+                digest = text_index.extractive_summary(profile, settings['max_chars'])
+            employee.write({
+                'daedaly_skill_digest': (digest or '').strip(),
+                'daedaly_digest_source_hash': employee._profile_hash(),
+                'daedaly_digest_date': fields.Datetime.now(),
+            })
+
+    @api.model
+    def _cron_refresh_skill_digests(self):
+        """Generate the missing or outdated digests, one commit per employee."""
+        settings = self._skill_digest_settings()
+        employees = self.sudo().search([('progett_ai_description', '!=', False)])
+        done = 0
+        for employee in employees.filtered(lambda e: e._needs_skill_digest(settings)):
+            try:
+                employee._refresh_skill_digests(settings)
+                self.env.cr.commit()
+                done += 1
+            except Exception:
+                self.env.cr.rollback()
+                _logger.warning("Sintesi competenze Daedaly del dipendente %s fallita", employee.id, exc_info=True)
+        return done
+
+    def _get_prompt_profile(self):
+        """Profile text for prompts: the digest when it matches the current profile."""
+        self.ensure_one()
+        profile = (self.progett_ai_description or '').strip()
+        employee = self.sudo()
+        if employee.daedaly_skill_digest and employee.daedaly_digest_source_hash == self._profile_hash():
+            return employee.daedaly_skill_digest
+        return profile
 
 
 class Project(models.Model):
@@ -67,16 +220,60 @@ class Project(models.Model):
         help='Dipendenti considerati per l assegnazione automatica delle task.'
     )
     allow_milestones = fields.Boolean(default=True)
+    daedaly_team_top_k = fields.Integer(
+        string='Team Members in Prompts',
+        help="Numero massimo di membri del team inclusi nei prompt, scelti per pertinenza rispetto alla "
+             "documentazione (il project manager è sempre incluso); 0 = tutti."
+    )
+    daedaly_token_budget_daily = fields.Integer(
+        string='Daily AI Token Budget', groups='project.group_project_manager',
+        help="Token AI (prompt e risposta) utilizzabili ogni giorno dal progetto e dalle sue task; 0 = nessun limite."
+    )
+    daedaly_token_budget_monthly = fields.Integer(
+        string='Monthly AI Token Budget', groups='project.group_project_manager',
+        help="Token AI (prompt e risposta) utilizzabili ogni mese dal progetto e dalle sue task; 0 = nessun limite."
+    )
+    daedaly_speculative = fields.Boolean(
+        string='Pre-compute Analysis',
+        help="Quando documentazione, team o framework cambiano, l'analisi viene calcolata in background "
+             "e applicata subito alla pressione di \"Go Daedaly\" se i dati non sono cambiati nel frattempo.",
+    )
+    daedaly_speculative_tasks = fields.Boolean(
+        string='Pre-compute Task Draft',
+        help="Calcola in background anche la bozza di generazione task.",
+    )
+    daedaly_speculative_due = fields.Datetime(string='Pre-computation Scheduled', readonly=True, copy=False)
 
-    def _extract_text_from_pdf(self, binary_data):
-        try:
-            if fitz is None:
-                return "PyMuPDF (fitz) non installato: impossibile leggere PDF"
-            pdf_content = base64.b64decode(binary_data)
-            doc = fitz.open(stream=pdf_content, filetype="pdf")
-            return "\n".join(page.get_text() for page in doc)
-        except Exception as e:
-            return f"Error reading PDF: {str(e)}"
+    # Campi che entrano nei prompt e non sono scritti dalle azioni stesse
+    _speculative_trigger_fields = (
+        'pm_framework', 'team_employee_ids', 'daedaly_team_top_k', 'daedaly_speculative', 'daedaly_speculative_tasks',
+    )
+
+    def write(self, vals):
+        res = super().write(vals)
+        if any(field in vals for field in self._speculative_trigger_fields):
+            self._schedule_speculative()
+        return res
+
+    def _schedule_speculative(self):
+        """Postpone the background pre-computation of the opted-in projects.
+
+        Every change moves the run ``daedaly.speculative_debounce_seconds``
+        into the future, so a burst of uploads costs a single provider call.
+        """
+        projects = self.filtered('daedaly_speculative')
+        if not projects:
+            return
+        delay = self.env['daedaly.gpt_api_helper']._int_param('daedaly.speculative_debounce_seconds', 300)
+        due = fields.Datetime.now() + timedelta(seconds=delay)
+        projects.sudo().write({'daedaly_speculative_due': due})
+        cron = self.env.ref('daedaly.ir_cron_daedaly_speculative', raise_if_not_found=False)
+        if cron:
+            cron.sudo()._trigger(at=due)
+
+    def _extract_document_text(self, binary_data, filename=None):
+        with profiling.stage('extract'):
+            return extract_text(binary_data, filename=filename)[0]
 
     def _to_html(self, value):
         # Normalize any AI value to a safe, simple HTML string
@@ -109,9 +306,18 @@ class Project(models.Model):
         self.ensure_one()
         company = self.company_id
         if company and company.progett_ai_description_file:
-            return self._extract_text_from_pdf(company.progett_ai_description_file)
+            return self._extract_document_text(
+                company.progett_ai_description_file, company.progett_ai_description_filename)
         return ''
 
+    def _assignee_candidates(self):
+        """Team members and PM that can be assigned tasks (they need a user)."""
+        self.ensure_one()
+        employees = self.team_employee_ids
+        if self.user_id and self.user_id.employee_id:
+            employees |= self.user_id.employee_id
+        return employees.filtered('user_id')
+
     def _get_team_profiles(self):
         self.ensure_one()
         employees = self.team_employee_ids
@@ -123,9 +329,31 @@ class Project(models.Model):
             if employee.id in seen:
                 continue
             seen.add(employee.id)
-            profile_text = (employee.progett_ai_description or '').strip()
+            profile_text = employee._get_prompt_profile()
             profiles.append((employee, profile_text))
-        return profiles
+        return self._prune_team_profiles(profiles)
+
+    def _prune_team_profiles(self, profiles):
+        """Keep the PM and the ``daedaly_team_top_k`` members most relevant to the documentation."""
+        self.ensure_one()
+        top_k = self.daedaly_team_top_k
+        manager = self.user_id.employee_id
+        members = [entry for entry in profiles if entry[0] != manager]
+        if not top_k or len(members) <= top_k:
+            return profiles
+        query = Counter()
+        for blob in self.documentation_ids.mapped('blob_id').sudo():
+            query.update(blob._get_terms())
+        if not query:
+            # Senza documentazione indicizzata non c'è un criterio: si tengono tutti
+            return profiles
+        scores = text_index.relevance_scores(query, [employee._get_skill_terms() for employee, _profile in members])
+        ranked = sorted(range(len(members)), key=lambda index: scores[index], reverse=True)
+        kept = {members[index][0].id for index in ranked[:top_k]}
+        _logger.debug(
+            "Daedaly: team del progetto %s ridotto da %s a %s membri per il prompt", self.id, len(members), top_k,
+        )
+        return [entry for entry in profiles if entry[0] == manager or entry[0].id in kept]
 
     def _compose_team_prompt_section(self, include_assignment_guidance=False, include_analysis_focus=False):
         """Return a textual section describing PM/team profiles for AI prompts."""
@@ -334,6 +562,56 @@ class Project(models.Model):
 
         return ''.join(parts)
 
+    def _delta_output_enabled(self):
+        return bool(self.env['ir.config_parameter'].sudo().get_param('daedaly.delta_output'))
+
+    def _is_delta_result(self, result):
+        return isinstance(result, dict) and any(key in result for key in _DELTA_KEYS)
+
+    def _append_html(self, html, additions, as_list=False):
+        """Append escaped ``additions`` to ``html`` as paragraphs or list items."""
+        if as_list:
+            items = ''.join(f"<li>{_html.escape(text)}</li>" for text in additions)
+            pos = html.rfind('</ul>')
+            if pos != -1:
+                return html[:pos] + items + html[pos:]
+            return f"{html}<ul>{items}</ul>"
+        return html + ''.join(f"<p>{_html.escape(text)}</p>" for text in additions)
+
+    def _apply_delta_result(self, result):
+        """Merge a patch-style analysis (additions and edits) into the existing fields."""
+        self.ensure_one()
+        vals = {}
+        edits = [edit for edit in result.get('edits') or [] if isinstance(edit, dict)]
+        for field in _DELTA_FIELDS:
+            current = str(self[field] or '')
+            html = current
+            for edit in edits:
+                if edit.get('field') != field or not edit.get('find') or edit.get('replace') is None:
+                    continue
+                find = _html.escape(str(edit['find']).strip(), quote=False)
+                # Si corregge solo testo presente alla lettera: niente sostituzioni approssimate
+                if find and find in html:
+                    html = html.replace(find, _html.escape(str(edit['replace']).strip(), quote=False), 1)
+            additions = result.get(f'{field}_add') or []
+            if isinstance(additions, str):
+                additions = [additions]
+            additions = [str(text).strip() for text in additions if text and str(text).strip()]
+            if additions:
+                html = self._append_html(html, additions, as_list=(field == 'criticita'))
+            if html != current:
+                vals[field] = html
+        tag_commands = []
+        for tag_name in result.get('tags_add') or []:
+            tag = self.env['project.tags'].search([('name', '=', tag_name)], limit=1)
+            if not tag:
+                tag = self.env['project.tags'].create({'name': tag_name})
+            tag_commands.append((4, tag.id))
+        if tag_commands:
+            vals['tag_ids'] = tag_commands
+        if vals:
+            self.write(vals)
+
     def _build_meeting_prompt(self):
         prompt = (
             "Sei un project manager senior. In base ai documenti forniti, produci un'analisi completa del progetto.\n"
@@ -360,7 +638,17 @@ class Project(models.Model):
             existing_tags = ', '.join(self.tag_ids.mapped('name'))
             existing_context_parts.append(f"Tag attuali: {existing_tags}")
 
-        if existing_context_parts:
+        # Con contenuti già compilati il modello restituisce solo le modifiche: meno token in uscita
+        delta = bool(existing_context_parts) and self._delta_output_enabled()
+        if delta:
+            prompt += (
+                "IMPORTANTE: Il progetto ha già dei contenuti compilati, riportati qui sotto. "
+                "NON riscriverli: restituisci solo le aggiunte e le correzioni che emergono dai documenti.\n\n"
+                "CONTENUTI ESISTENTI:\n"
+                + "\n\n".join(existing_context_parts)
+                + "\n\n---\n\n"
+            )
+        elif existing_context_parts:
             prompt += (
                 "IMPORTANTE: Il progetto ha già dei contenuti compilati. "
                 "Devi ARRICCHIRE e INTEGRARE quanto già scritto, non sovrascrivere. "
@@ -403,27 +691,87 @@ class Project(models.Model):
         if team_section:
             prompt += team_section
 
-        prompt += (
-            "La chiave \"description\" deve fornire una narrazione completa: almeno 8 frasi distribuite in 2 o più paragrafi, "
-            "con riferimento a contesto, obiettivi, stakeholder, stato di avanzamento, rischi mitigati e prossimi passi.\n"
-            "La chiave \"criticita\" deve contenere un elenco puntuale di almeno 3 criticità, ciascuna descritta con una frase che espliciti impatto e azioni correttive.\n"
-            "Evita frasi sintetiche o titoli: fornisci sempre contenuti ricchi e spiegati.\n\n"
-            "RESTITUISCI SOLO JSON VALIDO, senza backticks e senza testo extra, con struttura ESATTA:\n"
-            "{\n"
-            "  \"description\": \"analisi completa del progetto\",\n"
-            "  \"economic_notes\": \"note economiche e considerazioni di costo/beneficio, budget, OPEX/CAPEX, rischi economici\",\n"
-            "  \"criticita\": \"criticità evidenti e rischi chiave\",\n"
-            "  \"tags\": [\"dominio/settore\", \"modulo odoo\", \"tecnologia\", \"altro\"]\n"
-            "}\n\n"
-            "Se un'informazione non è esplicita, inferiscila in modo prudente o omettila.\n"
-            "Scrivi tutto in testo semplice, senza markdown o formattazioni (niente **grassetto**, *corsivo*, intestazioni o link).\n\n"
-        )
-        for doc in self.documentation_ids:
-            content = self._extract_text_from_pdf(doc.file)
+        if delta:
+            prompt += (
+                "RESTITUISCI SOLO JSON VALIDO, senza backticks e senza testo extra, con struttura ESATTA:\n"
+                "{\n"
+                "  \"description_add\": [\"nuovo paragrafo da aggiungere alla descrizione\"],\n"
+                "  \"economic_notes_add\": [\"nuova nota economica\"],\n"
+                "  \"criticita_add\": [\"nuova criticità con impatto e azione correttiva\"],\n"
+                "  \"tags_add\": [\"nuovo tag\"],\n"
+                "  \"edits\": [{\"field\": \"description | economic_notes | criticita\", \"find\": \"frase esistente da correggere\", \"replace\": \"frase corretta\"}]\n"
+                "}\n\n"
+                "Usa liste vuote quando non c'è nulla da aggiungere o correggere e non ripetere informazioni già presenti.\n"
+                "In \"find\" riporta una frase esattamente come appare nei contenuti esistenti.\n"
+                "Scrivi tutto in testo semplice, senza markdown o formattazioni (niente **grassetto**, *corsivo*, intestazioni o link).\n\n"
+            )
+        else:
+            prompt += (
+                "La chiave \"description\" deve fornire una narrazione completa: almeno 8 frasi distribuite in 2 o più paragrafi, "
+                "con riferimento a contesto, obiettivi, stakeholder, stato di avanzamento, rischi mitigati e prossimi passi.\n"
+                "La chiave \"criticita\" deve contenere un elenco puntuale di almeno 3 criticità, ciascuna descritta con una frase che espliciti impatto e azioni correttive.\n"
+                "Evita frasi sintetiche o titoli: fornisci sempre contenuti ricchi e spiegati.\n\n"
+                "RESTITUISCI SOLO JSON VALIDO, senza backticks e senza testo extra, con struttura ESATTA:\n"
+                "{\n"
+                "  \"description\": \"analisi completa del progetto\",\n"
+                "  \"economic_notes\": \"note economiche e considerazioni di costo/beneficio, budget, OPEX/CAPEX, rischi economici\",\n"
+                "  \"criticita\": \"criticità evidenti e rischi chiave\",\n"
+                "  \"tags\": [\"dominio/settore\", \"modulo odoo\", \"tecnologia\", \"altro\"]\n"
+                "}\n\n"
+                "Se un'informazione non è esplicita, inferiscila in modo prudente o omettila.\n"
+                "Scrivi tutto in testo semplice, senza markdown o formattazioni (niente **grassetto**, *corsivo*, intestazioni o link).\n\n"
+            )
+        for doc, content in self._document_prompt_texts(self.documentation_ids):
+            prompt += f"\nDocumento data: {doc.doc_date}, chiamato: {doc.name}\nContenuto:\n{content}\n"
+        return prompt
+
+    def _document_prompt_texts(self, docs):
+        """Return ``[(doc, text)]`` for a prompt, without repeated boilerplate when enabled.
+
+        With ``daedaly.dedup_documents`` set, page headers and footers and
+        paragraphs already present in an earlier document are replaced by a
+        reference to the copy kept.
+        """
+        entries = [(doc, doc._get_prompt_text()) for doc in docs]
+        if not entries or not self.env['ir.config_parameter'].sudo().get_param('daedaly.dedup_documents'):
+            return entries
+        with profiling.stage('dedup'):
+            texts, stats = dedup.deduplicate([(doc.name, content) for doc, content in entries])
+        saved = stats['chars_before'] - stats['chars_after']
+        if saved > 0:
+            profiling.add_count('dedup_saved_chars', saved)
+            _logger.info(
+                "Daedaly: documenti del progetto %s ridotti del %.0f%% (%s caratteri; %s righe di intestazione o "
+                "piè di pagina, %s paragrafi ripetuti)", self.id, 100.0 * saved / stats['chars_before'], saved,
+                stats['boilerplate_lines'], stats['duplicate_paragraphs'],
+            )
+        return [(doc, text) for (doc, _content), text in zip(entries, texts)]
+
+    def _build_task_prompt(self, docs=None, section=None, header=None):
+        """Return the task-generation prompt.
+
+        ``docs`` restricts the documents included (default: all of them);
+        ``section`` is ``(index, total)`` when the plan is generated in
+        several concurrent parts, one per group of documents. ``header`` is
+        the part shared by all sections (see :meth:`_task_prompt_header`),
+        built once by the caller.
+        """
+        docs = self.documentation_ids if docs is None else docs
+        prompt = self._task_prompt_header() if header is None else header
+
+        if section:
+            prompt += (
+                f"ATTENZIONE: il piano viene generato in {section[1]} parti in parallelo e questa è la parte {section[0]}. "
+                "Genera SOLO le task che derivano dai documenti riportati qui sotto; gli altri documenti sono trattati separatamente. "
+                "Numera sprint e iterazioni a partire da 1 seguendo l'ordine logico di questi documenti.\n\n"
+            )
+
+        for doc, content in self._document_prompt_texts(docs):
             prompt += f"\nDocumento data: {doc.doc_date}, chiamato: {doc.name}\nContenuto:\n{content}\n"
         return prompt
 
-    def _build_task_prompt(self):
+    def _task_prompt_header(self):
+        """Instructions, existing tasks, company profile and team of the task prompt."""
         company_profile = self._get_company_profile_text()
         team_section = self._compose_team_prompt_section(include_assignment_guidance=True)
 
@@ -524,10 +872,6 @@ class Project(models.Model):
                 f"Profilo aziendale fornito per contestualizzare il progetto:\n{company_profile}\n\n"
             )
         prompt += team_section
-
-        for doc in self.documentation_ids:
-            content = self._extract_text_from_pdf(doc.file)
-            prompt += f"\nDocumento data: {doc.doc_date}, chiamato: {doc.name}\nContenuto:\n{content}\n"
         return prompt
 
     def _extract_json(self, text):
@@ -543,169 +887,370 @@ class Project(models.Model):
             return text[start:end+1]
         return None
 
-    def _call_ai(self, prompt):
+    def _parse_ai_json(self, text):
+        """Return the JSON answer in ``text``; truncated answers keep their complete sections."""
         log = logging.getLogger(__name__)
+        raw = self._extract_json(text)
+        if raw:
+            try:
+                return json.loads(raw)
+            except Exception as e:
+                log.warning("JSON parse fallita, uso testo grezzo: %s", e)
+        # Risposta troncata: si tengono le sezioni complete (es. descrizione senza tag, primi sprint)
+        salvaged = partial_json.salvage(text)
+        if salvaged:
+            log.warning("Risposta AI troncata: applicate solo le sezioni complete (%s)", ', '.join(salvaged))
+            return salvaged
+        return {"description": (text or ""), "tags": []}
+
+    def _call_ai(self, prompt, action=None):
+        log = logging.getLogger(__name__)
+        helper = self.env['daedaly.gpt_api_helper']
         try:
-            text = self.env['daedaly.gpt_api_helper'].chat(prompt)
-            raw = self._extract_json(text)
-            if raw:
-                try:
-                    return json.loads(raw)
-                except Exception as e:
-                    log.warning("JSON parse fallita, uso testo grezzo: %s", e)
-            return {"description": (text or ""), "tags": []}
+            with profiling.stage('call'):
+                text = helper.chat(prompt, action=action, record=self[:1])
+            with profiling.stage('parse'):
+                return self._parse_ai_json(text)
+        except (SingleFlightError, DeadlineError, BudgetExceededError):
+            raise
         except Exception as e:
             log.warning("Helper centrale fallito: %s", e)
             icp = self.env['ir.config_parameter'].sudo()
-            agent_url = icp.get_param('daedaly.agent_url', '').rstrip('/')
-            if not agent_url:
+            if not icp.get_param('daedaly.agent_url', '').rstrip('/'):
                 return {"description": "", "tags": []}
-            if requests is None:
-                raise UserError("La libreria 'requests' non è installata nell'ambiente Python.")
-            response = requests.post(
-                url=f'{agent_url}/ask',
-                json={'question': prompt},
-                timeout=60
-            )
-            response.raise_for_status()
-            try:
-                return response.json()
-            except Exception:
-                return {"description": response.text, "tags": []}
+            if deadline.expired(helper._min_call_seconds()):
+                # Nessun tempo per il fallback: meglio l'errore originale che un'azione interrotta dal worker
+                raise
+            with profiling.stage('call'):
+                text = helper.chat(prompt, action=action, record=self[:1], provider='agent')
+            with profiling.stage('parse'):
+                try:
+                    return json.loads(text)
+                except Exception:
+                    return {"description": text, "tags": []}
 
     def action_smart_description(self):
-        for project in self:
-            prompt = project._build_meeting_prompt()
-            result = project._call_ai(prompt)
-
-            # Coerce values to strings/HTML to avoid sanitizer issues
-            desc = result.get("description", "")
-            project.description = project._format_description(desc)
-            project.economic_notes = self._to_html(result.get("economic_notes"))
-            project.criticita = self._to_html(result.get("criticita"))
+        stage_model = self.env['daedaly.pipeline.stage']
+        helper = self.env['daedaly.gpt_api_helper']
+
+        def _run(project):
+            with stage_model._profile_run('smart_description', project) as run:
+                with run.stage('compose'):
+                    prompt = project._build_meeting_prompt()
+                result = self.env['daedaly.speculative.result']._lookup(project, 'smart_description', prompt)
+                if result is None:
+                    result = project._call_ai(prompt, action='smart_description')
+
+                with run.stage('apply'):
+                    if project._is_delta_result(result):
+                        project._apply_delta_result(result)
+                    else:
+                        project._apply_smart_description(result)
+
+        skipped = helper._run_until_deadline(self, _run)
+        if skipped:
+            return helper._deadline_notification(skipped)
+
+    def _apply_smart_description(self, result):
+        """Write the analysis in ``result`` to the project.
+
+        Only the keys present are written: a truncated answer salvaged up to
+        its last complete section leaves the other fields as they are.
+        """
+        self.ensure_one()
+        vals = {}
+        # Coerce values to strings/HTML to avoid sanitizer issues
+        if "description" in result:
+            vals['description'] = self._format_description(result["description"] or "")
+        if "economic_notes" in result:
+            vals['economic_notes'] = self._to_html(result["economic_notes"])
+        if "criticita" in result:
+            vals['criticita'] = self._to_html(result["criticita"])
+        if "tags" in result:
             tag_ids = []
-            for tag_name in result.get("tags", []):
+            for tag_name in result["tags"] or []:
                 tag = self.env['project.tags'].search([('name', '=', tag_name)], limit=1)
                 if not tag:
                     tag = self.env['project.tags'].create({'name': tag_name})
                 tag_ids.append(tag.id)
-            project.tag_ids = [(6, 0, tag_ids)]
+            vals['tag_ids'] = [(6, 0, tag_ids)]
+        if vals:
+            self.write(vals)
 
     def action_generate_tasks(self):
-        for project in self:
-            prompt = project._build_task_prompt()
-            result = project._call_ai(prompt)
-
-            milestone_model = self.env['project.milestone']
-            tag_model = self.env['project.tags']
-
-            def _get_or_create_milestone(name):
-                name = (name or '').strip()
-                if not name:
-                    return None
-                milestone = milestone_model.search([
-                    ('project_id', '=', project.id),
-                    ('name', '=', name)
-                ], limit=1)
-                if not milestone:
-                    milestone = milestone_model.create({
-                        'name': name,
-                        'project_id': project.id,
-                    })
-                return milestone
-
-            def _prepare_tag_ids(keywords):
-                if not keywords:
-                    return []
-                if isinstance(keywords, str):
-                    keywords_iterable = [keywords]
+        stage_model = self.env['daedaly.pipeline.stage']
+        helper = self.env['daedaly.gpt_api_helper']
+
+        failures = []
+
+        def _run(project):
+            with stage_model._profile_run('generate_tasks', project) as run:
+                sections = project._task_sections()
+                if sections:
+                    # Il risultato speculativo è calcolato sul prompt unico: con le sezioni non serve
+                    result, failed = project._generate_tasks_sectioned(sections)
+                    failures.extend((project, part) for part in failed)
                 else:
-                    keywords_iterable = keywords
-                tag_ids = []
-                for keyword in keywords_iterable:
-                    kw = (keyword or '').strip()
-                    if not kw:
+                    with run.stage('compose'):
+                        prompt = project._build_task_prompt()
+                    result = self.env['daedaly.speculative.result']._lookup(project, 'generate_tasks', prompt)
+                    if result is None:
+                        result = project._call_ai(prompt, action='generate_tasks')
+                # Il conteggio dello stadio apply corrisponde alle task create
+                with run.stage('apply', count=0):
+                    project._apply_generated_tasks(result)
+
+        skipped = helper._run_until_deadline(self, _run)
+        next_action = self.action_view_tasks() if len(self) == 1 else None
+        if failures:
+            next_action = self._failed_sections_notification(failures, next_action)
+        if skipped:
+            return helper._deadline_notification(skipped, next_action)
+        return next_action or True
+
+    def _failed_sections_notification(self, failures, next_action=None):
+        """Client action listing the sections whose tasks could not be generated.
+
+        ``failures`` is a list of ``(project, description)``.
+        """
+        lines = [f"{project.display_name}: {description}" for project, description in failures]
+        params = {
+            'title': "Daedaly: piano incompleto",
+            'message': "Task non generate per alcune parti del piano, rilancia l'azione per completarle. "
+                       + "; ".join(lines),
+            'type': 'warning',
+            'sticky': True,
+        }
+        if next_action:
+            params['next'] = next_action
+        return {'type': 'ir.actions.client', 'tag': 'display_notification', 'params': params}
+
+    def _task_sections(self):
+        """Split the documentation into groups of similar size, one per concurrent call.
+
+        Returns an empty list when sectioned generation is disabled
+        (``daedaly.task_generation_sections`` below 2) or there is a single
+        document.
+        """
+        self.ensure_one()
+        max_sections = self.env['daedaly.gpt_api_helper']._int_param('daedaly.task_generation_sections', 0)
+        docs = self.documentation_ids
+        if max_sections < 2 or len(docs) < 2:
+            return []
+        sizes = {doc.id: estimate_tokens(doc._get_prompt_text()) for doc in docs}
+        groups = [[0, docs.browse()] for _index in range(min(max_sections, len(docs)))]
+        # Il documento più grande va sempre nel gruppo più leggero
+        for doc in docs.sorted(lambda d: sizes[d.id], reverse=True):
+            group = min(groups, key=lambda g: g[0])
+            group[0] += sizes[doc.id]
+            group[1] |= doc
+        return [docs & group_docs for _size, group_docs in groups]
+
+    def _generate_tasks_sectioned(self, sections):
+        """Generate the plan with one concurrent call per group of documents.
+
+        Returns ``(result, failed)``: the merged result of the parts that
+        succeeded and the description of each failed part.
+        """
+        self.ensure_one()
+        log = logging.getLogger(__name__)
+        with profiling.stage('compose'):
+            # Istruzioni, profilo aziendale e team sono gli stessi per tutte le parti
+            header = self._task_prompt_header()
+            prompts = [
+                self._build_task_prompt(docs, (index + 1, len(sections)), header=header)
+                for index, docs in enumerate(sections)
+            ]
+        with profiling.stage('call', count=len(prompts)):
+            texts = self.env['daedaly.gpt_api_helper'].chat_many(
+                prompts, action='generate_tasks', records=[self] * len(prompts), raise_on_error=False,
+            )
+        errors = [text for text in texts if isinstance(text, Exception)]
+        if len(errors) == len(texts):
+            raise errors[0] if isinstance(errors[0], UserError) else UserError(str(errors[0]))
+        failed = []
+        for index, (docs, text) in enumerate(zip(sections, texts), start=1):
+            if isinstance(text, Exception):
+                failed.append(f"parte {index} di {len(sections)} ({', '.join(docs.mapped('name'))}): {text}")
+        if failed:
+            log.warning("Generazione task a sezioni: %s parti su %s fallite (%s)", len(failed), len(texts), errors[0])
+        with profiling.stage('parse'):
+            results = [self._parse_ai_json(text) for text in texts if not isinstance(text, Exception)]
+            return self._merge_generated_tasks(results), failed
+
+    def _merge_generated_tasks(self, results):
+        """Merge sectioned plans into one result in the usual format.
+
+        Sprints and iterations with the same number, and value streams with
+        the same name, are joined so milestones stay consistent; tasks whose
+        titles share at least 80% of their terms with an earlier task are
+        dropped.
+        """
+        kept_titles = []
+
+        def _unique(tasks):
+            unique = []
+            for task in tasks or []:
+                if not isinstance(task, dict):
+                    continue
+                title = task.get('title') or ''
+                terms = frozenset(text_index.tokenize(title)) or frozenset([text_index.normalize(title).strip()])
+                if any(len(terms & other) >= 0.8 * len(terms | other) for other in kept_titles):
+                    continue
+                kept_titles.append(terms)
+                unique.append(task)
+            return unique
+
+        merged = {}
+        flat = []
+        for result in results:
+            flat.extend(result.get('tasks') or [])
+            for phase in result.get('phases') or []:
+                flat.extend(phase.get('tasks') or [])
+        if flat:
+            merged['tasks'] = _unique(flat)
+
+        for list_key, group_key in (('sprints', 'sprint'), ('iterations', 'iteration'), ('value_streams', 'stream')):
+            groups = {}
+            for result in results:
+                for position, group in enumerate(result.get(list_key) or [], start=1):
+                    if not isinstance(group, dict):
                         continue
-                    tag = tag_model.search([('name', '=', kw)], limit=1)
-                    if not tag:
-                        tag = tag_model.create({'name': kw})
-                    tag_ids.append(tag.id)
-                return tag_ids
-
-            def _normalize_assignee_key(value):
-                if not value:
-                    return ''
-                value = unicodedata.normalize('NFKD', str(value)).encode('ascii', 'ignore').decode('ascii')
-                return value.strip().lower()
-
-            employee_candidates = project.team_employee_ids
-            if project.user_id and project.user_id.employee_id:
-                employee_candidates |= project.user_id.employee_id
-            assignee_lookup = {}
-            for employee in employee_candidates:
-                user = employee.user_id
-                keys = {employee.name, employee.display_name, employee.work_email, employee.work_phone, employee.mobile_phone}
-                if user:
-                    keys |= {user.name, user.display_name, user.login, user.email}
-                for key in keys:
-                    norm = _normalize_assignee_key(key)
-                    if norm:
-                        assignee_lookup.setdefault(norm, (employee, user))
-
-            def _match_assignee(name):
-                norm = _normalize_assignee_key(name)
-                return assignee_lookup.get(norm)
-
-            def _create_task(task, milestone=None):
-                tag_ids = _prepare_tag_ids(task.get('keywords'))
-                assignee_entry = _match_assignee(task.get('assignee'))
-                assignee_user = assignee_entry[1] if assignee_entry else None
-                task_vals = {
-                    'name': task.get('title', 'Task'),
-                    'description': task.get('description', ''),
+                    label = group.get(group_key)
+                    if group_key == 'stream':
+                        key = text_index.normalize(str(label or 'Value Stream')).strip()
+                    else:
+                        # Ogni parte numera da 1: lo sprint N di tutte le parti diventa lo stesso milestone
+                        key = label if isinstance(label, int) else position
+                    entry = groups.setdefault(key, {group_key: label if group_key == 'stream' else key, 'tasks': []})
+                    entry['tasks'].extend(group.get('tasks') or [])
+            if groups:
+                ordered = [groups[key] for key in (groups if list_key == 'value_streams' else sorted(groups))]
+                for entry in ordered:
+                    entry['tasks'] = _unique(entry['tasks'])
+                merged[list_key] = [entry for entry in ordered if entry['tasks']]
+        return merged
+
+    def _apply_generated_tasks(self, result):
+        """Create milestones, tags and tasks from a task-generation ``result``."""
+        self.ensure_one()
+        project = self
+        milestone_model = self.env['project.milestone']
+        tag_model = self.env['project.tags']
+
+        def _get_or_create_milestone(name):
+            name = (name or '').strip()
+            if not name:
+                return None
+            milestone = milestone_model.search([
+                ('project_id', '=', project.id),
+                ('name', '=', name)
+            ], limit=1)
+            if not milestone:
+                milestone = milestone_model.create({
+                    'name': name,
                     'project_id': project.id,
-                }
-                if milestone:
-                    task_vals['milestone_id'] = milestone.id
-                if tag_ids:
-                    task_vals['tag_ids'] = [(6, 0, tag_ids)]
-                if assignee_user:
-                    task_vals['user_ids'] = [(6, 0, [assignee_user.id])]
-                self.env['project.task'].create(task_vals)
-
-            fw = (project.pm_framework or '').lower()
-            if fw == 'prince2':
-                tasks = list(result.get('tasks') or [])
-                if not tasks:
-                    for phase in result.get('phases', []):
-                        tasks.extend(phase.get('tasks', []) or [])
-                for task in tasks:
-                    _create_task(task)
-            elif fw == 'scrum' and result.get('sprints'):
-                for sprint_data in result.get("sprints", []):
-                    sprint_number = sprint_data.get("sprint")
-                    tasks = sprint_data.get('tasks', []) or []
-                    milestone = _get_or_create_milestone(f"Sprint {sprint_number}" if sprint_number else "Sprint")
-                    for task in tasks:
-                        _create_task(task, milestone)
-            elif fw == 'lean' and result.get('value_streams'):
-                for stream in result['value_streams']:
-                    stream_name = stream.get('stream') or 'Value Stream'
-                    tasks = stream.get('tasks', []) or []
-                    milestone = _get_or_create_milestone(f"Value Stream - {stream_name}")
-                    for task in tasks:
-                        _create_task(task, milestone)
+                })
+            return milestone
+
+        def _prepare_tag_ids(keywords):
+            if not keywords:
+                return []
+            if isinstance(keywords, str):
+                keywords_iterable = [keywords]
             else:
-                # Default Agile (iterazioni) o fallback se non riconosciuto
-                for it in result.get('iterations', []):
-                    it_number = it.get('iteration')
-                    tasks = it.get('tasks', []) or []
-                    milestone = _get_or_create_milestone(f"Iteration {it_number}" if it_number else "Iteration")
-                    for task in tasks:
-                        _create_task(task, milestone)
-        if len(self) == 1:
-            return self.action_view_tasks()
-        return True
+                keywords_iterable = keywords
+            tag_ids = []
+            for keyword in keywords_iterable:
+                kw = (keyword or '').strip()
+                if not kw:
+                    continue
+                tag = tag_model.search([('name', '=', kw)], limit=1)
+                if not tag:
+                    tag = tag_model.create({'name': kw})
+                tag_ids.append(tag.id)
+            return tag_ids
+
+        def _normalize_assignee_key(value):
+            if not value:
+                return ''
+            value = unicodedata.normalize('NFKD', str(value)).encode('ascii', 'ignore').decode('ascii')
+            return value.strip().lower()
+
+        employee_candidates = project.team_employee_ids
+        if project.user_id and project.user_id.employee_id:
+            employee_candidates |= project.user_id.employee_id
+        assignee_lookup = {}
+        for employee in employee_candidates:
+            user = employee.user_id
+            keys = {employee.name, employee.display_name, employee.work_email, employee.work_phone, employee.mobile_phone}
+            if user:
+                keys |= {user.name, user.display_name, user.login, user.email}
+            for key in keys:
+                norm = _normalize_assignee_key(key)
+                if norm:
+                    assignee_lookup.setdefault(norm, (employee, user))
+
+        def _match_assignee(name):
+            norm = _normalize_assignee_key(name)
+            return assignee_lookup.get(norm)
+
+        def _create_task(task, milestone=None):
+            tag_ids = _prepare_tag_ids(task.get('keywords'))
+            assignee_entry = _match_assignee(task.get('assignee'))
+            assignee_user = assignee_entry[1] if assignee_entry else None
+            task_vals = {
+                'name': task.get('title', 'Task'),
+                'description': task.get('description', ''),
+                'project_id': project.id,
+            }
+            if milestone:
+                task_vals['milestone_id'] = milestone.id
+            if tag_ids:
+                task_vals['tag_ids'] = [(6, 0, tag_ids)]
+            if assignee_user:
+                task_vals['user_ids'] = [(6, 0, [assignee_user.id])]
+            task_vals_list.append(task_vals)
+
+        task_vals_list = []
+
+        fw = (project.pm_framework or '').lower()
+        if fw == 'prince2':
+            tasks = list(result.get('tasks') or [])
+            if not tasks:
+                for phase in result.get('phases', []):
+                    tasks.extend(phase.get('tasks', []) or [])
+            for task in tasks:
+                _create_task(task)
+        elif fw == 'scrum' and result.get('sprints'):
+            for sprint_data in result.get("sprints", []):
+                sprint_number = sprint_data.get("sprint")
+                tasks = sprint_data.get('tasks', []) or []
+                milestone = _get_or_create_milestone(f"Sprint {sprint_number}" if sprint_number else "Sprint")
+                for task in tasks:
+                    _create_task(task, milestone)
+        elif fw == 'lean' and result.get('value_streams'):
+            for stream in result['value_streams']:
+                stream_name = stream.get('stream') or 'Value Stream'
+                tasks = stream.get('tasks', []) or []
+                milestone = _get_or_create_milestone(f"Value Stream - {stream_name}")
+                for task in tasks:
+                    _create_task(task, milestone)
+        else:
+            # Default Agile (iterazioni) o fallback se non riconosciuto
+            for it in result.get('iterations', []):
+                it_number = it.get('iteration')
+                tasks = it.get('tasks', []) or []
+                milestone = _get_or_create_milestone(f"Iteration {it_number}" if it_number else "Iteration")
+                for task in tasks:
+                    _create_task(task, milestone)
+        # Un'unica create per tutte le task del piano
+        tasks = self.env['project.task'].create(task_vals_list)
+        profiling.add_count('apply', len(task_vals_list))
+        engine = self.env['ir.config_parameter'].sudo().get_param('daedaly.assignee_engine', 'off')
+        if engine in ('fill', 'rerank') and tasks:
+            with profiling.stage('assignee_engine'):
+                self.env['daedaly.assignee.recommender']._assign(tasks, replace=engine == 'rerank')
 
     def action_open_project_form(self):
         self.ensure_one()
@@ -0,0 +1,121 @@
+import logging
+from datetime import timedelta
+
+from odoo import api, fields, models
+
+from .. import providers
+from ..tools import probes
+
+_logger = logging.getLogger(__name__)
+
+
+class ProviderStatus(models.Model):
+    """Last health/credit probe result per provider, used as a TTL cache.
+
+    The settings wizard only reads these rows; probes run in the background
+    cron (or on explicit refresh) so opening the wizard never waits on a
+    provider.
+    """
+    _name = 'daedaly.provider.status'
+    _description = 'Daedaly AI Provider Status'
+    _order = 'provider, check_type'
+    _rec_name = 'provider'
+
+    provider = fields.Selection(selection='_selection_provider', required=True, readonly=True)
+    check_type = fields.Selection([
+        ('health', 'Connection'),
+        ('credit', 'Credit'),
+    ], required=True, readonly=True)
+    ok = fields.Boolean(readonly=True)
+    message = fields.Text(readonly=True)
+    latency_ms = fields.Float(string="Latency (ms)", readonly=True)
+    checked_at = fields.Datetime(readonly=True)
+
+    _sql_constraints = [
+        ('provider_check_uniq', 'unique(provider, check_type)', 'Un solo stato per provider e tipo di verifica.'),
+    ]
+
+    def _selection_provider(self):
+        return providers.selection()
+
+    def _ttl(self, check_type):
+        icp = self.env['ir.config_parameter'].sudo()
+        key, default = {
+            'health': ('daedaly.health_ttl_seconds', 900),
+            'credit': ('daedaly.credit_ttl_seconds', 21600),
+        }[check_type]
+        try:
+            return int(icp.get_param(key, default) or default)
+        except (TypeError, ValueError):
+            return default
+
+    def _jobs(self, config, check_types=probes.CHECK_TYPES, stale_only=False):
+        jobs = [
+            (provider, check)
+            for provider in probes.configured_providers(config)
+            for check in check_types
+        ]
+        if not stale_only:
+            return jobs
+        statuses = {(s.provider, s.check_type): s for s in self.sudo().search([])}
+        now = fields.Datetime.now()
+        return [
+            job for job in jobs
+            if job not in statuses
+            or not statuses[job].checked_at
+            or statuses[job].checked_at + timedelta(seconds=self._ttl(job[1])) <= now
+        ]
+
+    @api.model
+    def _refresh(self, check_types=probes.CHECK_TYPES, stale_only=False):
+        """Probe the configured providers in parallel and store the results."""
+        helper = self.env['daedaly.gpt_api_helper']
+        config = helper.get_config()
+        jobs = self._jobs(config, check_types, stale_only=stale_only)
+        results = probes.probe_all(jobs, config, max_workers=config.get('max_parallel_calls') or 4)
+        now = fields.Datetime.now()
+        statuses = {(s.provider, s.check_type): s for s in self.sudo().search([])}
+        for (provider, check), result in results.items():
+            vals = dict(result, checked_at=now)
+            status = statuses.get((provider, check))
+            if status:
+                status.write(vals)
+            else:
+                self.sudo().create(dict(vals, provider=provider, check_type=check))
+        return results
+
+    @api.model
+    def _cron_refresh(self):
+        self._refresh(stale_only=True)
+
+    @api.model
+    def _schedule_refresh(self):
+        cron = self.env.ref('daedaly.ir_cron_daedaly_provider_status', raise_if_not_found=False)
+        if cron:
+            cron.sudo()._trigger()
+
+    @api.model
+    def _status_report(self, check_type):
+        """Return the cached status as text; schedule a refresh when stale."""
+        config = self.env['daedaly.gpt_api_helper'].get_config()
+        names = probes.configured_providers(config)
+        if not names:
+            return "⚠ Nessun provider AI configurato."
+        statuses = {
+            s.provider: s for s in self.sudo().search([('check_type', '=', check_type)])
+        }
+        if self._jobs(config, (check_type,), stale_only=True):
+            self._schedule_refresh()
+        lines = []
+        for provider in names:
+            label = providers.label(provider)
+            if provider == config.get('model'):
+                label += " (in uso)"
+            status = statuses.get(provider)
+            if not status or not status.checked_at:
+                lines.append(f"⏳ {label}: verifica in corso in background.")
+                continue
+            icon = "✅" if status.ok else "❌"
+            checked = fields.Datetime.context_timestamp(self, status.checked_at).strftime('%d/%m/%Y %H:%M')
+            lines.append(f"{icon} {label}: {status.message} [{checked}, {status.latency_ms:.0f} ms]")
+        return "\n".join(lines)
@@ -0,0 +1,175 @@
+import logging
+import time
+from datetime import timedelta
+
+from odoo import api, fields, models
+
+from .. import providers
+
+_logger = logging.getLogger(__name__)
+
+# Latenza osservata per processo: (dbname, provider, modello) -> (monotonic, media ms)
+_LATENCY_CACHE = {}
+_LATENCY_CACHE_SECONDS = 60
+
+
+class RoutingRule(models.Model):
+    """Rule choosing the provider and model of an AI call.
+
+    Rules are evaluated in sequence for every call; the first one whose
+    action and prompt size match, whose provider is configured, whose
+    context window fits the prompt and whose observed latency is within its
+    limit wins. Without a matching rule the provider chosen in the settings
+    is used.
+    """
+    _name = 'daedaly.routing.rule'
+    _description = 'Daedaly AI Routing Rule'
+    _order = 'sequence, id'
+
+    sequence = fields.Integer(default=10)
+    name = fields.Char(required=True)
+    active = fields.Boolean(default=True)
+    actions = fields.Char(
+        string='Actions',
+        help="Azioni Daedaly separate da virgola (es. task_smart_todo, generate_tasks); vuoto = tutte le azioni.",
+    )
+    min_prompt_tokens = fields.Integer(string='Min Prompt Tokens')
+    max_prompt_tokens = fields.Integer(string='Max Prompt Tokens', help="0 = nessun limite.")
+    provider = fields.Selection(selection='_selection_provider', required=True)
+    model_name = fields.Char(
+        string='Model',
+        help="Modello da usare con questo provider (es. gpt-4o, llama3:8b); vuoto = modello delle impostazioni.",
+    )
+    context_window = fields.Integer(
+        string='Context Window (tokens)',
+        help="Finestra di contesto del modello; 0 = valore dichiarato dal provider.",
+    )
+    max_latency_ms = fields.Float(
+        string='Max Observed Latency (ms)',
+        help="La regola viene saltata se la latenza media osservata del modello supera questo valore; 0 = nessun limite.",
+    )
+
+    _sql_constraints = [
+        ('prompt_tokens_range', 'CHECK(max_prompt_tokens = 0 OR max_prompt_tokens >= min_prompt_tokens)',
+         'Il limite massimo di token deve essere maggiore del minimo.'),
+    ]
+
+    def _selection_provider(self):
+        return providers.selection()
+
+    def _matches(self, action, prompt_tokens):
+        self.ensure_one()
+        if self.actions:
+            if action not in {name.strip() for name in self.actions.split(',')}:
+                return False
+        if prompt_tokens < self.min_prompt_tokens:
+            return False
+        return not self.max_prompt_tokens or prompt_tokens <= self.max_prompt_tokens
+
+    def _apply(self, config):
+        """Return ``config`` with this rule's model selected."""
+        self.ensure_one()
+        plugin = providers.get(self.provider)
+        config = dict(config, model=self.provider)
+        if self.model_name and plugin.model_param:
+            config[plugin.model_param] = self.model_name
+        return config
+
+    @api.model
+    def _observed_latency(self, provider, model_name):
+        """Average latency (ms) of the recent successful calls, or None."""
+        key = (self.env.cr.dbname, provider, model_name or '')
+        cached = _LATENCY_CACHE.get(key)
+        now = time.monotonic()
+        if cached and now - cached[0] < _LATENCY_CACHE_SECONDS:
+            return cached[1]
+        minutes = self.env['daedaly.gpt_api_helper']._int_param('daedaly.routing_latency_window_minutes', 60)
+        domain = [
+            ('provider', '=', provider),
+            ('success', '=', True),
+            ('cache_hit', '=', False),
+            ('call_date', '>=', fields.Datetime.now() - timedelta(minutes=minutes)),
+        ]
+        if model_name:
+            domain.append(('model_name', '=', model_name))
+        [(count, latency)] = self.env['daedaly.ai.call'].sudo()._read_group(domain, [], ['__count', 'latency_ms:avg'])
+        latency = latency if count else None
+        _LATENCY_CACHE[key] = (now, latency)
+        return latency
+
+    @api.model
+    def _route(self, config, action, prompt_tokens):
+        """Return ``(provider, config)`` for a call of ``action`` with ``prompt_tokens``."""
+        reserve = self.env['daedaly.gpt_api_helper']._int_param('daedaly.routing_output_reserve_tokens', 2000)
+        needed = prompt_tokens + reserve
+        for rule in self.sudo().search([]):
+            plugin = providers.get(rule.provider)
+            if plugin is None or not rule._matches(action, prompt_tokens):
+                continue
+            candidate = rule._apply(config)
+            if not plugin.is_configured(candidate):
+                continue
+            window = rule.context_window or plugin.capabilities(candidate)['context_window']
+            if needed > window:
+                continue
+            if rule.max_latency_ms:
+                latency = self._observed_latency(rule.provider, rule.model_name)
+                if latency is not None and latency > rule.max_latency_ms:
+                    continue
+            return rule.provider, candidate
+        return self._route_by_context(config, needed)
+
+    @api.model
+    def _route_economy(self, config, prompt_tokens):
+        """Return ``(provider, config)`` of the first usable rule listing ``budget_economy``, or None.
+
+        Used when a token budget is nearly exhausted; rules without actions
+        do not count, the cheaper model must be chosen explicitly.
+        """
+        reserve = self.env['daedaly.gpt_api_helper']._int_param('daedaly.routing_output_reserve_tokens', 2000)
+        for rule in self.sudo().search([('actions', 'ilike', 'budget_economy')]):
+            plugin = providers.get(rule.provider)
+            if plugin is None or not rule._matches('budget_economy', prompt_tokens):
+                continue
+            candidate = rule._apply(config)
+            if not plugin.is_configured(candidate):
+                continue
+            window = rule.context_window or plugin.capabilities(candidate)['context_window']
+            if prompt_tokens + reserve <= window:
+                return rule.provider, candidate
+        return None
+
+    @api.model
+    def _route_by_context(self, config, needed):
+        """Keep the default provider unless the prompt exceeds its context window.
+
+        With ``daedaly.routing_context_fallback`` set, the configured provider
+        with the largest window is used instead, so long documents do not fail
+        where a larger model is available. The fallback is off by default:
+        it may send documents meant for the local gateway to a cloud provider.
+        """
+        default = providers.get(config['model'])
+        if default is None or needed <= default.capabilities(config)['context_window']:
+            return config['model'], config
+        if not self.env['ir.config_parameter'].sudo().get_param('daedaly.routing_context_fallback'):
+            _logger.warning(
+                "Daedaly: prompt di circa %s token oltre la finestra di contesto di %s; "
+                "fallback su un provider più ampio disattivato", needed, config['model'],
+            )
+            return config['model'], config
+        best = None
+        for name in providers.names(selectable_only=True):
+            plugin = providers.get(name)
+            candidate = dict(config, model=name)
+            if not plugin.is_configured(candidate):
+                continue
+            window = plugin.capabilities(candidate)['context_window']
+            if best is None or window > best[0]:
+                best = (window, name, candidate)
+        if best is None or best[1] == config['model']:
+            return config['model'], config
+        _logger.warning(
+            "Daedaly: prompt di circa %s token oltre la finestra di contesto di %s, instradato su %s",
+            needed, config['model'], best[1],
+        )
+        return best[1], best[2]
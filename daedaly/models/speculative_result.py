@@ -0,0 +1,113 @@
+import hashlib
+import json
+import logging
+import time
+
+from odoo import api, fields, models
+
+_logger = logging.getLogger(__name__)
+
+
+class SpeculativeResult(models.Model):
+    """AI result computed in advance for a project, keyed by its prompt.
+
+    When a project opts in, changes to its documentation, team or framework
+    schedule a background run that stores the analysis (and optionally a
+    task-generation draft) here. The buttons reuse a stored result only when
+    the prompt they would send hashes to the same ``input_hash``, so any
+    change made in the meantime falls back to a live call.
+    """
+    _name = 'daedaly.speculative.result'
+    _description = 'Daedaly Pre-computed AI Result'
+    _order = 'computed_at desc'
+    _rec_name = 'action'
+
+    project_id = fields.Many2one('project.project', required=True, ondelete='cascade', index=True, readonly=True)
+    action = fields.Selection([
+        ('smart_description', 'Project Analysis'),
+        ('generate_tasks', 'Task Generation'),
+    ], required=True, readonly=True)
+    input_hash = fields.Char(required=True, readonly=True)
+    result = fields.Text(readonly=True, help="Risposta del provider già interpretata (JSON).")
+    computed_at = fields.Datetime(readonly=True)
+    duration_ms = fields.Float(string='Duration (ms)', readonly=True)
+
+    _sql_constraints = [
+        ('project_action_uniq', 'unique(project_id, action)', 'Un solo risultato pre-calcolato per progetto e azione.'),
+    ]
+
+    @api.model
+    def _hash(self, prompt):
+        return hashlib.sha256((prompt or '').encode('utf-8')).hexdigest()
+
+    @api.model
+    def _lookup(self, project, action, prompt):
+        """Return the stored result for ``prompt`` or None when inputs changed."""
+        staged = self.sudo().search([
+            ('project_id', '=', project.id),
+            ('action', '=', action),
+            ('input_hash', '=', self._hash(prompt)),
+        ], limit=1)
+        if not staged or not staged.result:
+            return None
+        self.env['daedaly.gpt_api_helper']._record_ai_call(
+            'speculative', prompt, staged.result, time.perf_counter(), {'latency_ms': 0.0},
+            action=action, record=project, cache_hit=True,
+        )
+        return json.loads(staged.result)
+
+    @api.model
+    def _store(self, project, action, prompt, result, duration_ms):
+        vals = {
+            'input_hash': self._hash(prompt),
+            'result': json.dumps(result),
+            'computed_at': fields.Datetime.now(),
+            'duration_ms': duration_ms,
+        }
+        staged = self.sudo().search([('project_id', '=', project.id), ('action', '=', action)], limit=1)
+        if staged:
+            staged.write(vals)
+        else:
+            self.sudo().create(dict(vals, project_id=project.id, action=action))
+
+    @api.model
+    def _cron_precompute(self):
+        """Run the analyses of the opted-in projects whose debounce delay expired."""
+        now = fields.Datetime.now()
+        projects = self.env['project.project'].sudo().search([
+            ('daedaly_speculative', '=', True),
+            ('daedaly_speculative_due', '!=', False),
+            ('daedaly_speculative_due', '<=', now),
+        ])
+        done = 0
+        for project in projects:
+            project = project.with_company(project.company_id)
+            actions = ['smart_description']
+            # Con la generazione a sezioni il tasto non usa il prompt unico: inutile pre-calcolarlo
+            if project.daedaly_speculative_tasks and not project._task_sections():
+                actions.append('generate_tasks')
+            try:
+                for action in actions:
+                    prompt = project._build_meeting_prompt() if action == 'smart_description' else project._build_task_prompt()
+                    if self.sudo().search_count([
+                        ('project_id', '=', project.id),
+                        ('action', '=', action),
+                        ('input_hash', '=', self._hash(prompt)),
+                    ]):
+                        continue
+                    started = time.perf_counter()
+                    result = project._call_ai(prompt, action=action)
+                    if not isinstance(result, dict) or not any(result.values()):
+                        # Provider non disponibile: il tasto farà la chiamata dal vivo
+                        continue
+                    self._store(project, action, prompt, result, (time.perf_counter() - started) * 1000.0)
+                project.daedaly_speculative_due = False
+                self.env.cr.commit()
+                done += 1
+            except Exception:
+                self.env.cr.rollback()
+                _logger.warning("Pre-calcolo speculativo Daedaly del progetto %s fallito", project.id, exc_info=True)
+                # Niente nuovi tentativi fino alla prossima modifica del progetto
+                project.daedaly_speculative_due = False
+                self.env.cr.commit()
+        return done
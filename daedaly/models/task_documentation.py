@@ -1,21 +1,59 @@
-from odoo import models, fields
+from odoo import api, models, fields
 from odoo.exceptions import UserError
-import base64
+from odoo.tools import html2plaintext
 import html as _html
+import json
+import logging
 
-try:
-    import fitz  # PyMuPDF
-except Exception:
-    fitz = None
+from ..tools import estimate_tokens, profiling
+from .gpt_api_helper import BudgetExceededError, DeadlineError
+
+_logger = logging.getLogger(__name__)
+
+# Modalità a lotti: più task dello stesso progetto in un'unica chiamata
+_BATCH_MODES = {
+    'description': {
+        'action': 'task_smart_description',
+        'fields': ('description',),
+        'instruction': (
+            "Sei un project manager senior. Per OGNI task elencata scrivi una DESCRIZIONE SOMMARIA e generale della task "
+            "(non un verbale) che chiarisca obiettivo, contesto, criteri di accettazione, dipendenze e rischi. "
+            "Tono chiaro e sintetico (5–8 frasi). Se la task ha già una descrizione devi ARRICCHIRE e INTEGRARE quanto già scritto, "
+            "non sovrascriverlo. Adatta tono, livello di dettaglio e focus tecnico ai profili degli assegnatari della task."
+        ),
+        'schema': '{"description": "testo descrittivo della task"}',
+    },
+    'todo': {
+        'action': 'task_smart_todo',
+        'fields': ('description', 'todo'),
+        'instruction': (
+            "Agisci come un team lead. Per OGNI task elencata genera una lista di passi operativi (breve, azionabile, in ordine logico) "
+            "per completarla. Se la task ha già una lista di passi devi ARRICCHIRE e INTEGRARE quanto già presente, aggiungendo passi "
+            "mancanti o dettagliando quelli esistenti. Adatta il livello di dettaglio alle competenze degli assegnatari della task."
+        ),
+        'schema': '{"items": ["step 1", "step 2"]}',
+    },
+    'enrich': {
+        'action': 'task_smart_enrich',
+        'fields': ('description', 'todo'),
+        'instruction': (
+            "Sei un project manager senior. Per OGNI task elencata produci una DESCRIZIONE SOMMARIA e generale (non un verbale: "
+            "obiettivo, contesto, criteri di accettazione, dipendenze e rischi, 5–8 frasi) e una lista di passi operativi "
+            "(breve, azionabile, in ordine logico) per completarla. Se la task ha già descrizione o lista di passi devi ARRICCHIRE "
+            "e INTEGRARE quanto già presente. Adatta tono e livello di dettaglio ai profili degli assegnatari della task."
+        ),
+        'schema': '{"description": "testo descrittivo della task", "items": ["step 1", "step 2"]}',
+    },
+}
 
 
 class TaskDocumentation(models.Model):
     _name = 'task.documentation'
     _description = 'Task Documentation'
+    _inherit = ['daedaly.documentation.mixin']
 
     name = fields.Char(string='Document Description', required=True)
     filename = fields.Char(string='File Name')
-    file = fields.Binary(string='File', required=True)
     doc_date = fields.Date(string='Date', required=True)
     task_id = fields.Many2one('project.task', string='Task', ondelete='cascade')
 
@@ -25,31 +63,30 @@ class ProjectTask(models.Model):
 
     documentation_ids = fields.One2many('task.documentation', 'task_id', string='Documentations')
     todo_html = fields.Html(string='To Do', sanitize=True)
-
-    def _extract_text_from_pdf(self, binary_data):
-        try:
-            if fitz is None:
-                return "PyMuPDF (fitz) non installato: impossibile leggere PDF"
-            pdf_content = base64.b64decode(binary_data)
-            doc = fitz.open(stream=pdf_content, filetype="pdf")
-            return "\n".join(page.get_text() for page in doc)
-        except Exception as e:
-            return f"Error reading PDF: {str(e)}"
+    daedaly_vector = fields.Binary(attachment=False, readonly=True, copy=False)
+    daedaly_vector_key = fields.Char(readonly=True, copy=False)
 
     def _build_task_docs_context(self):
         text = ""
         for doc in self.documentation_ids:
-            content = self._extract_text_from_pdf(doc.file)
+            content = doc._get_prompt_text()
             text += f"\nDocumento task data: {doc.doc_date}, chiamato: {doc.name}\nContenuto:\n{content}\n"
         return text
 
-    def _render_assignee_profiles(self):
-        """Return a textual summary of the assignee profiles to guide AI prompts."""
+    def _get_assignee_employees(self):
         self.ensure_one()
         users = self.user_ids
         if self.user_id:
             users |= self.user_id
-        employees = users.mapped('employee_id')
+        return users.mapped('employee_id')
+
+    def _render_assignee_profiles(self):
+        """Return a textual summary of the assignee profiles to guide AI prompts."""
+        self.ensure_one()
+        return self._format_employee_profiles(self._get_assignee_employees())
+
+    @api.model
+    def _format_employee_profiles(self, employees):
         lines = []
         seen = set()
         for employee in employees:
@@ -67,112 +104,470 @@ class ProjectTask(models.Model):
                 contact_bits.append(f"login: {employee.user_id.login}")
             contact_info = f" ({', '.join(contact_bits)})" if contact_bits else ""
             lines.append(f"- {employee.display_name}{contact_info}")
-            profile_text = (employee.progett_ai_description or '').strip()
+            profile_text = employee._get_prompt_profile()
             if profile_text:
                 lines.append(f"  Profilo professionale:\n{profile_text}")
             else:
                 lines.append("  Profilo professionale: nessuna descrizione fornita.")
         return "\n".join(lines)
 
-    def action_task_smart_description(self):
-        for task in self:
-            context_docs = task._build_task_docs_context()
-            assignee_profiles = task._render_assignee_profiles()
-            prompt = (
-                "Sei un project manager senior. In base alla descrizione attuale della task e ai documenti allegati, "
-                "scrivi una DESCRIZIONE SOMMARIA e generale della task (non un verbale). La descrizione deve chiarire obiettivo, contesto, criteri di accettazione, dipendenze e rischi. "
-                "Tono chiaro e sintetico (5–8 frasi).\n\n"
-                "RESTITUISCI SOLO JSON VALIDO, senza backticks e senza testo extra, con struttura ESATTA:\n"
-                "{\n"
-                "  \"description\": \"testo descrittivo della task\"\n"
-                "}\n\n"
-            )
-            if assignee_profiles:
-                prompt += (
-                    "Profilo dell'assegnatario (adatta tono, livello di dettaglio e focus tecnico a queste competenze):\n"
-                    f"{assignee_profiles}\n\n"
-                )
-            else:
-                prompt += (
-                    "Non è disponibile un profilo dell'assegnatario; fornisci indicazioni comprensibili anche a un team multidisciplinare.\n\n"
-                )
-
-            # Aggiungi contesto della descrizione esistente per arricchirla
-            import re
-            existing_desc = task.description or ''
-            # Rimuovi tag HTML per passare testo leggibile
-            existing_desc_text = re.sub(r'<[^>]+>', '', existing_desc).strip()
-            if existing_desc_text:
-                prompt += (
-                    "IMPORTANTE: La task ha già una descrizione. "
-                    "Devi ARRICCHIRE e INTEGRARE quanto già scritto, non sovrascrivere completamente.\n\n"
-                )
-            prompt += f"Descrizione attuale task:\n{existing_desc_text or '(nessuna)'}\n\nDocumenti:\n{context_docs}"
-            text = self.env['daedaly.gpt_api_helper'].chat(prompt)
+    def _task_batch_settings(self):
+        """Return ``(max_tasks, token_budget)`` for batched task prompts."""
+        helper = self.env['daedaly.gpt_api_helper']
+        max_tasks = helper._int_param('daedaly.task_batch_size', 10)
+        budget = helper._int_param('daedaly.task_batch_token_budget', 12000)
+        # Metà della finestra di contesto resta per le istruzioni e la risposta
+        context_window = helper._provider_capabilities()['context_window']
+        return max_tasks, max(1000, min(budget, context_window // 2))
+
+    def _prefetch_task_batch(self):
+        """Load assignees, employees and documents of the whole selection at once."""
+        employees = self.mapped('user_ids').mapped('employee_id')
+        employees.fetch(['name', 'work_email', 'work_phone', 'mobile_phone', 'progett_ai_description', 'user_id'])
+        employees.sudo().fetch(['daedaly_skill_digest', 'daedaly_digest_source_hash'])
+        employees.mapped('user_id').fetch(['login'])
+        self.mapped('documentation_ids').fetch(['name', 'doc_date', 'blob_id'])
+
+    def _build_task_batches(self, mode, max_tasks, budget):
+        """Group ``self`` by project into batches of at most ``max_tasks`` tasks.
+
+        Assignee profiles and documents are shared by the tasks of a batch
+        and counted once; a batch is closed when adding the next task would
+        exceed ``budget`` estimated tokens.
+        """
+        spec = _BATCH_MODES[mode]
+        base_tokens = estimate_tokens(spec['instruction']) + 200
+        doc_texts = {}
+        profile_texts = {}
+        batches = []
+        for tasks in self.grouped('project_id').values():
+            current = None
+            for task in tasks:
+                employees = task._get_assignee_employees()
+                doc_keys = []
+                for doc in task.documentation_ids:
+                    # Lo stesso file su più task condivide il blob: inviato una sola volta
+                    key = doc.blob_id.id or f"doc-{doc.id}"
+                    if key not in doc_texts:
+                        content = doc._get_prompt_text()
+                        doc_texts[key] = f"Documento task data: {doc.doc_date}, chiamato: {doc.name}\nContenuto:\n{content}"
+                    if key not in doc_keys:
+                        doc_keys.append(key)
+                for employee in employees:
+                    if employee.id not in profile_texts:
+                        profile_texts[employee.id] = self._format_employee_profiles(employee)
+                block = task._render_task_batch_block(mode, employees)
+                if current is not None:
+                    cost = estimate_tokens(block)
+                    cost += sum(estimate_tokens(doc_texts[k]) for k in doc_keys if k not in current['docs'])
+                    cost += sum(estimate_tokens(profile_texts[e.id]) for e in employees if e not in current['employees'])
+                    if len(current['tasks']) >= max_tasks or current['tokens'] + cost > budget:
+                        current = None
+                if current is None:
+                    current = {'tasks': self.browse(), 'blocks': [], 'docs': [], 'employees': self.env['hr.employee'], 'tokens': base_tokens}
+                    batches.append(current)
+                    cost = estimate_tokens(block) + sum(estimate_tokens(doc_texts[k]) for k in doc_keys)
+                    cost += sum(estimate_tokens(profile_texts[e.id]) for e in employees)
+                current['tasks'] |= task
+                current['blocks'].append((block, doc_keys))
+                current['docs'] += [k for k in doc_keys if k not in current['docs']]
+                current['employees'] |= employees
+                current['tokens'] += cost
+        for batch in batches:
+            batch['prompt'] = self._render_task_batch_prompt(mode, batch, doc_texts, profile_texts)
+        return batches
+
+    def _render_task_batch_block(self, mode, employees):
+        self.ensure_one()
+        import re
+        lines = [
+            f"### Task ID {self.id}: {self.name}",
+            f"Assegnatari: {', '.join(employees.mapped('name')) or 'nessuno'}",
+        ]
+        existing_desc_text = re.sub(r'<[^>]+>', '', self.description or '').strip()
+        lines.append(f"Descrizione attuale:\n{existing_desc_text or '(nessuna)'}")
+        if 'todo' in _BATCH_MODES[mode]['fields']:
+            existing_todo_text = re.sub(r'<[^>]+>', '', self.todo_html or '').strip()
+            lines.append(f"Lista attuale:\n{existing_todo_text or '(nessuna)'}")
+        return "\n".join(lines)
+
+    @api.model
+    def _render_task_batch_prompt(self, mode, batch, doc_texts, profile_texts):
+        spec = _BATCH_MODES[mode]
+        refs = {key: f"D{index}" for index, key in enumerate(batch['docs'], start=1)}
+        prompt = (
+            f"{spec['instruction']}\n\n"
+            "RESTITUISCI SOLO JSON VALIDO, senza backticks e senza testo extra: un oggetto con una chiave per ogni task "
+            "(l'ID numerico indicato) e come valore la struttura ESATTA:\n"
+            f"{spec['schema']}\n"
+            f"Esempio: {{\"{batch['tasks'][0].id}\": {spec['schema']}}}\n\n"
+        )
+        profiles = [profile_texts[employee.id] for employee in batch['employees'] if profile_texts.get(employee.id)]
+        if profiles:
+            prompt += "Profili degli assegnatari:\n" + "\n".join(profiles) + "\n\n"
+        else:
+            prompt += "Non sono disponibili profili degli assegnatari; scrivi in modo comprensibile a un team multidisciplinare.\n\n"
+        if refs:
+            prompt += "Documenti:\n" + "\n".join(f"[{refs[key]}] {doc_texts[key]}" for key in batch['docs']) + "\n\n"
+        prompt += "Task:\n"
+        for block, doc_keys in batch['blocks']:
+            prompt += f"{block}\nDocumenti: {', '.join(refs[k] for k in doc_keys) or 'nessuno'}\n\n"
+        return prompt
+
+    @api.model
+    def _parse_task_batch(self, text):
+        """Return ``{task_id: value}`` from a keyed JSON answer."""
+        import re
+        text = (text or '').strip()
+        start = text.find('{')
+        end = text.rfind('}')
+        if start == -1 or end <= start:
+            return {}
+        try:
+            data = json.loads(text[start:end + 1])
+        except Exception:
+            return {}
+        if not isinstance(data, dict):
+            return {}
+        result = {}
+        for key, value in data.items():
+            match = re.search(r'\d+', str(key))
+            if match:
+                result[int(match.group(0))] = value
+        return result
+
+    def _apply_task_result(self, mode, value):
+        """Write one task's result in a single ``write``; return False when it is unusable."""
+        self.ensure_one()
+        vals = {}
+        if mode in ('description', 'enrich'):
+            text = value.get('description') if isinstance(value, dict) else value
+            if text and isinstance(text, str):
+                vals['description'] = text
+        if mode in ('todo', 'enrich'):
+            items = value.get('items') if isinstance(value, dict) else value
+            if isinstance(items, list):
+                vals['todo_html'] = self._render_todo_html(items)
+        if not vals:
+            return False
+        self.write(vals)
+        return True
+
+    def _run_task_batches(self, mode):
+        """Enrich the selection with batched prompts.
+
+        Returns ``(remaining, skipped)``: the tasks left to do one by one and
+        those whose batch was refused for lack of time or token budget. A
+        failed batch is retried once before its tasks fall back to single
+        calls.
+        """
+        max_tasks, budget = self._task_batch_settings()
+        if len(self) < 2 or max_tasks < 2:
+            return self, self.browse()
+        spec = _BATCH_MODES[mode]
+        done = self.browse()
+        skipped = self.browse()
+        with self.env['daedaly.pipeline.stage']._profile_run(f"{spec['action']}_batch", self[:1]) as run:
+            with run.stage('compose'):
+                self._prefetch_task_batch()
+                batches = self._build_task_batches(mode, max_tasks, budget)
+            results = {}
+            for attempt in range(2):
+                with run.stage('call', count=len(batches)):
+                    texts = self._call_task_batches(batches, spec['action'], raise_first=not attempt)
+                failed = []
+                with run.stage('parse'):
+                    for batch, text in zip(batches, texts):
+                        if isinstance(text, (DeadlineError, BudgetExceededError)):
+                            skipped |= batch['tasks']
+                        elif isinstance(text, Exception):
+                            _logger.warning("Lotto Daedaly %s su %s fallito: %s", mode, batch['tasks'].ids, text)
+                            failed.append(batch)
+                        else:
+                            parsed = self._parse_task_batch(text)
+                            # Si accettano solo le chiavi delle task del lotto
+                            results.update({tid: value for tid, value in parsed.items() if tid in batch['tasks'].ids})
+                batches = failed
+                if not batches:
+                    break
+            with run.stage('apply', count=0):
+                for task in self:
+                    if task.id in results and task._apply_task_result(mode, results[task.id]):
+                        done |= task
+                        profiling.add_count('apply', 1)
+        return self - done - skipped, skipped
+
+    def _call_task_batches(self, batches, action, raise_first=True):
+        """Send the batch prompts; return one text or exception per batch.
+
+        When the group as a whole is refused (time or token budget) the
+        batches are sent one at a time until one is refused: the following
+        ones hold that error. With ``raise_first`` a refusal of the very
+        first batch is raised, as nothing could be done.
+        """
+        helper = self.env['daedaly.gpt_api_helper']
+        prompts = [batch['prompt'] for batch in batches]
+        records = [batch['tasks'][:1] for batch in batches]
+        try:
+            return helper.chat_many(prompts, action=action, records=records, raise_on_error=False)
+        except (DeadlineError, BudgetExceededError):
+            pass
+        texts = []
+        for prompt, record in zip(prompts, records):
             try:
-                import json, re
-                block = re.search(r"\{[\s\S]*\}$", (text or '').strip())
-                data = json.loads(block.group(0)) if block else {"description": text or ''}
-            except Exception:
-                data = {"description": text or ''}
-            task.description = data.get('description', task.description)
+                texts.append(helper.chat(prompt, action=action, record=record))
+            except (DeadlineError, BudgetExceededError) as e:
+                if raise_first and not texts:
+                    raise
+                texts.extend([e] * (len(prompts) - len(texts)))
+                break
+            except Exception as e:
+                texts.append(e)
+        return texts
+
+    def action_task_smart_description(self):
+        stage_model = self.env['daedaly.pipeline.stage']
+        helper = self.env['daedaly.gpt_api_helper']
+
+        def _run(task):
+            with stage_model._profile_run('task_smart_description', task) as run:
+                with run.stage('compose'):
+                    context_docs = task._build_task_docs_context()
+                    assignee_profiles = task._render_assignee_profiles()
+                    prompt = (
+                        "Sei un project manager senior. In base alla descrizione attuale della task e ai documenti allegati, "
+                        "scrivi una DESCRIZIONE SOMMARIA e generale della task (non un verbale). La descrizione deve chiarire obiettivo, contesto, criteri di accettazione, dipendenze e rischi. "
+                        "Tono chiaro e sintetico (5–8 frasi).\n\n"
+                        "RESTITUISCI SOLO JSON VALIDO, senza backticks e senza testo extra, con struttura ESATTA:\n"
+                        "{\n"
+                        "  \"description\": \"testo descrittivo della task\"\n"
+                        "}\n\n"
+                    )
+                    if assignee_profiles:
+                        prompt += (
+                            "Profilo dell'assegnatario (adatta tono, livello di dettaglio e focus tecnico a queste competenze):\n"
+                            f"{assignee_profiles}\n\n"
+                        )
+                    else:
+                        prompt += (
+                            "Non è disponibile un profilo dell'assegnatario; fornisci indicazioni comprensibili anche a un team multidisciplinare.\n\n"
+                        )
+
+                    # Aggiungi contesto della descrizione esistente per arricchirla
+                    import re
+                    existing_desc = task.description or ''
+                    # Rimuovi tag HTML per passare testo leggibile
+                    existing_desc_text = re.sub(r'<[^>]+>', '', existing_desc).strip()
+                    if existing_desc_text:
+                        prompt += (
+                            "IMPORTANTE: La task ha già una descrizione. "
+                            "Devi ARRICCHIRE e INTEGRARE quanto già scritto, non sovrascrivere completamente.\n\n"
+                        )
+                    prompt += f"Descrizione attuale task:\n{existing_desc_text or '(nessuna)'}\n\nDocumenti:\n{context_docs}"
+                with run.stage('call'):
+                    text = self.env['daedaly.gpt_api_helper'].chat(prompt, action='task_smart_description', record=task)
+                with run.stage('parse'):
+                    try:
+                        import json, re
+                        block = re.search(r"\{[\s\S]*\}$", (text or '').strip())
+                        data = json.loads(block.group(0)) if block else {"description": text or ''}
+                    except Exception:
+                        data = {"description": text or ''}
+                with run.stage('apply'):
+                    task.description = data.get('description', task.description)
+
+        with helper._action_deadline():
+            remaining, skipped = self._run_task_batches('description')
+            skipped |= helper._run_until_deadline(remaining, _run)
+        if skipped:
+            return helper._deadline_notification(skipped)
 
     def action_task_smart_todo(self):
-        for task in self:
-            context_docs = task._build_task_docs_context()
-            assignee_profiles = task._render_assignee_profiles()
-            prompt = (
-                "Agisci come un team lead. Genera una lista di passi operativi (breve, azionabile, in ordine logico) per completare la task. "
-                "Restituisci SOLO JSON valido con struttura esatta: {\"items\": [\"step 1\", \"step 2\"]}. Nessun testo extra.\n\n"
+        stage_model = self.env['daedaly.pipeline.stage']
+        helper = self.env['daedaly.gpt_api_helper']
+
+        def _run(task):
+            with stage_model._profile_run('task_smart_todo', task) as run:
+                with run.stage('compose'):
+                    context_docs = task._build_task_docs_context()
+                    assignee_profiles = task._render_assignee_profiles()
+                    prompt = (
+                        "Agisci come un team lead. Genera una lista di passi operativi (breve, azionabile, in ordine logico) per completare la task. "
+                        "Restituisci SOLO JSON valido con struttura esatta: {\"items\": [\"step 1\", \"step 2\"]}. Nessun testo extra.\n\n"
+                    )
+                    if assignee_profiles:
+                        prompt += (
+                            "Adatta il livello di dettaglio e l'ordine delle azioni alle competenze dell'assegnatario indicato di seguito:\n"
+                            f"{assignee_profiles}\n\n"
+                        )
+                    else:
+                        prompt += (
+                            "Non è disponibile un profilo dell'assegnatario; proponi passi chiari e autoconclusivi adatti a un team eterogeneo.\n\n"
+                        )
+
+                    # Aggiungi contesto della todo list esistente per arricchirla
+                    import re
+                    existing_todo = task.todo_html or ''
+                    existing_todo_text = re.sub(r'<[^>]+>', '', existing_todo).strip()
+                    if existing_todo_text:
+                        prompt += (
+                            "IMPORTANTE: La task ha già una lista di passi. "
+                            "Devi ARRICCHIRE e INTEGRARE quanto già presente, aggiungendo passi mancanti o dettagliando quelli esistenti.\n"
+                            f"Lista attuale:\n{existing_todo_text}\n\n"
+                        )
+
+                    prompt += f"Descrizione task:\n{task.description or ''}\n\nDocumenti:\n{context_docs}\n\n"
+                with run.stage('call'):
+                    text = self.env['daedaly.gpt_api_helper'].chat(prompt, action='task_smart_todo', record=task) or ''
+                with run.stage('parse'):
+                    import json, re
+                    items = []
+                    raw_json = None
+                    fenced = re.search(r"```json\s*(\{[\s\S]*?\})\s*```", text, re.IGNORECASE)
+                    if fenced:
+                        raw_json = fenced.group(1)
+                    else:
+                        start = text.find('{')
+                        end = text.rfind('}')
+                        if start != -1 and end != -1 and end > start:
+                            raw_json = text[start:end+1]
+                    try:
+                        if raw_json:
+                            data = json.loads(raw_json)
+                        else:
+                            data = json.loads(text)
+                        if isinstance(data, dict):
+                            items = data.get('items', []) or []
+                    except Exception:
+                        items = [i.strip('- •\u2022 ') for i in text.splitlines() if i.strip() and not i.strip().startswith('```')]
+                with run.stage('apply'):
+                    task._apply_todo_items(items)
+
+        with helper._action_deadline():
+            remaining, skipped = self._run_task_batches('todo')
+            skipped |= helper._run_until_deadline(remaining, _run)
+        if skipped:
+            return helper._deadline_notification(skipped)
+
+    def _apply_todo_items(self, items):
+        self.ensure_one()
+        self.todo_html = self._render_todo_html(items)
+
+    @api.model
+    def _render_todo_html(self, items):
+        if not items:
+            return ''
+        lis = []
+        for i in items:
+            # Escape HTML per prevenire XSS
+            lis.append(f'<li>{_html.escape(str(i))}</li>')
+        return '<ul class="o_todo_list">' + ''.join(lis) + '</ul>'
+
+    @api.model
+    def _parse_task_json(self, text):
+        """Return the JSON object in ``text`` (fenced or bare) or None."""
+        import re
+        text = (text or '').strip()
+        fenced = re.search(r"```json\s*(\{[\s\S]*?\})\s*```", text, re.IGNORECASE)
+        raw_json = fenced.group(1) if fenced else None
+        if not raw_json:
+            start = text.find('{')
+            end = text.rfind('}')
+            if start != -1 and end > start:
+                raw_json = text[start:end + 1]
+        try:
+            data = json.loads(raw_json or text)
+        except Exception:
+            return None
+        return data if isinstance(data, dict) else None
+
+    def action_task_smart_enrich(self):
+        """Write description and to-do list of each task from a single AI call."""
+        stage_model = self.env['daedaly.pipeline.stage']
+        helper = self.env['daedaly.gpt_api_helper']
+
+        def _run(task):
+            with stage_model._profile_run('task_smart_enrich', task) as run:
+                with run.stage('compose'):
+                    prompt = task._build_task_enrich_prompt()
+                with run.stage('call'):
+                    text = self.env['daedaly.gpt_api_helper'].chat(prompt, action='task_smart_enrich', record=task) or ''
+                with run.stage('parse'):
+                    data = self._parse_task_json(text) or {"description": text}
+                with run.stage('apply'):
+                    if not task._apply_task_result('enrich', data):
+                        raise UserError("La risposta AI non contiene né una descrizione né una lista di passi utilizzabili.")
+
+        with helper._action_deadline():
+            remaining, skipped = self._run_task_batches('enrich')
+            skipped |= helper._run_until_deadline(remaining, _run)
+        if skipped:
+            return helper._deadline_notification(skipped)
+
+    def _get_vector_text(self):
+        """Text embedded by the assignee recommender: title, tags and description."""
+        self.ensure_one()
+        parts = [self.name or '', ' '.join(self.tag_ids.mapped('name')), html2plaintext(self.description or '')]
+        return "\n".join(part for part in parts if part.strip())
+
+    def action_suggest_assignee(self):
+        """Assign the unassigned tasks their best-matching team member, without AI calls."""
+        stage_model = self.env['daedaly.pipeline.stage']
+        unassigned = self.filtered(lambda task: not task.user_ids)
+        with stage_model._profile_run('suggest_assignee', self[:1]):
+            recommendations = self.env['daedaly.assignee.recommender']._assign(self)
+        lines = []
+        for task in self[:10]:
+            ranked = recommendations.get(task.id)
+            if ranked:
+                names = ", ".join(f"{employee.name} ({score:.2f})" for employee, score in ranked)
+                lines.append(f"{task.name}: {names}")
+        if len(self) > 10:
+            lines.append(f"... e altre {len(self) - 10} task")
+        assigned = len(unassigned.filtered('user_ids'))
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': f"Daedaly: {assigned} task assegnate",
+                'message': "; ".join(lines) or "Nessun membro del team con profilo AI da confrontare.",
+                'type': 'success' if assigned else 'info',
+                'sticky': bool(lines),
+            },
+        }
+
+    def _build_task_enrich_prompt(self):
+        self.ensure_one()
+        import re
+        context_docs = self._build_task_docs_context()
+        assignee_profiles = self._render_assignee_profiles()
+        prompt = (
+            "Sei un project manager senior. In base alla descrizione attuale della task e ai documenti allegati produci:\n"
+            "1. una DESCRIZIONE SOMMARIA e generale della task (non un verbale) che chiarisca obiettivo, contesto, criteri di accettazione, "
+            "dipendenze e rischi, con tono chiaro e sintetico (5–8 frasi);\n"
+            "2. una lista di passi operativi (breve, azionabile, in ordine logico) per completare la task.\n\n"
+            "RESTITUISCI SOLO JSON VALIDO, senza backticks e senza testo extra, con struttura ESATTA:\n"
+            f"{_BATCH_MODES['enrich']['schema']}\n\n"
+        )
+        if assignee_profiles:
+            prompt += (
+                "Profilo dell'assegnatario (adatta tono, livello di dettaglio, focus tecnico e ordine delle azioni a queste competenze):\n"
+                f"{assignee_profiles}\n\n"
             )
-            if assignee_profiles:
-                prompt += (
-                    "Adatta il livello di dettaglio e l'ordine delle azioni alle competenze dell'assegnatario indicato di seguito:\n"
-                    f"{assignee_profiles}\n\n"
-                )
-            else:
-                prompt += (
-                    "Non è disponibile un profilo dell'assegnatario; proponi passi chiari e autoconclusivi adatti a un team eterogeneo.\n\n"
-                )
-
-            # Aggiungi contesto della todo list esistente per arricchirla
-            import re
-            existing_todo = task.todo_html or ''
-            existing_todo_text = re.sub(r'<[^>]+>', '', existing_todo).strip()
-            if existing_todo_text:
-                prompt += (
-                    "IMPORTANTE: La task ha già una lista di passi. "
-                    "Devi ARRICCHIRE e INTEGRARE quanto già presente, aggiungendo passi mancanti o dettagliando quelli esistenti.\n"
-                    f"Lista attuale:\n{existing_todo_text}\n\n"
-                )
-
-            prompt += f"Descrizione task:\n{task.description or ''}\n\nDocumenti:\n{context_docs}\n\n"
-            text = self.env['daedaly.gpt_api_helper'].chat(prompt) or ''
-            import json, re
-            items = []
-            raw_json = None
-            fenced = re.search(r"```json\s*(\{[\s\S]*?\})\s*```", text, re.IGNORECASE)
-            if fenced:
-                raw_json = fenced.group(1)
-            else:
-                start = text.find('{')
-                end = text.rfind('}')
-                if start != -1 and end != -1 and end > start:
-                    raw_json = text[start:end+1]
-            try:
-                if raw_json:
-                    data = json.loads(raw_json)
-                else:
-                    data = json.loads(text)
-                if isinstance(data, dict):
-                    items = data.get('items', []) or []
-            except Exception:
-                items = [i.strip('- •\u2022 ') for i in text.splitlines() if i.strip() and not i.strip().startswith('```')]
-            if items:
-                lis = []
-                for i in items:
-                    # Escape HTML per prevenire XSS
-                    lis.append(f'<li>{_html.escape(str(i))}</li>')
-                task.todo_html = '<ul class="o_todo_list">' + ''.join(lis) + '</ul>'
-            else:
-                task.todo_html = ''
+        else:
+            prompt += (
+                "Non è disponibile un profilo dell'assegnatario; scrivi in modo comprensibile a un team multidisciplinare.\n\n"
+            )
+        existing_desc_text = re.sub(r'<[^>]+>', '', self.description or '').strip()
+        existing_todo_text = re.sub(r'<[^>]+>', '', self.todo_html or '').strip()
+        if existing_desc_text or existing_todo_text:
+            prompt += (
+                "IMPORTANTE: Devi ARRICCHIRE e INTEGRARE la descrizione e la lista di passi già presenti, "
+                "non sovrascriverle completamente.\n\n"
+            )
+        prompt += (
+            f"Descrizione attuale task:\n{existing_desc_text or '(nessuna)'}\n\n"
+            f"Lista attuale:\n{existing_todo_text or '(nessuna)'}\n\n"
+            f"Documenti:\n{context_docs}"
+        )
+        return prompt
@@ -0,0 +1,173 @@
+import logging
+from contextlib import contextmanager
+from datetime import datetime, time as dtime, timedelta
+
+from odoo import SUPERUSER_ID, api, fields, models
+
+_logger = logging.getLogger(__name__)
+
+
+class TokenLedger(models.Model):
+    """Tokens consumed by each AI call, charged to a company and a project.
+
+    Rows are written right after the call in their own transaction, so the
+    spend is counted even when the action fails and rolls back, and they
+    are what the daily and monthly budgets of companies and projects are
+    checked against before every call. While a call runs, a reservation row
+    holds its estimate so concurrent calls cannot all be admitted against
+    the same remaining budget.
+    """
+    _name = 'daedaly.token.ledger'
+    _description = 'Daedaly Token Ledger'
+    _order = 'date desc, id desc'
+    _rec_name = 'action'
+    _log_access = False
+
+    date = fields.Datetime(default=fields.Datetime.now, required=True, index=True, readonly=True)
+    company_id = fields.Many2one('res.company', string='Company', required=True, index=True, readonly=True)
+    project_id = fields.Many2one('project.project', string='Project', index=True, ondelete='set null', readonly=True)
+    user_id = fields.Many2one('res.users', string='User', readonly=True)
+    action = fields.Char(readonly=True)
+    provider = fields.Char(readonly=True)
+    model_name = fields.Char(string='Model', readonly=True)
+    estimated_tokens = fields.Integer(
+        string='Estimated Tokens', readonly=True,
+        help="Stima usata per l'ammissione: token del prompt più il massimo previsto per la risposta.",
+    )
+    prompt_tokens = fields.Integer(string='Prompt Tokens', readonly=True)
+    output_tokens = fields.Integer(string='Output Tokens', readonly=True)
+    total_tokens = fields.Integer(string='Total Tokens', readonly=True)
+    tokens_estimated = fields.Boolean(
+        string='Estimated Usage', readonly=True,
+        help="Il provider non ha restituito i dati di utilizzo: token stimati dai caratteri.",
+    )
+    economy = fields.Boolean(
+        string='Economy Mode', readonly=True,
+        help="Chiamata eseguita in modalità ridotta perché un budget era quasi esaurito.",
+    )
+    success = fields.Boolean(default=True, readonly=True)
+    reserved = fields.Boolean(
+        readonly=True,
+        help="Prenotazione di una chiamata in corso: la stima viene sostituita dal consumo effettivo al termine.",
+    )
+
+    @api.model
+    def _period_starts(self):
+        """Return ``{'daily': ..., 'monthly': ...}`` start datetimes (UTC)."""
+        today = fields.Datetime.now().date()
+        return {
+            'daily': datetime.combine(today, dtime.min),
+            'monthly': datetime.combine(today.replace(day=1), dtime.min),
+        }
+
+    @api.model
+    def _reservation_cutoff(self):
+        """Reservations older than this are left over by an interrupted worker and no longer count."""
+        seconds = self.env['daedaly.gpt_api_helper']._int_param('daedaly.budget_reservation_seconds', 3600)
+        return fields.Datetime.now() - timedelta(seconds=seconds)
+
+    @api.model
+    def _usage(self, since, company=None, project=None):
+        domain = [
+            ('date', '>=', since),
+            '|', ('reserved', '=', False), ('date', '>=', self._reservation_cutoff()),
+        ]
+        if company:
+            domain.append(('company_id', '=', company.id))
+        if project:
+            domain.append(('project_id', '=', project.id))
+        [(total,)] = self.sudo()._read_group(domain, [], ['total_tokens:sum'])
+        return total or 0
+
+    @api.model
+    def _has_budgets(self, company, project):
+        return any(
+            owner.sudo()[f'daedaly_token_budget_{period}']
+            for owner in (company, project) if owner
+            for period in ('daily', 'monthly')
+        )
+
+    @api.model
+    def _budgets(self, company, project):
+        """Return ``[(label, limit, used)]`` for the budgets set on ``company`` and ``project``."""
+        starts = self._period_starts()
+        budgets = []
+        for owner, label in ((company, "azienda"), (project, "progetto")):
+            if not owner:
+                continue
+            owner = owner.sudo()
+            for period, name in (('daily', "giornaliero"), ('monthly', "mensile")):
+                limit = owner[f'daedaly_token_budget_{period}']
+                if not limit:
+                    continue
+                used = self._usage(
+                    starts[period], company=company if owner._name == 'res.company' else None,
+                    project=project if owner._name == 'project.project' else None,
+                )
+                budgets.append((f"budget {name} {label} {owner.display_name}", limit, used))
+        return budgets
+
+    @contextmanager
+    def _budget_lock(self, company, project):
+        """Yield the ledger in a dedicated cursor holding the budget locks of ``company`` and ``project``.
+
+        Admission reads the usage and writes its reservation inside the lock,
+        so a concurrent worker waits and then sees that reservation.
+        """
+        keys = [f'daedaly.budget.company.{company.id}']
+        if project:
+            keys.append(f'daedaly.budget.project.{project.id}')
+        with self.pool.cursor() as cr:
+            # Lock di sessione: la lettura avviene in una transazione aperta dopo averlo ottenuto,
+            # quindi vede le prenotazioni di chi lo ha appena rilasciato
+            for key in keys:
+                cr.execute("SELECT pg_advisory_lock(hashtext(%s))", [key])
+            try:
+                cr.commit()
+                yield self.with_env(self.env(cr=cr, su=True))
+                cr.commit()
+            finally:
+                cr.rollback()
+                for key in reversed(keys):
+                    cr.execute("SELECT pg_advisory_unlock(hashtext(%s))", [key])
+                cr.commit()
+
+    @api.model
+    def _reserve(self, vals):
+        """Create the reservation row of an admitted call; return its id."""
+        return self.create(dict(vals, reserved=True, user_id=self.env.uid)).id
+
+    @api.model
+    def _record(self, entries, reservation=None):
+        """Insert ``entries`` (list of vals) in a dedicated transaction.
+
+        The reservation row ``reservation`` (id) is replaced by the entries.
+        """
+        if not entries and not reservation:
+            return
+        try:
+            with self.pool.cursor() as cr:
+                env = api.Environment(cr, SUPERUSER_ID, {})
+                if reservation:
+                    env[self._name].browse(reservation).exists().unlink()
+                env[self._name].create(entries)
+        except Exception:
+            # Il registro non deve mai far fallire una chiamata già eseguita
+            _logger.warning("Registrazione consumo token Daedaly fallita: %s righe scartate", len(entries), exc_info=True)
+
+    @api.model
+    def _release(self, reservation):
+        """Drop the reservation of a call that was not sent."""
+        self._record([], reservation)
+
+    @api.model
+    def _cron_gc(self):
+        """Delete rows older than ``daedaly.token_ledger_retention_days`` and stale reservations."""
+        # Il budget mensile legge il mese in corso: almeno 32 giorni restano sempre
+        days = max(self.env['daedaly.gpt_api_helper']._int_param('daedaly.token_ledger_retention_days', 400), 32)
+        cutoff = fields.Datetime.now() - timedelta(days=days)
+        self.env.cr.execute(
+            f'DELETE FROM "{self._table}" WHERE date < %s OR (reserved AND date < %s)',
+            [cutoff, self._reservation_cutoff()],
+        )
+        _logger.info("Registro token Daedaly: eliminate %s righe più vecchie di %s giorni", self.env.cr.rowcount, days)
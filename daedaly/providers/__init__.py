@@ -0,0 +1,67 @@
+"""Registry of the AI provider plugins used by ``daedaly.gpt_api_helper``.
+
+Providers are registered by name with a ``"module:Class"`` path relative to
+this package; the module (and the SDK it wraps) is only imported the first
+time the provider is requested, so a shop using a local gateway never loads
+the Gemini or OpenAI SDKs. Third-party addons can add a provider with
+:func:`register` from their own ``__init__``.
+"""
+import importlib
+import threading
+
+from .base import Provider, ProviderError, raise_for_status  # noqa: F401
+
+_REGISTRY = {}
+_INSTANCES = {}
+_LOCK = threading.Lock()
+
+
+def register(name, label, target, selectable=True):
+    """Register a provider.
+
+    ``target`` is a :class:`Provider` subclass or a ``"module:Class"`` string
+    (relative modules start with a dot). Non selectable providers (the
+    external agent) are only used as explicit fallbacks.
+    """
+    with _LOCK:
+        _REGISTRY[name] = {'label': label, 'target': target, 'selectable': selectable}
+        _INSTANCES.pop(name, None)
+
+
+def get(name):
+    """Return the provider instance for ``name`` (loading it lazily) or None."""
+    provider = _INSTANCES.get(name)
+    if provider is not None:
+        return provider
+    entry = _REGISTRY.get(name)
+    if entry is None:
+        return None
+    target = entry['target']
+    if isinstance(target, str):
+        module_name, class_name = target.split(':')
+        module = importlib.import_module(module_name, __name__)
+        target = getattr(module, class_name)
+    with _LOCK:
+        provider = _INSTANCES.setdefault(name, target())
+    return provider
+
+
+def label(name):
+    entry = _REGISTRY.get(name)
+    return entry['label'] if entry else name
+
+
+def names(selectable_only=False):
+    return [name for name, entry in _REGISTRY.items() if entry['selectable'] or not selectable_only]
+
+
+def selection():
+    """Selection list of the providers that can be chosen in the settings."""
+    return [(name, _REGISTRY[name]['label']) for name in names(selectable_only=True)]
+
+
+register('openai', 'OpenAI', '.openai_api:OpenAIProvider')
+register('gemini', 'Gemini', '.gemini:GeminiProvider')
+register('deepseek', 'DeepSeek', '.deepseek:DeepSeekProvider')
+register('local', 'Local Gateway', '.local:LocalProvider')
+register('agent', 'External Agent', '.agent:AgentProvider', selectable=False)
@@ -0,0 +1,31 @@
+from .base import Provider, ProviderError, raise_for_status
+
+try:
+    import requests
+except Exception:
+    requests = None
+
+
+class AgentProvider(Provider):
+    """External agent (``daedaly.agent_url``) used as fallback for document analysis.
+
+    The agent answers ``POST /ask {"question": ...}`` with JSON already
+    matching the requested schema; the raw body is returned as text.
+    """
+    name = 'agent'
+    label = 'External Agent'
+
+    def is_configured(self, config):
+        return bool((config.get('agent_url') or '').strip())
+
+    def chat(self, prompt, config, stats):
+        agent_url = (config.get('agent_url') or '').strip().rstrip('/')
+        if not agent_url:
+            raise ProviderError("URL dell'agente esterno non configurato.")
+        if requests is None:
+            raise ProviderError("La libreria 'requests' non è installata nell'ambiente Python.")
+        stats['model'] = agent_url
+        response = requests.post(url=f'{agent_url}/ask', json={'question': prompt}, timeout=self._timeout(config, 60))
+        stats['ttfb_ms'] = response.elapsed.total_seconds() * 1000.0
+        raise_for_status(response)
+        return response.text
@@ -0,0 +1,88 @@
+"""Base class for the Daedaly AI provider plugins.
+
+Plugins are plain Python (no ORM access): they receive the configuration
+dict built by ``daedaly.gpt_api_helper.get_config()`` and fill ``stats`` with
+``model``, ``prompt_tokens``, ``output_tokens`` and ``ttfb_ms`` for the
+telemetry. ``config['max_output_tokens']``, when set, caps the answer length and
+``config['timeout']`` the seconds left before the action deadline. They may run in worker threads (``chat_many``, health probes).
+"""
+import abc
+
+
+class ProviderError(Exception):
+    pass
+
+
+def raise_for_status(response):
+    """Like ``response.raise_for_status()`` but keeping the provider's error body."""
+    if response.status_code >= 400:
+        try:
+            detail = response.json()
+        except Exception:
+            detail = response.text[:300]
+        raise ProviderError(f"HTTP {response.status_code}: {detail}")
+
+
+class Provider(abc.ABC):
+    name = None
+    label = None
+    # Capacità dichiarate, consultate dall'helper prima di scegliere una strategia
+    streaming = False
+    json_mode = False
+    context_window = 8192
+    batching = False
+    # Sondato dalle verifiche di stato anche quando non è il provider in uso
+    probe_when_idle = True
+    # Chiave di configurazione del modello, sovrascritta dalle regole di instradamento
+    model_param = None
+
+    def _timeout(self, config, default):
+        """Request timeout: ``default`` capped by the action deadline (``config['timeout']``)."""
+        return min(default, config['timeout']) if config.get('timeout') else default
+
+    def capabilities(self, config):
+        """Return the capabilities for ``config`` (some depend on the settings)."""
+        return {
+            'streaming': self.streaming,
+            'json_mode': self.json_mode,
+            'context_window': self.context_window,
+            'batching': self.batching,
+        }
+
+    def is_configured(self, config):
+        """True when ``config`` holds what the provider needs to be called."""
+        return True
+
+    @abc.abstractmethod
+    def chat(self, prompt, config, stats):
+        """Send ``prompt`` and return the generated text."""
+
+    def chat_batch(self, prompts, config, stats):
+        """Send ``prompts`` and return the texts in order.
+
+        Providers declaring ``batching`` send them in one request; this
+        default calls :meth:`chat` for each prompt and sums the token usage
+        into ``stats`` (None when a call does not report it).
+        """
+        texts = []
+        totals = {'prompt_tokens': 0, 'output_tokens': 0}
+        for prompt in prompts:
+            call_stats = {}
+            texts.append(self.chat(prompt, config, call_stats))
+            stats.setdefault('model', call_stats.get('model'))
+            stats.setdefault('ttfb_ms', call_stats.get('ttfb_ms'))
+            for key in totals:
+                if totals[key] is not None and call_stats.get(key) is not None:
+                    totals[key] += call_stats[key]
+                else:
+                    totals[key] = None
+        stats.update(totals)
+        return texts
+
+    def probe(self, check, config, timeout):
+        """Run a ``health`` or ``credit`` check; return a message or raise."""
+        raise ProviderError("Verifica non disponibile per questo provider.")
+
+    def warm_up(self, config):
+        """Prepare the provider (e.g. load a local model); return True on success."""
+        return False
@@ -0,0 +1,75 @@
+from .base import Provider, ProviderError, raise_for_status
+
+try:
+    import requests
+except Exception:
+    requests = None
+
+_API_URL = "https://api.deepseek.com"
+DEFAULT_MODEL = 'deepseek-chat'
+
+
+class DeepSeekProvider(Provider):
+    name = 'deepseek'
+    label = 'DeepSeek'
+    json_mode = True
+    context_window = 64000
+    model_param = 'deepseek_model'
+
+    def is_configured(self, config):
+        return bool(config.get('deepseek_key'))
+
+    def _headers(self, config):
+        return {
+            "Authorization": f"Bearer {config['deepseek_key']}",
+            "Content-Type": "application/json",
+        }
+
+    def chat(self, prompt, config, stats):
+        if not config.get('deepseek_key'):
+            raise ProviderError("DeepSeek API key non configurata.")
+        if requests is None:
+            raise ProviderError("La libreria 'requests' non è disponibile per le chiamate DeepSeek.")
+        model_name = (config.get('deepseek_model') or DEFAULT_MODEL).strip() or DEFAULT_MODEL
+        stats['model'] = model_name
+        payload = {
+            "model": model_name,
+            "messages": [
+                {"role": "user", "content": prompt},
+            ],
+            "stream": False,
+        }
+        if config.get('max_output_tokens'):
+            payload['max_tokens'] = config['max_output_tokens']
+        response = requests.post(f"{_API_URL}/v1/chat/completions", json=payload, headers=self._headers(config), timeout=self._timeout(config, 60))
+        stats['ttfb_ms'] = response.elapsed.total_seconds() * 1000.0
+        response.raise_for_status()
+        data = response.json()
+        usage = data.get('usage') or {}
+        stats['prompt_tokens'] = usage.get('prompt_tokens')
+        stats['output_tokens'] = usage.get('completion_tokens')
+        choices = data.get('choices') or []
+        if not choices:
+            raise ProviderError(f"risposta senza scelte valide ({data})")
+        message = choices[0].get('message', {})
+        content = message.get('content')
+        if not content:
+            raise ProviderError(f"nessun contenuto nella risposta ({message})")
+        return content
+
+    def probe(self, check, config, timeout):
+        headers = self._headers(config)
+        if check == 'health':
+            response = requests.get(f"{_API_URL}/models", headers=headers, timeout=timeout)
+            raise_for_status(response)
+            return "API DeepSeek raggiungibile."
+        # DeepSeek espone il saldo: nessun token consumato per verificare il credito
+        response = requests.get(f"{_API_URL}/user/balance", headers=headers, timeout=timeout)
+        raise_for_status(response)
+        data = response.json()
+        balances = ", ".join(
+            f"{info.get('total_balance')} {info.get('currency')}" for info in data.get('balance_infos') or []
+        )
+        if not data.get('is_available'):
+            raise ProviderError(f"Nessun credito API DeepSeek disponibile ({balances or 'saldo 0'}).")
+        return f"Credito API DeepSeek attivo: {balances}." if balances else "Credito API DeepSeek attivo."
@@ -0,0 +1,78 @@
+from ..tools import lazy_import
+from .base import Provider, ProviderError, raise_for_status
+
+try:
+    import requests
+except Exception:
+    requests = None
+
+_API_URL = "https://generativelanguage.googleapis.com/v1beta"
+DEFAULT_MODEL = 'models/gemini-flash-latest'
+
+
+class GeminiProvider(Provider):
+    name = 'gemini'
+    label = 'Gemini'
+    json_mode = True
+    context_window = 1000000
+    model_param = 'gemini_model'
+
+    def is_configured(self, config):
+        return bool(config.get('gemini_key'))
+
+    def _model(self, config):
+        model_name = config.get('gemini_model') or DEFAULT_MODEL
+        if not model_name.startswith('models/'):
+            model_name = f"models/{model_name}"
+        return model_name
+
+    def chat(self, prompt, config, stats):
+        genai = lazy_import('google.generativeai')
+        if genai is None:
+            raise ProviderError("google-generativeai not installed")
+        if not config.get('gemini_key'):
+            raise ProviderError("Gemini API key non configurata.")
+        genai.configure(api_key=config['gemini_key'])
+        model_name = self._model(config)
+        stats['model'] = model_name
+        model = genai.GenerativeModel(model_name=model_name)
+        options = {'request_options': {'timeout': self._timeout(config, 120)}}
+        if config.get('max_output_tokens'):
+            options['generation_config'] = {'max_output_tokens': config['max_output_tokens']}
+        response = model.generate_content(prompt, **options)
+        usage = getattr(response, 'usage_metadata', None)
+        if usage is not None:
+            stats['prompt_tokens'] = getattr(usage, 'prompt_token_count', None)
+            stats['output_tokens'] = getattr(usage, 'candidates_token_count', None)
+        if hasattr(response, 'text') and response.text:
+            return response.text
+        # Some SDK versions return candidates instead of text
+        candidates = getattr(response, 'candidates', []) or []
+        for candidate in candidates:
+            content = getattr(candidate, 'content', None)
+            if not content:
+                continue
+            parts = getattr(content, 'parts', []) or []
+            texts = [getattr(part, 'text', '') for part in parts if getattr(part, 'text', '')]
+            if texts:
+                return "\n".join(texts)
+        raise ProviderError("Gemini non ha restituito contenuti testuali.")
+
+    def probe(self, check, config, timeout):
+        # Le verifiche usano l'API REST: non serve caricare l'SDK
+        params = {'key': config['gemini_key']}
+        if check == 'health':
+            response = requests.get(f"{_API_URL}/models", params=params, timeout=timeout)
+            raise_for_status(response)
+            return "API Gemini raggiungibile."
+        response = requests.post(
+            f"{_API_URL}/{self._model(config)}:generateContent",
+            params=params,
+            json={
+                "contents": [{"parts": [{"text": "ping"}]}],
+                "generationConfig": {"maxOutputTokens": 1, "temperature": 0},
+            },
+            timeout=timeout,
+        )
+        raise_for_status(response)
+        return "Credito API Gemini attivo (chiamata minima riuscita)."
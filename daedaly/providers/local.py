@@ -0,0 +1,95 @@
+from ..tools import local_gateway
+from .base import Provider, ProviderError, raise_for_status
+
+
+class LocalProvider(Provider):
+    name = 'local'
+    label = 'Local Gateway'
+    json_mode = True
+    context_window = 32768
+    model_param = 'local_model_name'
+    # l'URL ha un default: il gateway si verifica solo se è il provider in uso
+    probe_when_idle = False
+
+    def capabilities(self, config):
+        caps = super().capabilities(config)
+        caps['context_window'] = config.get('local_num_ctx') or config.get('local_max_ctx') or self.context_window
+        # /v1/completions con lista di prompt: solo server OpenAI-compatibili (vLLM, llama.cpp)
+        caps['batching'] = bool(config.get('local_batching')) and self._protocol(config) == 'openai'
+        return caps
+
+    def is_configured(self, config):
+        return bool((config.get('local_gateway_url') or '').strip() and (config.get('local_model_name') or '').strip())
+
+    def _protocol(self, config):
+        protocol = config.get('local_protocol')
+        return protocol if protocol in local_gateway.PROTOCOLS else 'ollama_generate'
+
+    def request_parts(self, config):
+        """Validate the local gateway settings; return ``(url, model, headers, settings)``."""
+        url = (config.get('local_gateway_url') or '').strip()
+        if not url:
+            raise ProviderError("URL del gateway locale non configurato.")
+        model_name = (config.get('local_model_name') or '').strip()
+        if not model_name:
+            raise ProviderError("Nome del modello locale non configurato.")
+        try:
+            headers = local_gateway.parse_headers(config.get('local_extra_headers'))
+        except Exception as e:
+            raise ProviderError(f"headers non validi: {str(e)}")
+        try:
+            options = local_gateway.parse_options(config.get('local_options'))
+        except Exception as e:
+            raise ProviderError(f"opzioni non valide: {str(e)}")
+        settings = {
+            'keep_alive': (config.get('local_keep_alive') or '').strip(),
+            'num_ctx': config.get('local_num_ctx'),
+            'max_ctx': config.get('local_max_ctx'),
+            'num_predict': config.get('max_output_tokens') or config.get('local_num_predict'),
+            'options': options,
+        }
+        return url, model_name, headers, settings
+
+    def chat(self, prompt, config, stats):
+        if local_gateway.requests is None:
+            raise ProviderError("La libreria 'requests' non è disponibile per le chiamate al gateway locale.")
+        url, model_name, headers, settings = self.request_parts(config)
+        stats['model'] = model_name
+        protocol = self._protocol(config)
+        payload = local_gateway.build_payload(protocol, model_name, prompt, settings)
+        data = local_gateway.post(local_gateway.endpoint(url, protocol), payload, headers, self._timeout(config, 60), stats)
+        return local_gateway.parse_response(data, stats)
+
+    def chat_batch(self, prompts, config, stats):
+        url, model_name, headers, settings = self.request_parts(config)
+        stats['model'] = model_name
+        return local_gateway.complete_batch(url, model_name, prompts, headers, settings, self._timeout(config, 60), stats)
+
+    def probe(self, check, config, timeout):
+        url, model_name, headers, _settings = self.request_parts(config)
+        if self._protocol(config) == 'openai':
+            models_url = local_gateway.endpoint(url, 'openai')[:-len('/chat/completions')] + '/models'
+        else:
+            models_url = local_gateway.endpoint(url, 'ollama_chat')[:-len('/chat')] + '/tags'
+        response = local_gateway.requests.get(models_url, headers=headers, timeout=timeout)
+        raise_for_status(response)
+        data = response.json()
+        available = [m.get('name') or m.get('model') for m in data.get('models') or []]
+        available += [m.get('id') for m in data.get('data') or []]
+        if available and not any(name and name.split(':')[0] == model_name.split(':')[0] for name in available):
+            raise ProviderError(f"Il modello '{model_name}' non è disponibile sul gateway locale.")
+        if check == 'credit':
+            return "Gateway locale raggiungibile (nessun credito richiesto)."
+        return "Gateway locale raggiungibile."
+
+    def embed(self, texts, config):
+        """Embed ``texts`` with ``config['local_embedding_model']`` on the gateway."""
+        url, _model_name, headers, _settings = self.request_parts(config)
+        model_name = (config.get('local_embedding_model') or '').strip()
+        if not model_name:
+            raise ProviderError("Modello di embedding del gateway locale non configurato.")
+        return local_gateway.embed(url, self._protocol(config), model_name, texts, headers, self._timeout(config, 60))
+
+    def warm_up(self, config):
+        url, model_name, headers, settings = self.request_parts(config)
+        return local_gateway.warm_up(url, self._protocol(config), model_name, headers, settings)
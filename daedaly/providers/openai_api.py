@@ -0,0 +1,82 @@
+from ..tools import lazy_import
+from .base import Provider, ProviderError, raise_for_status
+
+try:
+    import requests
+except Exception:
+    requests = None
+
+_API_URL = "https://api.openai.com/v1"
+DEFAULT_MODEL = "gpt-4o-mini"
+
+
+class OpenAIProvider(Provider):
+    name = 'openai'
+    label = 'OpenAI'
+    json_mode = True
+    context_window = 128000
+    model_param = 'openai_model'
+
+    def is_configured(self, config):
+        return bool(config.get('openai_key'))
+
+    def _model(self, config):
+        return config.get('openai_model') or DEFAULT_MODEL
+
+    def chat(self, prompt, config, stats):
+        model_name = self._model(config)
+        stats['model'] = model_name
+        messages = [{"role": "user", "content": prompt}]
+        limits = {'max_tokens': config['max_output_tokens']} if config.get('max_output_tokens') else {}
+        timeout = self._timeout(config, 120)
+        openai = lazy_import('openai')
+        if openai is not None and hasattr(openai, 'OpenAI'):
+            # SDK >= 1.0
+            client = openai.OpenAI(api_key=config.get('openai_key'))
+            resp = client.chat.completions.create(model=model_name, messages=messages, timeout=timeout, **limits)
+            usage = getattr(resp, 'usage', None)
+            if usage is not None:
+                stats['prompt_tokens'] = getattr(usage, 'prompt_tokens', None)
+                stats['output_tokens'] = getattr(usage, 'completion_tokens', None)
+            return str(resp.choices[0].message.content)
+        if openai is not None:
+            openai.api_key = config.get('openai_key')
+            resp = openai.ChatCompletion.create(model=model_name, messages=messages, request_timeout=timeout, **limits)
+            data = resp
+        else:
+            # Senza SDK si usa direttamente l'API REST
+            if requests is None:
+                raise ProviderError("né l'SDK openai né la libreria requests sono installati.")
+            response = requests.post(
+                f"{_API_URL}/chat/completions",
+                headers={"Authorization": f"Bearer {config.get('openai_key')}"},
+                json=dict(limits, model=model_name, messages=messages),
+                timeout=timeout,
+            )
+            stats['ttfb_ms'] = response.elapsed.total_seconds() * 1000.0
+            raise_for_status(response)
+            data = response.json()
+        usage = data.get('usage') or {}
+        stats['prompt_tokens'] = usage.get('prompt_tokens')
+        stats['output_tokens'] = usage.get('completion_tokens')
+        return data['choices'][0]['message']['content']
+
+    def probe(self, check, config, timeout):
+        headers = {"Authorization": f"Bearer {config['openai_key']}"}
+        if check == 'health':
+            response = requests.get(f"{_API_URL}/models", headers=headers, timeout=timeout)
+            raise_for_status(response)
+            return "API OpenAI raggiungibile."
+        response = requests.post(
+            f"{_API_URL}/chat/completions",
+            headers=headers,
+            json={
+                "model": self._model(config),
+                "messages": [{"role": "user", "content": "ping"}],
+                "max_tokens": 1,
+                "temperature": 0,
+            },
+            timeout=timeout,
+        )
+        raise_for_status(response)
+        return "Credito API OpenAI attivo (chiamata minima riuscita)."
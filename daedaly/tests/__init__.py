@@ -0,0 +1,11 @@
+from . import test_document_blob
+from . import test_task_merge
+from . import test_extractors
+from . import test_token_budget
+from . import test_partial_results
+from . import test_profiling
+from . import test_routing_rule
+from . import test_single_flight
+from . import test_delta_output
+from . import test_task_batching
+from . import test_speculative
@@ -0,0 +1,55 @@
+from odoo.tests import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestDeltaOutput(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tag = cls.env['project.tags'].create({'name': 'Esistente'})
+        cls.project = cls.env['project.project'].create({
+            'name': 'Progetto con analisi',
+            'description': '<p>Il progetto dura 6 mesi.</p>',
+            'economic_notes': '<p>Budget R&amp;D 100k.</p>',
+            'criticita': '<ul><li>Ritardi del fornitore</li></ul>',
+            'tag_ids': [(6, 0, cls.tag.ids)],
+        })
+
+    def test_is_delta_result(self):
+        self.assertTrue(self.project._is_delta_result({'criticita_add': []}))
+        self.assertTrue(self.project._is_delta_result({'edits': []}))
+        self.assertFalse(self.project._is_delta_result({'description': 'Analisi completa'}))
+        self.assertFalse(self.project._is_delta_result(['description_add']))
+
+    def test_additions_and_edits_are_merged(self):
+        self.project._apply_delta_result({
+            'description_add': ['Nuova fase di collaudo.'],
+            'criticita_add': 'Fornitore unico',
+            'tags_add': ['Collaudo'],
+            'edits': [
+                {'field': 'economic_notes', 'find': 'Budget R&D 100k.', 'replace': 'Budget R&D 120k.'},
+                {'field': 'description', 'find': 'testo assente', 'replace': 'non applicato'},
+            ],
+        })
+        project = self.project
+        self.assertIn('<p>Il progetto dura 6 mesi.</p>', project.description)
+        self.assertIn('<p>Nuova fase di collaudo.</p>', project.description)
+        self.assertNotIn('non applicato', project.description)
+        self.assertIn('Budget R&amp;D 120k.', project.economic_notes)
+        self.assertNotIn('100k', project.economic_notes)
+        # Le nuove criticità si aggiungono all'elenco esistente
+        self.assertEqual(project.criticita.count('<ul>'), 1)
+        self.assertIn('<li>Ritardi del fornitore</li>', project.criticita)
+        self.assertIn('<li>Fornitore unico</li>', project.criticita)
+        self.assertEqual(sorted(project.tag_ids.mapped('name')), ['Collaudo', 'Esistente'])
+
+    def test_empty_delta_leaves_the_project_unchanged(self):
+        before = {field: self.project[field] for field in ('description', 'economic_notes', 'criticita')}
+        self.project._apply_delta_result({
+            'description_add': ['', '   '],
+            'edits': [{'field': 'criticita', 'find': 'Ritardi', 'replace': None}, 'non un dizionario'],
+        })
+        for field, value in before.items():
+            self.assertEqual(self.project[field], value)
+        self.assertEqual(self.project.tag_ids, self.tag)
@@ -0,0 +1,50 @@
+import base64
+
+from odoo import fields
+from odoo.tests import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestDocumentBlob(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.project = cls.env['project.project'].create({'name': 'Progetto documenti'})
+        cls.datas = base64.b64encode(b'Capitolato tecnico del progetto')
+
+    def _document(self, datas=None, filename='capitolato.txt'):
+        return self.env['project.documentation'].create({
+            'name': 'Capitolato',
+            'doc_date': fields.Date.today(),
+            'project_id': self.project.id,
+            'file': datas or self.datas,
+            'filename': filename,
+        })
+
+    def test_get_or_create_reuses_content(self):
+        blobs = self.env['daedaly.document.blob']
+        blob = blobs._get_or_create(self.datas, 'capitolato.txt')
+        self.assertEqual(blobs._get_or_create(self.datas, 'copia.txt'), blob)
+        self.assertEqual(blob.filename, 'capitolato.txt')
+        self.assertNotEqual(blobs._get_or_create(base64.b64encode(b'Altro contenuto')), blob)
+
+    def test_ref_count(self):
+        first = self._document()
+        second = self._document(filename='copia.txt')
+        blob = first.blob_id
+        self.assertTrue(blob)
+        self.assertEqual(second.blob_id, blob)
+        self.assertEqual(blob.ref_count, 2)
+
+        second.unlink()
+        self.assertEqual(blob.ref_count, 1)
+
+        # Il file sostituito resta solo se è ancora usato da un'altra riga
+        first.file = base64.b64encode(b'Capitolato rivisto')
+        self.assertNotEqual(first.blob_id, blob)
+        self.assertFalse(blob.exists())
+
+        new_blob = first.blob_id
+        first.unlink()
+        self.assertFalse(new_blob.exists())
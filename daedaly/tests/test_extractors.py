@@ -0,0 +1,53 @@
+import base64
+import io
+import zipfile
+
+from odoo.tests import TransactionCase, tagged
+
+from ..tools import extractors
+
+
+def _zip(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for name, content in members.items():
+            archive.writestr(name, content)
+    return buffer.getvalue()
+
+
+@tagged('post_install', '-at_install')
+class TestExtractorDetection(TransactionCase):
+
+    def test_magic_bytes(self):
+        self.assertEqual(extractors.detect(b'%PDF-1.7\n...', 'application/octet-stream'), 'pdf')
+
+    def test_office_containers(self):
+        docx = _zip({'word/document.xml': '<w:document/>', '[Content_Types].xml': ''})
+        odt = _zip({'mimetype': 'application/vnd.oasis.opendocument.text', 'content.xml': '<office:document/>'})
+        self.assertEqual(extractors.detect(docx), 'docx')
+        self.assertEqual(extractors.detect(odt), 'odt')
+        # Un archivio qualsiasi non è un documento
+        self.assertIsNone(extractors.detect(_zip({'foto.png': b'\x89PNG'}), 'application/zip'))
+
+    def test_mimetype(self):
+        self.assertEqual(extractors.detect(b'Ciao', 'message/rfc822'), 'email')
+        self.assertEqual(extractors.detect(b'Ciao', 'text/html; charset=utf-8'), 'html')
+
+    def test_generic_mimetype_falls_back_to_filename(self):
+        self.assertEqual(extractors.detect(b'Ciao', 'text/plain', 'pagina.html'), 'html')
+        self.assertEqual(extractors.detect(b'Ciao', 'application/octet-stream', 'note.md'), 'text')
+
+    def test_sniffing(self):
+        mail = b'From: a@example.com\nTo: b@example.com\nSubject: Verbale\n\nTesto'
+        self.assertEqual(extractors.detect(mail, 'text/plain'), 'email')
+        self.assertEqual(extractors.detect(b'<!DOCTYPE html><html><body>x</body></html>', 'text/plain'), 'html')
+        self.assertEqual(extractors.detect('Verbale della riunione'.encode('cp1252'), None), 'text')
+        self.assertIsNone(extractors.detect(b'\x00\x01\x02\x03binario', 'application/octet-stream'))
+
+    def test_extract_pages(self):
+        pages, error, name = extractors.extract_pages(base64.b64encode(b'Prima\fSeconda'), 'text/plain')
+        self.assertEqual((pages, error, name), (['Prima', 'Seconda'], None, 'text'))
+        pages, error, name = extractors.extract_pages(base64.b64encode(b'\x00\x01'), 'image/png', 'foto.png')
+        self.assertIsNone(pages)
+        self.assertIsNone(name)
+        self.assertIn('image/png', error)
@@ -0,0 +1,41 @@
+from odoo.tests import TransactionCase, tagged
+
+from ..tools import partial_json
+
+
+@tagged('post_install', '-at_install')
+class TestPartialResults(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tag = cls.env['project.tags'].create({'name': 'ERP'})
+        cls.project = cls.env['project.project'].create({
+            'name': 'Progetto analisi',
+            'economic_notes': '<p>Budget approvato</p>',
+            'criticita': '<p>Fornitore unico</p>',
+            'tag_ids': [(6, 0, cls.tag.ids)],
+        })
+
+    def test_salvage_keeps_complete_sections(self):
+        truncated = '{"sprints": [{"sprint": 1, "tasks": [{"title": "A"}]}, {"sprint": 2, "tasks": [{"title": "B'
+        self.assertEqual(partial_json.salvage(truncated), {'sprints': [{'sprint': 1, 'tasks': [{'title': 'A'}]}]})
+        self.assertIsNone(partial_json.salvage("nessun oggetto JSON"))
+
+    def test_truncated_answer_keeps_other_fields(self):
+        result = self.project._parse_ai_json(
+            'Ecco: {"description": "Nuova analisi del progetto", "economic_notes": "Costi da riv'
+        )
+        self.assertEqual(list(result), ['description'])
+        self.project._apply_smart_description(result)
+        self.assertIn('Nuova analisi del progetto', self.project.description)
+        self.assertIn('Budget approvato', self.project.economic_notes)
+        self.assertIn('Fornitore unico', self.project.criticita)
+        self.assertEqual(self.project.tag_ids, self.tag)
+
+    def test_complete_answer_replaces_fields(self):
+        self.project._apply_smart_description({
+            'description': 'Analisi', 'economic_notes': 'Costi', 'criticita': 'Ritardi', 'tags': ['CRM'],
+        })
+        self.assertIn('Costi', self.project.economic_notes)
+        self.assertEqual(self.project.tag_ids.mapped('name'), ['CRM'])
@@ -0,0 +1,52 @@
+from odoo.exceptions import UserError
+from odoo.tests import TransactionCase, tagged
+
+from ..models import ai_call
+from ..tools import profiling
+
+
+@tagged('post_install', '-at_install')
+class TestProfiling(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.stage_model = cls.env['daedaly.pipeline.stage']
+        cls.project = cls.env['project.project'].create({'name': 'Progetto profilato'})
+
+    def setUp(self):
+        super().setUp()
+        # Profilo e parametro sono scritti in un cursore separato: in test resta nella transazione del test
+        self.registry.enter_test_mode(self.cr)
+        self.addCleanup(self.registry.leave_test_mode)
+        # Le righe dei tempi non devono arrivare al database dopo il test
+        self.addCleanup(ai_call._BUFFERS.clear)
+
+    def test_stages_and_counts(self):
+        with self.stage_model._profile_run('test_action', self.project) as run:
+            self.assertIs(profiling.current(), run)
+            with profiling.stage('compose'):
+                with profiling.stage('call', count=3):
+                    self.env['project.project'].search([], limit=1)
+            profiling.add_count('apply', 2)
+        self.assertIsNone(profiling.current())
+        self.assertEqual(run.stages['compose']['count'], 1)
+        self.assertEqual(run.stages['call']['count'], 3)
+        self.assertEqual(run.stages['apply']['count'], 2)
+        self.assertGreaterEqual(run.stages['call']['query_count'], 1)
+        # I tempi sono esclusivi: la chiamata annidata non è contata nella composizione
+        self.assertLessEqual(run.stages['compose']['duration_ms'] + run.stages['call']['duration_ms'], run.total_ms)
+
+    def test_profile_kept_when_the_action_fails(self):
+        icp = self.env['ir.config_parameter'].sudo()
+        icp.set_param('daedaly.profile_next_run', True)
+        with self.assertRaises(UserError):
+            with self.stage_model._profile_run('test_action', self.project) as run:
+                raise UserError("errore dell'azione")
+        self.assertIsNotNone(run.profiler)
+        self.assertFalse(icp.get_param('daedaly.profile_next_run'))
+        self.assertTrue(self.env['ir.attachment'].search([
+            ('res_model', '=', 'project.project'),
+            ('res_id', '=', self.project.id),
+            ('name', '=like', 'daedaly_profile_test_action_%'),
+        ]))
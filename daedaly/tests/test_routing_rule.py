@@ -0,0 +1,70 @@
+from odoo.tests import TransactionCase, tagged
+
+from ..models import routing_rule
+
+
+@tagged('post_install', '-at_install')
+class TestRoutingRule(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.Rule = cls.env['daedaly.routing.rule']
+        cls.Rule.search([]).active = False
+        cls.config = {
+            'model': 'local',
+            'local_gateway_url': 'http://localhost:11434/api/generate',
+            'local_model_name': 'llama3:8b',
+            'openai_key': 'sk-test',
+        }
+        cls.Rule.create([{
+            'sequence': 1,
+            'name': 'Lista to-do sul modello piccolo',
+            'actions': 'task_smart_todo, task_smart_enrich',
+            'max_prompt_tokens': 4000,
+            'provider': 'local',
+            'model_name': 'llama3:1b',
+        }, {
+            'sequence': 2,
+            'name': 'Documenti lunghi su OpenAI',
+            'min_prompt_tokens': 20000,
+            'provider': 'openai',
+            'model_name': 'gpt-4o',
+        }, {
+            'sequence': 3,
+            'name': 'Gemini senza chiave',
+            'provider': 'gemini',
+        }])
+
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(routing_rule._LATENCY_CACHE.clear)
+
+    def test_rule_matching_action_and_size(self):
+        provider, config = self.Rule._route(self.config, 'task_smart_todo', 1000)
+        self.assertEqual(provider, 'local')
+        self.assertEqual(config['local_model_name'], 'llama3:1b')
+        # La configurazione del chiamante non viene modificata
+        self.assertEqual(self.config['local_model_name'], 'llama3:8b')
+
+    def test_prompt_size_selects_the_rule(self):
+        provider, config = self.Rule._route(self.config, 'task_smart_todo', 25000)
+        self.assertEqual(provider, 'openai')
+        self.assertEqual(config['openai_model'], 'gpt-4o')
+
+    def test_unconfigured_provider_is_skipped(self):
+        # La regola Gemini copre tutte le azioni ma manca la chiave: resta il provider delle impostazioni
+        provider, config = self.Rule._route(self.config, 'smart_description', 1000)
+        self.assertEqual(provider, 'local')
+        self.assertEqual(config['local_model_name'], 'llama3:8b')
+
+    def test_context_fallback_is_opt_in(self):
+        self.Rule.search([]).active = False
+        needed = 40000
+        provider, config = self.Rule._route(self.config, 'smart_description', needed)
+        self.assertEqual(provider, 'local')
+        self.assertIs(config, self.config)
+        self.env['ir.config_parameter'].sudo().set_param('daedaly.routing_context_fallback', True)
+        provider, config = self.Rule._route(self.config, 'smart_description', needed)
+        self.assertEqual(provider, 'openai')
+        self.assertEqual(config['model'], 'openai')
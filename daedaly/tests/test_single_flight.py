@@ -0,0 +1,36 @@
+from odoo import sql_db
+from odoo.tests import TransactionCase, tagged
+
+from ..models.gpt_api_helper import SingleFlightError
+
+
+@tagged('post_install', '-at_install')
+class TestSingleFlight(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.helper = cls.env['daedaly.gpt_api_helper']
+        # Record già presente nel database, visibile anche dall'altra transazione
+        cls.record = cls.env.company
+
+    def test_identical_call_in_another_transaction_is_refused(self):
+        other_cr = sql_db.db_connect(self.cr.dbname).cursor()
+        try:
+            other_env = self.env(cr=other_cr)
+            other_env['daedaly.gpt_api_helper']._claim_single_flight(
+                'smart_description', self.record.with_env(other_env), 'stesso prompt')
+            with self.assertRaises(SingleFlightError):
+                self.helper._claim_single_flight('smart_description', self.record, 'stesso prompt')
+            # Prompt o azione diversi non sono la stessa richiesta
+            self.helper._claim_single_flight('smart_description', self.record, 'altro prompt')
+            self.helper._claim_single_flight('generate_tasks', self.record, 'stesso prompt')
+        finally:
+            other_cr.rollback()
+            other_cr.close()
+        # Il lock è rilasciato alla fine dell'altra transazione
+        self.helper._claim_single_flight('smart_description', self.record, 'stesso prompt')
+
+    def test_same_transaction_can_claim_again(self):
+        self.helper._claim_single_flight('smart_description', self.record, 'stesso prompt')
+        self.helper._claim_single_flight('smart_description', self.record, 'stesso prompt')
@@ -0,0 +1,50 @@
+from unittest.mock import patch
+
+from odoo.tests import TransactionCase, tagged
+
+from ..models import ai_call
+
+
+@tagged('post_install', '-at_install')
+class TestSpeculativeResult(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.Result = cls.env['daedaly.speculative.result']
+        cls.project = cls.env['project.project'].create({'name': 'Progetto pre-calcolato'})
+        cls.analysis = {
+            'description': "Analisi pre-calcolata del progetto",
+            'economic_notes': "Budget coerente",
+            'criticita': ["Tempi stretti"],
+            'tags': ['speculativo'],
+        }
+
+    def setUp(self):
+        super().setUp()
+        # La chiamata riusata viene registrata nella telemetria: niente righe dopo il test
+        self.addCleanup(ai_call._BUFFERS.clear)
+
+    def test_lookup_matches_the_prompt(self):
+        self.Result._store(self.project, 'smart_description', 'prompt originale', self.analysis, 1200.0)
+        self.assertEqual(self.Result._lookup(self.project, 'smart_description', 'prompt originale'), self.analysis)
+        # Input cambiati dopo il pre-calcolo: si torna alla chiamata dal vivo
+        self.assertIsNone(self.Result._lookup(self.project, 'smart_description', 'prompt modificato'))
+        self.assertIsNone(self.Result._lookup(self.project, 'generate_tasks', 'prompt originale'))
+
+    def test_store_replaces_the_previous_result(self):
+        self.Result._store(self.project, 'smart_description', 'prima versione', {'description': 'vecchia'}, 10.0)
+        self.Result._store(self.project, 'smart_description', 'seconda versione', self.analysis, 20.0)
+        staged = self.Result.search([('project_id', '=', self.project.id), ('action', '=', 'smart_description')])
+        self.assertEqual(len(staged), 1)
+        self.assertIsNone(self.Result._lookup(self.project, 'smart_description', 'prima versione'))
+        self.assertEqual(self.Result._lookup(self.project, 'smart_description', 'seconda versione'), self.analysis)
+
+    def test_action_reuses_the_stored_result(self):
+        prompt = self.project._build_meeting_prompt()
+        self.Result._store(self.project, 'smart_description', prompt, self.analysis, 1200.0)
+        with patch.object(self.registry['project.project'], '_call_ai', side_effect=AssertionError("chiamata al provider")):
+            self.project.action_smart_description()
+        self.assertIn("Analisi pre-calcolata del progetto", self.project.description)
+        self.assertIn("Tempi stretti", self.project.criticita)
+        self.assertEqual(self.project.tag_ids.mapped('name'), ['speculativo'])
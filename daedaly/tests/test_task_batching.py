@@ -0,0 +1,101 @@
+import json
+from unittest.mock import patch
+
+from odoo.tests import TransactionCase, tagged
+
+from ..models import ai_call
+from ..models.gpt_api_helper import DeadlineError
+
+
+def _answer(batch, skip=()):
+    return json.dumps({
+        str(task.id): {'description': f"Descrizione generata per {task.name}"}
+        for task in batch['tasks'] if task.id not in skip
+    })
+
+
+@tagged('post_install', '-at_install')
+class TestTaskBatching(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.project = cls.env['project.project'].create({'name': 'Progetto a lotti'})
+        cls.other_project = cls.env['project.project'].create({'name': 'Altro progetto'})
+        cls.tasks = cls.env['project.task'].create([
+            {'name': f"Task {i}", 'project_id': cls.project.id} for i in range(4)
+        ])
+        cls.other_task = cls.env['project.task'].create({'name': 'Task esterna', 'project_id': cls.other_project.id})
+        cls.Task = cls.registry['project.task']
+
+    def setUp(self):
+        super().setUp()
+        # Le righe dei tempi non devono arrivare al database dopo il test
+        self.addCleanup(ai_call._BUFFERS.clear)
+        settings = patch.object(self.Task, '_task_batch_settings', return_value=(2, 12000))
+        settings.start()
+        self.addCleanup(settings.stop)
+
+    def test_parse_keyed_answer(self):
+        parse = self.env['project.task']._parse_task_batch
+        text = 'Ecco il risultato:\n{"12": {"items": ["a"]}, "Task 15": "testo"}\nFine.'
+        self.assertEqual(parse(text), {12: {'items': ['a']}, 15: 'testo'})
+        self.assertEqual(parse('{"12": '), {})
+        self.assertEqual(parse('nessun JSON'), {})
+
+    def test_batches_by_project_and_size(self):
+        selection = self.tasks | self.other_task
+        batches = selection._build_task_batches('todo', 2, 12000)
+        self.assertEqual([batch['tasks'] for batch in batches], [self.tasks[:2], self.tasks[2:], self.other_task])
+        for batch in batches:
+            for task in batch['tasks']:
+                self.assertIn(f"### Task ID {task.id}: {task.name}", batch['prompt'])
+            self.assertIn('"items"', batch['prompt'])
+
+    def test_failed_batch_retried_then_skipped(self):
+        calls = []
+
+        def fake_call(batches, action, raise_first=True):
+            calls.append(([batch['tasks'] for batch in batches], raise_first))
+            if len(calls) == 1:
+                return [_answer(batches[0]), RuntimeError("risposta troncata")]
+            return [DeadlineError("tempo esaurito")]
+
+        with patch.object(self.Task, '_call_task_batches', side_effect=fake_call):
+            remaining, skipped = self.tasks._run_task_batches('description')
+        self.assertEqual(calls, [([self.tasks[:2], self.tasks[2:]], True), ([self.tasks[2:]], False)])
+        self.assertFalse(remaining)
+        self.assertEqual(skipped, self.tasks[2:])
+        for task in self.tasks[:2]:
+            self.assertIn(f"Descrizione generata per {task.name}", task.description)
+        self.assertFalse(any(self.tasks[2:].mapped('description')))
+
+    def test_retry_success_and_missing_keys(self):
+        calls = []
+
+        def fake_call(batches, action, raise_first=True):
+            calls.append(batches)
+            if len(calls) == 1:
+                return [RuntimeError("gateway non raggiungibile"), _answer(batches[1], skip=self.tasks[3].ids)]
+            # Le chiavi di task fuori dal lotto sono ignorate
+            return [json.dumps({
+                str(self.tasks[0].id): {'description': 'Primo'},
+                str(self.tasks[1].id): {'description': 'Secondo'},
+                str(self.other_task.id): {'description': 'Intrusa'},
+            })]
+
+        with patch.object(self.Task, '_call_task_batches', side_effect=fake_call):
+            remaining, skipped = self.tasks._run_task_batches('description')
+        self.assertEqual(len(calls), 2)
+        self.assertFalse(skipped)
+        # La task assente dalla risposta resta da elaborare singolarmente
+        self.assertEqual(remaining, self.tasks[3])
+        self.assertIn('Primo', self.tasks[0].description)
+        self.assertFalse(self.other_task.description)
+
+    def test_single_task_is_not_batched(self):
+        with patch.object(self.Task, '_call_task_batches') as call:
+            remaining, skipped = self.tasks[:1]._run_task_batches('todo')
+        call.assert_not_called()
+        self.assertEqual(remaining, self.tasks[:1])
+        self.assertFalse(skipped)
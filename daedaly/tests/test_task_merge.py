@@ -0,0 +1,45 @@
+from odoo.tests import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestMergeGeneratedTasks(TransactionCase):
+
+    def _task(self, title):
+        return {'title': title, 'description': '', 'keywords': [], 'assignee': ''}
+
+    def test_sprints_are_joined_by_number(self):
+        merged = self.env['project.project']._merge_generated_tasks([
+            {'sprints': [
+                {'sprint': 1, 'tasks': [self._task("Configurare il server di posta")]},
+                {'sprint': 2, 'tasks': [self._task("Migrare le anagrafiche clienti")]},
+            ]},
+            {'sprints': [
+                {'sprint': 1, 'tasks': [
+                    self._task("Configurare il Server di Posta"),
+                    self._task("Definire i ruoli utente"),
+                ]},
+            ]},
+        ])
+        self.assertEqual([sprint['sprint'] for sprint in merged['sprints']], [1, 2])
+        self.assertEqual(
+            [task['title'] for task in merged['sprints'][0]['tasks']],
+            ["Configurare il server di posta", "Definire i ruoli utente"],
+        )
+        self.assertEqual(len(merged['sprints'][1]['tasks']), 1)
+
+    def test_value_streams_are_joined_by_name(self):
+        merged = self.env['project.project']._merge_generated_tasks([
+            {'value_streams': [{'stream': 'Onboarding', 'tasks': [self._task("Preparare il kit di benvenuto")]}]},
+            {'value_streams': [{'stream': 'onboarding', 'tasks': [self._task("Pianificare la formazione iniziale")]}]},
+        ])
+        self.assertEqual(len(merged['value_streams']), 1)
+        self.assertEqual(merged['value_streams'][0]['stream'], 'Onboarding')
+        self.assertEqual(len(merged['value_streams'][0]['tasks']), 2)
+
+    def test_flat_tasks_and_phases(self):
+        merged = self.env['project.project']._merge_generated_tasks([
+            {'tasks': [self._task("Analisi dei requisiti"), "non valido"]},
+            {'phases': [{'tasks': [self._task("analisi dei requisiti"), self._task("Collaudo finale")]}]},
+        ])
+        self.assertEqual([task['title'] for task in merged['tasks']], ["Analisi dei requisiti", "Collaudo finale"])
+        self.assertNotIn('sprints', merged)
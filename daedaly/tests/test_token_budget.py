@@ -0,0 +1,76 @@
+from odoo.tests import TransactionCase, tagged
+
+from ..models.gpt_api_helper import BudgetExceededError
+
+
+@tagged('post_install', '-at_install')
+class TestTokenBudget(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.helper = cls.env['daedaly.gpt_api_helper']
+        cls.ledger = cls.env['daedaly.token.ledger']
+        cls.company = cls.env.company
+        cls.project = cls.env['project.project'].create({'name': 'Progetto budget', 'company_id': cls.company.id})
+        cls.config = {'max_output_tokens': 100}
+
+    def setUp(self):
+        super().setUp()
+        # Il registro scrive in un cursore separato: in test resta nella transazione del test
+        self.registry.enter_test_mode(self.cr)
+        self.addCleanup(self.registry.leave_test_mode)
+
+    def _spend(self, tokens, project=None):
+        self.ledger.create({
+            'company_id': self.company.id,
+            'project_id': project.id if project else False,
+            'prompt_tokens': tokens,
+            'total_tokens': tokens,
+        })
+
+    def _admit(self, prompt_tokens, record=None):
+        return self.helper._admit('openai', dict(self.config), record or self.project, prompt_tokens, reroute=False)
+
+    def test_no_budget_no_reservation(self):
+        self._spend(10 ** 6)
+        _provider, _config, charge, reservation = self._admit(500)
+        self.assertIsNone(reservation)
+        self.assertEqual(charge['estimated_tokens'], 600)
+
+    def test_company_budget_rejects(self):
+        self.company.daedaly_token_budget_daily = 1000
+        self._spend(900)
+        with self.assertRaises(BudgetExceededError):
+            self._admit(200)
+        self.assertFalse(self.ledger.search([('reserved', '=', True)]))
+
+    def test_reservation_counts_until_recorded(self):
+        self.company.daedaly_token_budget_daily = 1000
+        self._spend(300)
+        _provider, _config, charge, reservation = self._admit(100)
+        self.assertTrue(self.ledger.browse(reservation).reserved)
+        self.assertFalse(charge['economy'])
+        # La prenotazione di 200 token è in corso: 300 + 200 + 600 supera il budget
+        with self.assertRaises(BudgetExceededError):
+            self._admit(500)
+        self.ledger._release(reservation)
+        self.assertFalse(self.ledger.browse(reservation).exists())
+        self._admit(500)
+
+    def test_project_budget_rejects(self):
+        self.project.daedaly_token_budget_monthly = 100
+        self._spend(50, self.project)
+        with self.assertRaisesRegex(BudgetExceededError, 'progetto'):
+            self._admit(10)
+        # Un altro progetto della stessa azienda non è toccato dal budget
+        other = self.env['project.project'].create({'name': 'Altro progetto'})
+        self._admit(10, other)
+
+    def test_economy_mode(self):
+        self.company.daedaly_token_budget_daily = 1000
+        self.env['ir.config_parameter'].sudo().set_param('daedaly.budget_economy_output_tokens', 50)
+        self._spend(700)
+        _provider, config, charge, _reservation = self._admit(100)
+        self.assertTrue(charge['economy'])
+        self.assertEqual(config['max_output_tokens'], 50)
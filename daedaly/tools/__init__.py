@@ -0,0 +1,30 @@
+"""Pure-Python helpers shared by the Daedaly models (no ORM access here)."""
+import importlib
+
+# Rapporto medio caratteri/token per testi italiani e inglesi sui tokenizer BPE
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text):
+    """Cheap token estimate used when the provider does not report usage."""
+    if not text:
+        return 0
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+_LAZY_MODULES = {}
+
+
+def lazy_import(name):
+    """Import ``name`` on first use and cache it; return None if it is missing.
+
+    Optional SDKs (google-generativeai, openai, PyMuPDF) are heavy: importing
+    them at module level would cost every Odoo worker at registry load even
+    when the feature is never used.
+    """
+    if name not in _LAZY_MODULES:
+        try:
+            _LAZY_MODULES[name] = importlib.import_module(name)
+        except Exception:
+            _LAZY_MODULES[name] = None
+    return _LAZY_MODULES[name]
@@ -0,0 +1,44 @@
+"""Overall time budget of a Daedaly action.
+
+A deadline is bound to the current thread while an action runs, so document
+extraction, provider timeouts and fallbacks deep in the call chain can size
+themselves on the time left without receiving it as an argument. Nested
+scopes never extend the outer deadline. Outside a scope ``remaining`` is
+None and callers keep their defaults.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+_local = threading.local()
+
+
+def current():
+    """Return the active deadline (``time.monotonic()`` based) or None."""
+    return getattr(_local, 'deadline', None)
+
+
+@contextmanager
+def scope(seconds):
+    """Bind a deadline ``seconds`` from now (None or 0: keep the outer one)."""
+    previous = current()
+    deadline = time.monotonic() + seconds if seconds else None
+    if previous is not None and (deadline is None or previous < deadline):
+        deadline = previous
+    _local.deadline = deadline
+    try:
+        yield deadline
+    finally:
+        _local.deadline = previous
+
+
+def remaining():
+    """Seconds left before the active deadline, or None without deadline."""
+    deadline = current()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def expired(reserve=0):
+    """True when less than ``reserve`` seconds are left."""
+    left = remaining()
+    return left is not None and left < reserve
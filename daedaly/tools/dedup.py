@@ -0,0 +1,184 @@
+"""Boilerplate and near-duplicate removal across the documents of a prompt.
+
+Pages of the extracted text are separated by form feeds. Lines repeated at
+the top or bottom of most pages of a document (headers, footers, page
+numbers) are dropped. A paragraph whose word shingles are a near duplicate
+(MinHash estimate of the Jaccard similarity) of a paragraph already kept,
+in the same or an earlier document, is replaced by a reference to the
+document holding that copy.
+"""
+import hashlib
+import math
+import re
+from collections import Counter
+
+from . import lazy_import, text_index
+
+PAGE_BREAK = '\f'
+
+_DIGITS_RE = re.compile(r"\d+")
+_WORDS_RE = re.compile(r"\w+")
+_PARAGRAPH_RE = re.compile(r"\n\s*\n")
+_SENTENCE_ENDS = ('.', ':', ';', '!', '?')
+
+_PRIME = (1 << 31) - 1
+_PERMUTATIONS = 64
+_BANDS = 16
+_ROWS = _PERMUTATIONS // _BANDS
+# Coefficienti fissi: le firme restano confrontabili tra processi
+_COEFFICIENTS = [
+    (
+        int.from_bytes(hashlib.sha256(b'a%d' % i).digest()[:4], 'little') % (_PRIME - 1) + 1,
+        int.from_bytes(hashlib.sha256(b'b%d' % i).digest()[:4], 'little') % _PRIME,
+    )
+    for i in range(_PERMUTATIONS)
+]
+
+
+def _line_key(line):
+    # I numeri di pagina e le date cambiano da pagina a pagina: non contano
+    return _DIGITS_RE.sub('#', ' '.join(text_index.normalize(line).split()))
+
+
+def _edge_size(line_count, edge_lines):
+    # Nelle pagine corte solo la prima e l'ultima riga possono essere intestazione o piè di pagina
+    return min(edge_lines, line_count // 3)
+
+
+def strip_page_boilerplate(text, edge_lines=3, min_share=0.5):
+    """Return ``(text, removed_lines)`` without the repeated page headers and footers.
+
+    A line is boilerplate when it appears among the first or last
+    ``edge_lines`` lines (fewer on short pages) of at least ``min_share`` of
+    the pages, three at least; it is removed only from those positions.
+    """
+    pages = text.split(PAGE_BREAK)
+    if len(pages) < 3:
+        return text, 0
+    counts = Counter()
+    for page in pages:
+        lines = [line for line in page.splitlines() if line.strip()]
+        edge = _edge_size(len(lines), edge_lines)
+        counts.update({_line_key(line) for line in lines[:edge] + lines[len(lines) - edge:]})
+    threshold = max(3, math.ceil(len(pages) * min_share))
+    boilerplate = {key for key, count in counts.items() if key and count >= threshold}
+    if not boilerplate:
+        return text, 0
+    removed = 0
+    cleaned = []
+    for page in pages:
+        lines = page.splitlines()
+        filled = [index for index, line in enumerate(lines) if line.strip()]
+        edge = _edge_size(len(filled), edge_lines)
+        edges = set(filled[:edge] + filled[len(filled) - edge:])
+        kept = []
+        for index, line in enumerate(lines):
+            if index in edges and _line_key(line) in boilerplate:
+                removed += 1
+                continue
+            kept.append(line)
+        cleaned.append("\n".join(kept))
+    return PAGE_BREAK.join(cleaned), removed
+
+
+def split_paragraphs(text, max_chars=800):
+    """Split ``text`` on blank lines and page breaks; long blocks break at sentence ends."""
+    paragraphs = []
+    for block in _PARAGRAPH_RE.split(text.replace(PAGE_BREAK, "\n\n")):
+        current = []
+        size = 0
+        for line in block.splitlines():
+            if not line.strip():
+                continue
+            current.append(line)
+            size += len(line) + 1
+            if size >= max_chars and line.rstrip().endswith(_SENTENCE_ENDS):
+                paragraphs.append("\n".join(current))
+                current = []
+                size = 0
+        if current:
+            paragraphs.append("\n".join(current))
+    return paragraphs
+
+
+def _shingles(words, size=5):
+    if len(words) <= size:
+        return {' '.join(words)}
+    return {' '.join(words[index:index + size]) for index in range(len(words) - size + 1)}
+
+
+def minhash(shingles):
+    """MinHash signature (``_PERMUTATIONS`` values) of a set of shingles."""
+    hashes = [int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=4).digest(), 'little') for s in shingles]
+    np = lazy_import('numpy')
+    if np is not None:
+        values = np.asarray(hashes, dtype=np.int64)
+        a = np.asarray([c[0] for c in _COEFFICIENTS], dtype=np.int64)[:, None]
+        b = np.asarray([c[1] for c in _COEFFICIENTS], dtype=np.int64)[:, None]
+        return tuple(((a * values + b) % _PRIME).min(axis=1).tolist())
+    return tuple(min((a * value + b) % _PRIME for value in hashes) for a, b in _COEFFICIENTS)
+
+
+def _reference(source, name, count):
+    where = "più sopra" if source == name else f"nel documento «{source}»"
+    if count == 1:
+        return f"[paragrafo ripetuto, già riportato {where}]"
+    return f"[{count} paragrafi ripetuti, già riportati {where}]"
+
+
+def deduplicate(documents, threshold=0.8, min_words=8):
+    """Remove boilerplate and repeated paragraphs from ``documents``.
+
+    ``documents`` is a list of ``(name, text)``. Returns ``(texts, stats)``
+    with one text per document; consecutive repeated paragraphs become a
+    single reference. Paragraphs shorter than ``min_words`` words are always
+    kept. ``stats`` holds ``chars_before``, ``chars_after``,
+    ``boilerplate_lines`` and ``duplicate_paragraphs``.
+    """
+    stats = {'chars_before': 0, 'chars_after': 0, 'boilerplate_lines': 0, 'duplicate_paragraphs': 0}
+    kept = []
+    buckets = {}
+    texts = []
+    for name, text in documents:
+        text = text or ''
+        stats['chars_before'] += len(text)
+        text, removed = strip_page_boilerplate(text)
+        stats['boilerplate_lines'] += removed
+        output = []
+        pending = None
+        for paragraph in split_paragraphs(text):
+            source = None
+            words = _WORDS_RE.findall(text_index.normalize(paragraph))
+            if len(words) >= min_words:
+                signature = minhash(_shingles(words))
+                bands = [(band, signature[band * _ROWS:(band + 1) * _ROWS]) for band in range(_BANDS)]
+                candidates = {index for key in bands for index in buckets.get(key, ())}
+                for index in sorted(candidates):
+                    other, other_name = kept[index]
+                    agreement = sum(1 for x, y in zip(signature, other) if x == y) / _PERMUTATIONS
+                    if agreement >= threshold:
+                        source = other_name
+                        break
+                if source is None:
+                    for key in bands:
+                        buckets.setdefault(key, []).append(len(kept))
+                    kept.append((signature, name))
+            if source is not None:
+                stats['duplicate_paragraphs'] += 1
+                if pending and pending[0] == source:
+                    pending[1] += 1
+                else:
+                    if pending:
+                        output.append(_reference(pending[0], name, pending[1]))
+                    pending = [source, 1]
+                continue
+            if pending:
+                output.append(_reference(pending[0], name, pending[1]))
+                pending = None
+            output.append(paragraph)
+        if pending:
+            output.append(_reference(pending[0], name, pending[1]))
+        result = "\n\n".join(output)
+        stats['chars_after'] += len(result)
+        texts.append(result)
+    return texts, stats
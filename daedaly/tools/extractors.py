@@ -0,0 +1,298 @@
+"""Registry of the text extractors used for documentation files.
+
+Each extractor turns the raw bytes of a file into a list of page texts. The
+format is detected from the magic bytes first, then from the mimetype and
+the file name, and finally by sniffing the content, so plain text, HTML and
+e-mail exports are read with the standard library at almost no cost while
+PyMuPDF is only loaded for PDFs. Office formats are read as zip archives
+with a streaming XML parser. Third-party addons can add a format with
+:func:`register`.
+"""
+import base64
+import email
+import email.policy
+import io
+import os
+import re
+import zipfile
+from html.parser import HTMLParser
+from xml.etree import ElementTree
+
+from . import lazy_import
+
+_REGISTRY = {}
+
+# Testo oltre il quale il campione non viene più analizzato per riconoscere il formato
+_SNIFF_BYTES = 4096
+_GENERIC_MIMETYPES = frozenset(('text/plain', 'application/octet-stream'))
+
+
+def register(name, extract, mimetypes=(), extensions=(), magic=(), sniff=None, container=None):
+    """Register the extractor ``name``.
+
+    ``extract(raw)`` returns the list of page texts. ``magic`` are byte
+    prefixes, ``sniff(sample)`` recognizes the format from the first bytes and
+    ``container(names)`` from the member names of a zip archive.
+    """
+    _REGISTRY[name] = {
+        'extract': extract,
+        'mimetypes': frozenset(mimetypes),
+        'extensions': frozenset(ext.lower() for ext in extensions),
+        'magic': tuple(magic),
+        'sniff': sniff,
+        'container': container,
+    }
+
+
+def names():
+    return list(_REGISTRY)
+
+
+def _zip_members(raw):
+    try:
+        with zipfile.ZipFile(io.BytesIO(raw)) as archive:
+            return set(archive.namelist())
+    except zipfile.BadZipFile:
+        return set()
+
+
+def detect(raw, mimetype=None, filename=None):
+    """Return the name of the extractor for ``raw`` or None."""
+    if raw.startswith(b'PK\x03\x04'):
+        members = _zip_members(raw)
+        for name, entry in _REGISTRY.items():
+            if entry['container'] and entry['container'](members):
+                return name
+    for name, entry in _REGISTRY.items():
+        if entry['magic'] and raw.startswith(entry['magic']):
+            return name
+    mimetype = (mimetype or '').split(';')[0].strip().lower()
+    # I mimetype generici (anche per HTML ed e-mail senza python-magic) non decidono il formato
+    if mimetype and mimetype not in _GENERIC_MIMETYPES:
+        for name, entry in _REGISTRY.items():
+            if mimetype in entry['mimetypes']:
+                return name
+    if filename:
+        extension = os.path.splitext(filename)[1].lower()
+        for name, entry in _REGISTRY.items():
+            if extension and extension in entry['extensions']:
+                return name
+    sample = raw[:_SNIFF_BYTES]
+    for name, entry in _REGISTRY.items():
+        if entry['sniff'] and entry['sniff'](sample):
+            return name
+    return None
+
+
+def extract_pages(binary_data, mimetype=None, filename=None):
+    """Return ``(pages, error, extractor)`` for base64 ``binary_data``.
+
+    ``pages`` is the list of page texts, or None with ``error`` holding the
+    message shown in the prompts (callers must not cache it).
+    """
+    try:
+        raw = base64.b64decode(binary_data)
+    except Exception as e:
+        return None, f"File non leggibile: {str(e)}", None
+    name = detect(raw, mimetype, filename)
+    if name is None:
+        return None, f"Formato non supportato ({mimetype or filename or 'sconosciuto'})", None
+    try:
+        return _REGISTRY[name]['extract'](raw), None, name
+    except Exception as e:
+        return None, f"Errore nella lettura del file ({name}): {str(e)}", name
+
+
+def extract_text(binary_data, mimetype=None, filename=None):
+    """Return ``(text, ok)``; on failure ``text`` is the error message."""
+    pages, error, _name = extract_pages(binary_data, mimetype, filename)
+    if pages is None:
+        return error, False
+    return "\n".join(pages), True
+
+
+# --- PDF -------------------------------------------------------------------
+
+def _pdf_pages(raw):
+    # PyMuPDF è caricato solo alla prima estrazione
+    fitz = lazy_import('fitz')
+    if fitz is None:
+        raise RuntimeError("PyMuPDF (fitz) non installato: impossibile leggere PDF")
+    with fitz.open(stream=raw, filetype="pdf") as doc:
+        return [page.get_text() for page in doc]
+
+
+# --- Testo semplice ----------------------------------------------------------
+
+def decode_text(raw):
+    """Decode ``raw`` as UTF-8 (with or without BOM), UTF-16 with BOM or cp1252."""
+    if raw.startswith((b'\xff\xfe', b'\xfe\xff')):
+        return raw.decode('utf-16')
+    try:
+        return raw.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        return raw.decode('cp1252', errors='replace')
+
+
+def _looks_textual(sample):
+    if not sample or (b'\x00' in sample and not sample.startswith((b'\xff\xfe', b'\xfe\xff'))):
+        return False
+    text = decode_text(sample)
+    printable = sum(1 for c in text if c.isprintable() or c in '\n\r\t\f')
+    return printable >= 0.95 * len(text)
+
+
+def _text_pages(raw):
+    return decode_text(raw).replace('\r\n', '\n').split('\f')
+
+
+# --- HTML --------------------------------------------------------------------
+
+_BLOCK_TAGS = frozenset(
+    "p div br li tr h1 h2 h3 h4 h5 h6 table ul ol section article header footer blockquote pre title".split()
+)
+_SKIP_TAGS = frozenset(('script', 'style', 'head', 'noscript', 'template'))
+_BLANK_LINES_RE = re.compile(r"\n\s*\n\s*(\n\s*)+")
+
+
+class _HTMLText(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _SKIP_TAGS:
+            self.skip += 1
+        elif tag in _BLOCK_TAGS:
+            self.parts.append("\n")
+        elif tag == 'td':
+            self.parts.append("\t")
+
+    def handle_endtag(self, tag):
+        if tag in _SKIP_TAGS:
+            self.skip = max(0, self.skip - 1)
+        elif tag in _BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if not self.skip:
+            self.parts.append(data)
+
+
+def html_to_text(html):
+    parser = _HTMLText()
+    parser.feed(html)
+    parser.close()
+    lines = (' '.join(line.split()) for line in ''.join(parser.parts).splitlines())
+    return _BLANK_LINES_RE.sub("\n\n", "\n".join(lines)).strip()
+
+
+def _html_pages(raw):
+    return [html_to_text(decode_text(raw))]
+
+
+def _looks_html(sample):
+    head = sample[:1024].lstrip().lower()
+    return head.startswith((b'<!doctype html', b'<html')) or b'<body' in head
+
+
+# --- E-mail ------------------------------------------------------------------
+
+_MAIL_HEADER_RE = re.compile(rb"^(Return-Path|Received|From|To|Subject|Date|Message-ID|MIME-Version|Delivered-To):", re.I)
+
+
+def _looks_email(sample):
+    lines = sample.splitlines()[:20]
+    return sum(1 for line in lines if _MAIL_HEADER_RE.match(line)) >= 2
+
+
+def _email_pages(raw):
+    message = email.message_from_bytes(raw, policy=email.policy.default)
+    header = [
+        f"{field}: {message[field]}" for field in ('From', 'To', 'Cc', 'Date', 'Subject') if message[field]
+    ]
+    body = message.get_body(preferencelist=('plain', 'html'))
+    content = ''
+    if body is not None:
+        content = body.get_content()
+        if body.get_content_type() == 'text/html':
+            content = html_to_text(content)
+    attachments = [part.get_filename() for part in message.iter_attachments() if part.get_filename()]
+    if attachments:
+        header.append("Allegati: " + ", ".join(attachments))
+    return ["\n".join(header) + "\n\n" + content.strip()]
+
+
+# --- Office (zip + XML in streaming) ------------------------------------------
+
+_W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+
+def _docx_pages(raw):
+    pages = []
+    paragraphs = []
+    current = []
+    with zipfile.ZipFile(io.BytesIO(raw)) as archive, archive.open('word/document.xml') as stream:
+        for _event, element in ElementTree.iterparse(stream):
+            tag = element.tag
+            if tag == _W + 't':
+                current.append(element.text or '')
+            elif tag == _W + 'tab':
+                current.append("\t")
+            elif tag == _W + 'br' and element.get(_W + 'type') == 'page':
+                paragraphs.append(''.join(current))
+                current = []
+                pages.append("\n".join(paragraphs))
+                paragraphs = []
+            elif tag == _W + 'p':
+                paragraphs.append(''.join(current))
+                current = []
+                # Il sottoalbero del paragrafo non serve più: la memoria resta costante
+                element.clear()
+    paragraphs.append(''.join(current))
+    pages.append("\n".join(paragraphs))
+    return [page.strip("\n") for page in pages]
+
+
+_TEXT_NS = '{urn:oasis:names:tc:opendocument:xmlns:text:1.0}'
+
+
+def _odf_pages(raw):
+    lines = []
+    with zipfile.ZipFile(io.BytesIO(raw)) as archive, archive.open('content.xml') as stream:
+        for _event, element in ElementTree.iterparse(stream):
+            if element.tag in (_TEXT_NS + 'p', _TEXT_NS + 'h'):
+                lines.append(''.join(element.itertext()))
+                element.clear()
+    return ["\n".join(lines)]
+
+
+def _odf_container(members):
+    return 'content.xml' in members and 'mimetype' in members and 'word/document.xml' not in members
+
+
+register(
+    'pdf', _pdf_pages, mimetypes=('application/pdf',), extensions=('.pdf',), magic=(b'%PDF',),
+)
+register(
+    'docx', _docx_pages,
+    mimetypes=('application/vnd.openxmlformats-officedocument.wordprocessingml.document',),
+    extensions=('.docx',), container=lambda members: 'word/document.xml' in members,
+)
+register(
+    'odt', _odf_pages, mimetypes=('application/vnd.oasis.opendocument.text',), extensions=('.odt',),
+    container=_odf_container,
+)
+register(
+    'email', _email_pages, mimetypes=('message/rfc822',), extensions=('.eml',), sniff=_looks_email,
+)
+register(
+    'html', _html_pages, mimetypes=('text/html', 'application/xhtml+xml'), extensions=('.html', '.htm'),
+    sniff=_looks_html,
+)
+register(
+    'text', _text_pages,
+    mimetypes=('text/plain', 'text/markdown', 'text/csv', 'application/json'),
+    extensions=('.txt', '.md', '.markdown', '.csv', '.json', '.log'), sniff=_looks_textual,
+)
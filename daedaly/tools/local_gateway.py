@@ -0,0 +1,203 @@
+"""Protocol handling for self-hosted LLM gateways (Ollama, vLLM, llama.cpp...).
+
+Three protocols are supported:
+
+* ``ollama_generate``: Ollama ``/api/generate`` (prompt completion)
+* ``ollama_chat``: Ollama ``/api/chat`` (chat template applied by the server)
+* ``openai``: OpenAI-compatible ``/v1/chat/completions``; servers that batch
+  requests (vLLM, llama.cpp with ``--parallel``) also accept a list of
+  prompts on ``/v1/completions``, used by :func:`complete_batch`.
+"""
+import json
+import logging
+
+from . import estimate_tokens
+
+try:
+    import requests
+except Exception:
+    requests = None
+
+_logger = logging.getLogger(__name__)
+
+PROTOCOLS = ('ollama_generate', 'ollama_chat', 'openai')
+
+_SUFFIXES = {
+    'ollama_generate': '/api/generate',
+    'ollama_chat': '/api/chat',
+    'openai': '/v1/chat/completions',
+    'openai_batch': '/v1/completions',
+    'ollama_embed': '/api/embed',
+    'openai_embed': '/v1/embeddings',
+}
+
+# Ollama ricarica il modello quando cambia num_ctx: si usano pochi tagli fissi
+CONTEXT_BUCKETS = (4096, 8192, 16384, 32768, 65536, 131072)
+
+
+class GatewayError(Exception):
+    pass
+
+
+def endpoint(url, protocol):
+    """Return the URL to call for ``protocol`` given the configured gateway URL.
+
+    A URL ending with a known API path is treated as the server root plus that
+    path, so switching protocol keeps working with the URL already saved in
+    settings. Custom URLs (proxies) are used verbatim for the default protocol.
+    """
+    url = (url or '').strip().rstrip('/')
+    for suffix in sorted(set(_SUFFIXES.values()) | {'/v1', '/api'}, key=len, reverse=True):
+        if url.endswith(suffix):
+            return url[:-len(suffix)] + _SUFFIXES[protocol]
+    if protocol == 'ollama_generate':
+        return url
+    return url + _SUFFIXES[protocol]
+
+
+def size_context(prompt, num_predict=0, max_ctx=32768):
+    """Pick the smallest context bucket holding ``prompt`` plus the output."""
+    needed = estimate_tokens(prompt) + (num_predict or 1024)
+    for bucket in CONTEXT_BUCKETS:
+        if bucket >= needed or bucket >= max_ctx:
+            return min(bucket, max_ctx)
+    return max_ctx
+
+
+def parse_headers(extra_headers_json):
+    headers = {"Content-Type": "application/json"}
+    if extra_headers_json:
+        extra = json.loads(extra_headers_json)
+        if not isinstance(extra, dict):
+            raise ValueError("Il valore non è un oggetto JSON.")
+        headers.update({str(k): str(v) for k, v in extra.items()})
+    return headers
+
+
+def parse_options(options_json):
+    if not options_json:
+        return {}
+    options = json.loads(options_json)
+    if not isinstance(options, dict):
+        raise ValueError("Le opzioni del gateway locale devono essere un oggetto JSON.")
+    return options
+
+
+def build_payload(protocol, model, prompt, settings):
+    """Return the JSON body for one completion request.
+
+    ``settings`` holds ``keep_alive``, ``num_ctx`` (0 = automatic sizing),
+    ``max_ctx``, ``num_predict`` and ``options`` (extra sampler options).
+    """
+    options = dict(settings.get('options') or {})
+    num_predict = settings.get('num_predict') or 0
+    if protocol == 'openai':
+        payload = dict(options, model=model, stream=False, messages=[{"role": "user", "content": prompt}])
+        if num_predict:
+            payload['max_tokens'] = num_predict
+        return payload
+    num_ctx = settings.get('num_ctx') or size_context(prompt, num_predict, settings.get('max_ctx') or 32768)
+    options['num_ctx'] = num_ctx
+    if num_predict:
+        options['num_predict'] = num_predict
+    payload = {"model": model, "stream": False, "options": options}
+    if settings.get('keep_alive'):
+        payload['keep_alive'] = settings['keep_alive']
+    if protocol == 'ollama_chat':
+        payload['messages'] = [{"role": "user", "content": prompt}]
+    else:
+        payload['prompt'] = prompt
+    return payload
+
+
+def parse_response(data, stats):
+    """Extract the generated text (and token usage into ``stats``)."""
+    if not isinstance(data, dict):
+        raise GatewayError(f"Risposta non riconosciuta dal gateway locale: {data}")
+    # Ollama riporta i token in prompt_eval_count/eval_count, i server OpenAI-compatibili in usage
+    usage = data.get('usage') or {}
+    stats['prompt_tokens'] = data.get('prompt_eval_count', usage.get('prompt_tokens'))
+    stats['output_tokens'] = data.get('eval_count', usage.get('completion_tokens'))
+    # Ollama format: {"response": "...", "done": true}
+    if data.get('response'):
+        return data['response']
+    # Ollama chat format: {"message": {"content": "..."}}
+    message = data.get('message')
+    if isinstance(message, dict) and message.get('content'):
+        return message['content']
+    # text-generation-inference format: {"output": {"text": "..."}}
+    output = data.get('output')
+    if isinstance(output, dict) and output.get('text'):
+        return output['text']
+    if data.get('choices'):
+        # openai-compatible local endpoints
+        choice = data['choices'][0]
+        content = (choice.get('message') or {}).get('content') or choice.get('text')
+        if content:
+            return content
+    raise GatewayError(f"Risposta non riconosciuta dal gateway locale: {data}")
+
+
+def post(url, payload, headers, timeout, stats):
+    if requests is None:
+        raise GatewayError("La libreria 'requests' non è disponibile per le chiamate al gateway locale.")
+    response = requests.post(url, json=payload, headers=headers, timeout=timeout)
+    stats['ttfb_ms'] = response.elapsed.total_seconds() * 1000.0
+    response.raise_for_status()
+    return response.json()
+
+
+def complete_batch(url, model, prompts, headers, settings, timeout, stats):
+    """Send ``prompts`` in one ``/v1/completions`` request; return texts in order."""
+    payload = dict(settings.get('options') or {}, model=model, prompt=list(prompts), stream=False)
+    if settings.get('num_predict'):
+        payload['max_tokens'] = settings['num_predict']
+    data = post(endpoint(url, 'openai_batch'), payload, headers, timeout, stats)
+    usage = data.get('usage') or {}
+    stats['prompt_tokens'] = usage.get('prompt_tokens')
+    stats['output_tokens'] = usage.get('completion_tokens')
+    texts = [None] * len(prompts)
+    for position, choice in enumerate(data.get('choices') or []):
+        index = choice.get('index', position)
+        if 0 <= index < len(texts):
+            texts[index] = choice.get('text') or ''
+    if any(text is None for text in texts):
+        raise GatewayError("Il gateway locale non ha restituito una risposta per ogni prompt del lotto.")
+    return texts
+
+
+def embed(url, protocol, model, texts, headers, timeout):
+    """Return one embedding vector per text (Ollama ``/api/embed`` or ``/v1/embeddings``)."""
+    stats = {}
+    payload = {'model': model, 'input': list(texts)}
+    if protocol == 'openai':
+        data = post(endpoint(url, 'openai_embed'), payload, headers, timeout, stats)
+        items = sorted(data.get('data') or [], key=lambda item: item.get('index', 0))
+        vectors = [item.get('embedding') for item in items]
+    else:
+        data = post(endpoint(url, 'ollama_embed'), payload, headers, timeout, stats)
+        vectors = data.get('embeddings') or []
+    if len(vectors) != len(texts) or not all(vectors):
+        raise GatewayError("Il gateway locale non ha restituito un embedding per ogni testo.")
+    return vectors
+
+
+def warm_up(url, protocol, model, headers, settings, timeout=120):
+    """Load ``model`` on the gateway so the first real call avoids a cold start."""
+    stats = {}
+    try:
+        if protocol == 'openai':
+            payload = build_payload(protocol, model, "ping", dict(settings, num_predict=1))
+        else:
+            # Ollama carica il modello e applica keep_alive anche senza prompt
+            payload = {
+                "model": model,
+                "keep_alive": settings.get('keep_alive') or '30m',
+                "options": {'num_ctx': settings.get('num_ctx') or CONTEXT_BUCKETS[1]},
+            }
+        post(endpoint(url, protocol), payload, headers, timeout, stats)
+        _logger.info("Gateway locale Daedaly: modello %s pronto (%s)", model, protocol)
+        return True
+    except Exception as e:
+        _logger.warning("Warm-up del gateway locale Daedaly fallito: %s", e)
+        return False
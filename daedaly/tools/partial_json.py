@@ -0,0 +1,64 @@
+"""Recover the complete part of a truncated JSON object.
+
+A provider answer cut short (output token limit, connection closed) usually
+holds valid leading members: the description before the tags, the first
+sprints before the last one. :func:`salvage` keeps those members, drops the
+incomplete tail and closes the open brackets.
+"""
+import json
+
+# Oltre questo numero di tagli candidati si rinuncia: risposte patologiche
+_MAX_ATTEMPTS = 50
+
+
+def _cut_points(text):
+    """Yield ``(position, open_brackets)`` where the text can be cut cleanly.
+
+    A cut is clean before a comma that follows a closed object or array, or
+    that separates the members of the top-level object.
+    """
+    stack = []
+    in_string = False
+    escape = False
+    last = ''
+    for pos, char in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif char == '\\':
+                escape = True
+            elif char == '"':
+                in_string = False
+                last = '"'
+            continue
+        if char == '"':
+            in_string = True
+        elif char in '{[':
+            stack.append('}' if char == '{' else ']')
+        elif char in '}]':
+            if stack:
+                stack.pop()
+            if not stack:
+                return
+        elif char == ',':
+            if last in '}]' or len(stack) == 1:
+                yield pos, list(stack)
+        if not char.isspace():
+            last = char
+
+
+def salvage(text):
+    """Return the longest valid prefix of the JSON object in ``text`` as a dict, or None."""
+    start = (text or '').find('{')
+    if start == -1:
+        return None
+    text = text[start:]
+    points = list(_cut_points(text))
+    for pos, stack in reversed(points[-_MAX_ATTEMPTS:]):
+        try:
+            data = json.loads(text[:pos] + ''.join(reversed(stack)))
+        except ValueError:
+            continue
+        if isinstance(data, dict):
+            return data
+    return None
@@ -0,0 +1,67 @@
+"""Health and credit probes for the AI providers.
+
+Probes delegate to the provider plugins (``daedaly.providers``) and work on
+the configuration dict returned by ``daedaly.gpt_api_helper.get_config()``,
+so they can run in worker threads without touching the ORM. Health probes
+only list models (no tokens spent); credit probes use the cheapest call that
+proves the account can generate.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .. import providers
+
+try:
+    import requests
+except Exception:
+    requests = None
+
+CHECK_TYPES = ('health', 'credit')
+
+
+def configured_providers(config):
+    """Return the providers with enough configuration to be probed."""
+    result = []
+    for name in providers.names(selectable_only=True):
+        provider = providers.get(name)
+        if name == config.get('model') or (provider.probe_when_idle and provider.is_configured(config)):
+            result.append(name)
+    return result
+
+
+def _quota_error(text):
+    lowered = text.lower()
+    return 'quota' in lowered or 'resource has been exhausted' in lowered or 'insufficient' in lowered
+
+
+def probe(provider, check, config, timeout=15):
+    """Run one probe; return ``{'ok', 'message', 'latency_ms'}`` and never raise."""
+    started = time.perf_counter()
+    label = providers.label(provider)
+    try:
+        if requests is None:
+            raise providers.ProviderError("libreria requests non disponibile.")
+        message = providers.get(provider).probe(check, config, timeout)
+        ok = True
+    except Exception as e:
+        ok = False
+        text = str(e)
+        if check == 'credit' and _quota_error(text):
+            message = f"Nessun credito API {label}: {text}"
+        else:
+            message = f"Errore chiamando {label}: {text}"
+    return {
+        'ok': ok,
+        'message': message,
+        'latency_ms': (time.perf_counter() - started) * 1000.0,
+    }
+
+
+def probe_all(jobs, config, timeout=15, max_workers=4):
+    """Run ``(provider, check)`` probes in parallel; return a dict keyed by job."""
+    jobs = list(jobs)
+    if not jobs:
+        return {}
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(jobs)))) as executor:
+        futures = {job: executor.submit(probe, job[0], job[1], config, timeout) for job in jobs}
+        return {job: future.result() for job, future in futures.items()}
@@ -0,0 +1,121 @@
+"""Per-stage timing for the Daedaly pipelines.
+
+A :class:`PipelineRun` is bound to the current thread while an action runs,
+so helpers deep in the call chain can time themselves with :func:`stage`
+without receiving the run as an argument. Outside a run ``stage`` is a no-op.
+"""
+import cProfile
+import io
+import pstats
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+_local = threading.local()
+_listeners = []
+
+
+def add_listener(callback):
+    """Call ``callback(run)`` after every completed run (benchmarks, tests)."""
+    _listeners.append(callback)
+
+
+def remove_listener(callback):
+    if callback in _listeners:
+        _listeners.remove(callback)
+
+
+def current():
+    return getattr(_local, 'run', None)
+
+
+@contextmanager
+def stage(name, count=None):
+    run = current()
+    if run is None:
+        yield None
+        return
+    with run.stage(name, count=count) as entry:
+        yield entry
+
+
+def add_count(name, count):
+    """Add to the count of ``name`` on the active run (no timing)."""
+    run = current()
+    if run is not None:
+        run.add_count(name, count)
+
+
+class PipelineRun:
+    """Collect exclusive durations, counts and SQL query counts per stage."""
+
+    def __init__(self, action, cr=None, cprofile=False):
+        self.action = action
+        self.uid = uuid.uuid4().hex
+        self.cr = cr
+        self.stages = {}
+        self.total_ms = 0.0
+        self.profiler = cProfile.Profile() if cprofile else None
+        self._stack = []
+        self._started = None
+        self._previous = None
+
+    def _query_count(self):
+        return getattr(self.cr, 'sql_log_count', 0) if self.cr is not None else 0
+
+    def _entry(self, name):
+        return self.stages.setdefault(name, {'duration_ms': 0.0, 'count': 0, 'query_count': 0})
+
+    def __enter__(self):
+        self._previous = current()
+        _local.run = self
+        self._started = time.perf_counter()
+        if self.profiler is not None:
+            self.profiler.enable()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.profiler is not None:
+            self.profiler.disable()
+        self.total_ms = (time.perf_counter() - self._started) * 1000.0
+        _local.run = self._previous
+        for callback in list(_listeners):
+            callback(self)
+        return False
+
+    @contextmanager
+    def stage(self, name, count=None):
+        entry = self._entry(name)
+        frame = {'child_ms': 0.0, 'child_queries': 0}
+        self._stack.append(frame)
+        started = time.perf_counter()
+        queries = self._query_count()
+        try:
+            yield entry
+        finally:
+            self._stack.pop()
+            elapsed = (time.perf_counter() - started) * 1000.0
+            used = self._query_count() - queries
+            # Tempi esclusivi: gli stadi annidati non vengono conteggiati due volte
+            entry['duration_ms'] += elapsed - frame['child_ms']
+            entry['query_count'] += used - frame['child_queries']
+            entry['count'] += 1 if count is None else count
+            if self._stack:
+                self._stack[-1]['child_ms'] += elapsed
+                self._stack[-1]['child_queries'] += used
+
+    def add_count(self, name, count):
+        self._entry(name)['count'] += count
+
+    def summary(self):
+        parts = [f"{name} {data['duration_ms']:.0f} ms ({data['count']})" for name, data in self.stages.items()]
+        return f"total {self.total_ms:.0f} ms | " + " | ".join(parts)
+
+    def cprofile_report(self, limit=60):
+        if self.profiler is None:
+            return ''
+        out = io.StringIO()
+        stats = pstats.Stats(self.profiler, stream=out)
+        stats.sort_stats('cumulative').print_stats(limit)
+        return out.getvalue()
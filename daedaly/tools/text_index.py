@@ -0,0 +1,120 @@
+"""Lightweight keyword index of document text (no external dependencies).
+
+The index is a ``{term: count}`` dict of the most frequent meaningful terms,
+stored as JSON on the document blob so documents can be ranked by relevance
+without calling a provider.
+"""
+import math
+import re
+import unicodedata
+from collections import Counter
+
+_WORD_RE = re.compile(r"[a-z0-9][a-z0-9\-_.]*[a-z0-9]|[a-z0-9]")
+
+STOPWORDS = frozenset("""
+a ad al alla alle allo agli ai anche che chi ci con cui da dal dalla dalle dallo dai degli dei del della delle dello
+di e ed gli ha hanno i il in la le lo loro ma ne nei nel nella nelle nello no non o per più poi quale quali quando
+quanto quella quelle quello questa queste questo se si sia sono su sua sue sui sul sulla sulle suo suoi tra un una
+uno essere come deve devono può possono viene vengono tutti tutte ogni altro altri altra altre dove sempre già
+the of and to in for on with by from at as is are be was were this that these those it its or not an will can
+has have had but if then than which who whom what when where all any each other such into over under about
+""".split())
+
+
+def normalize(text):
+    text = unicodedata.normalize('NFKD', text or '')
+    return ''.join(c for c in text if not unicodedata.combining(c)).lower()
+
+
+def tokenize(text, min_length=3):
+    """Return the meaningful lowercase terms of ``text`` (accents stripped)."""
+    return [
+        term for term in _WORD_RE.findall(normalize(text))
+        if len(term) >= min_length and term not in STOPWORDS and not term.isdigit()
+    ]
+
+
+def term_frequencies(text, limit=300):
+    """Return the ``limit`` most frequent terms of ``text`` as ``{term: count}``."""
+    return dict(Counter(tokenize(text)).most_common(limit))
+
+
+# Parole funzione molto frequenti: bastano poche centinaia di parole per distinguere le lingue
+_LANGUAGE_MARKERS = {
+    'it': frozenset("il lo la gli le di che per con del della non una sono anche questo nella".split()),
+    'en': frozenset("the and of to is that for with are this be on not by from".split()),
+    'fr': frozenset("le la les des est une pour dans que qui sur pas avec sont du".split()),
+    'de': frozenset("der die das und ist nicht mit den ein eine zu von auf für sich".split()),
+    'es': frozenset("el la los las que del por una con para son como pero esta".split()),
+}
+
+
+def detect_language(text, sample_words=2000):
+    """Return the ISO 639-1 code of the dominant language of ``text`` or False."""
+    words = _WORD_RE.findall(normalize(text[:sample_words * 8]))[:sample_words]
+    if not words:
+        return False
+    scores = {
+        code: sum(1 for word in words if word in markers)
+        for code, markers in _LANGUAGE_MARKERS.items()
+    }
+    code, score = max(scores.items(), key=lambda item: item[1])
+    return code if score >= 3 else False
+
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?;])\s+|\n+")
+
+
+def extractive_summary(text, max_chars=400):
+    """Return the most informative sentences of ``text`` within ``max_chars``.
+
+    Sentences are scored by the document frequency of their terms (divided
+    by the square root of their length, so long sentences do not win by size
+    alone) and kept in their original order.
+    """
+    sentences = [s.strip(" -•\t") for s in _SENTENCE_RE.split(text or '') if s.strip(" -•\t")]
+    if not sentences:
+        return ''
+    frequencies = Counter(tokenize(text))
+    scored = []
+    seen = set()
+    for index, sentence in enumerate(sentences):
+        terms = tokenize(sentence)
+        key = tuple(terms)
+        # Frasi ripetute (profili copiati più volte) contano una volta sola
+        if not terms or key in seen:
+            continue
+        seen.add(key)
+        scored.append((sum(frequencies[t] for t in set(terms)) / (len(terms) ** 0.5), index))
+    chosen = []
+    used = 0
+    for _score, index in sorted(scored, reverse=True):
+        length = len(sentences[index]) + 1
+        if used + length > max_chars and chosen:
+            continue
+        chosen.append(index)
+        used += length
+        if used >= max_chars:
+            break
+    return ' '.join(sentences[index] for index in sorted(chosen))[:max_chars]
+
+
+def relevance_scores(query_terms, candidates):
+    """Score each ``{term: count}`` of ``candidates`` against ``query_terms``.
+
+    Shared terms weigh by their (log) frequency in the query and by how rare
+    they are among the candidates, so a skill every member lists does not
+    decide the ranking; scores are divided by the square root of the
+    candidate's vocabulary so long profiles do not win by size alone.
+    """
+    total = len(candidates)
+    document_frequency = Counter(term for terms in candidates for term in terms)
+    scores = []
+    for terms in candidates:
+        score = 0.0
+        for term in terms:
+            if term in query_terms:
+                idf = math.log((1 + total) / (1 + document_frequency[term])) + 1.0
+                score += (1.0 + math.log(query_terms[term])) * idf
+        scores.append(score / math.sqrt(len(terms)) if terms else 0.0)
+    return scores
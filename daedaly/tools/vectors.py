@@ -0,0 +1,80 @@
+"""Compact embedding vectors and similarity for the assignee recommender.
+
+Vectors are stored as little-endian float32 bytes. NumPy computes the
+similarity matrix when installed; a pure Python fallback keeps the module
+usable without it. :func:`hashed_tf` is the built-in embedding used when no
+embedding model is configured on the local gateway; IDF weights are applied
+at scoring time over the candidates, giving TF-IDF similarities.
+"""
+import array
+import hashlib
+import math
+import sys
+from collections import Counter
+
+from . import lazy_import, text_index
+
+DEFAULT_DIM = 512
+
+
+def normalize(vector):
+    norm = math.sqrt(sum(value * value for value in vector))
+    return [value / norm for value in vector] if norm else list(vector)
+
+
+def hashed_tf(text, dim=DEFAULT_DIM):
+    """Sublinear term-frequency vector of ``text`` (hashing trick, L2-normalised)."""
+    vector = [0.0] * dim
+    for term, count in Counter(text_index.tokenize(text)).items():
+        digest = hashlib.md5(term.encode('utf-8')).digest()
+        vector[int.from_bytes(digest[:4], 'little') % dim] += 1.0 + math.log(count)
+    return normalize(vector)
+
+
+def pack(vector):
+    data = array.array('f', vector)
+    if sys.byteorder == 'big':
+        data.byteswap()
+    return data.tobytes()
+
+
+def unpack(data):
+    vector = array.array('f')
+    vector.frombytes(data)
+    if sys.byteorder == 'big':
+        vector.byteswap()
+    return vector.tolist()
+
+
+def _idf(candidates):
+    total = len(candidates)
+    frequency = [sum(1 for vector in candidates if vector[i]) for i in range(len(candidates[0]))]
+    return [math.log((1 + total) / (1 + df)) + 1.0 for df in frequency]
+
+
+def similarity_matrix(queries, candidates, idf=False):
+    """Cosine similarities, one row per query and one column per candidate.
+
+    With ``idf`` the dimensions are weighted by their rarity among the
+    candidates (for :func:`hashed_tf` vectors) before comparing.
+    """
+    if not queries or not candidates:
+        return [[] for _query in queries]
+    np = lazy_import('numpy')
+    if np is not None:
+        q = np.asarray(queries, dtype=np.float32)
+        c = np.asarray(candidates, dtype=np.float32)
+        if idf:
+            weights = np.log((1 + len(c)) / (1 + np.count_nonzero(c, axis=0))) + 1.0
+            q = q * weights
+            c = c * weights
+        q = q / np.maximum(np.linalg.norm(q, axis=1, keepdims=True), 1e-12)
+        c = c / np.maximum(np.linalg.norm(c, axis=1, keepdims=True), 1e-12)
+        return (q @ c.T).tolist()
+    if idf:
+        weights = _idf(candidates)
+        queries = [[v * w for v, w in zip(vector, weights)] for vector in queries]
+        candidates = [[v * w for v, w in zip(vector, weights)] for vector in candidates]
+    queries = [normalize(vector) for vector in queries]
+    candidates = [normalize(vector) for vector in candidates]
+    return [[sum(a * b for a, b in zip(query, candidate)) for candidate in candidates] for query in queries]